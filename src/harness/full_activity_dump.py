@@ -13,6 +13,116 @@
 #    limitations under the License.
 """Container for Full Activity Dump information."""
 
+import hashlib
+
+import numpy as np
+
+
+class CbsdRecordIndex(object):
+  """Indexed and columnar view of a list of CBSD records.
+
+  The CBSD and grant fields used by the reference models are extracted once
+  into arrays, so that filtering large dumps can be done with array operations
+  instead of scanning the record dictionaries.
+
+  Per-CBSD attributes, in the order of the records:
+    records: The CBSD records (|CbsdData| dictionaries).
+    ids: The CBSD ids.
+    latitudes, longitudes: The CBSD locations (ndarray of degrees).
+    is_cat_b: True for category B CBSDs (ndarray of bool).
+
+  Per-grant attributes, in the order of the records then of their grants:
+    grant_records: The grant records (|GrantData| dictionaries).
+    grant_cbsd_idxs: The index of the CBSD of each grant (ndarray of int).
+    low_frequencies, high_frequencies: The grant frequency ranges (ndarray
+      of Hz).
+    max_eirps: The grant max EIRP (ndarray of dBm/MHz).
+    terminated: True for terminated grants (ndarray of bool).
+  """
+
+  def __init__(self, records):
+    """Initializes the index.
+
+    Args:
+      records: A list of |CbsdData| dictionaries.
+    """
+    self.records = list(records)
+    self.ids = [record['id'] for record in self.records]
+    install_params = [record['registration']['installationParam']
+                      for record in self.records]
+    self.latitudes = np.array([param['latitude'] for param in install_params],
+                              dtype=float)
+    self.longitudes = np.array([param['longitude'] for param in install_params],
+                               dtype=float)
+    self.is_cat_b = np.array(
+        [record['registration']['cbsdCategory'] == 'B'
+         for record in self.records], dtype=bool)
+
+    self.grant_records = []
+    grant_cbsd_idxs = []
+    for cbsd_idx, record in enumerate(self.records):
+      self.grant_records.extend(record['grants'])
+      grant_cbsd_idxs.extend([cbsd_idx] * len(record['grants']))
+    self.grant_cbsd_idxs = np.array(grant_cbsd_idxs, dtype=int)
+    op_params = [grant['operationParam'] for grant in self.grant_records]
+    self.low_frequencies = np.array(
+        [param['operationFrequencyRange']['lowFrequency']
+         for param in op_params], dtype=float)
+    self.high_frequencies = np.array(
+        [param['operationFrequencyRange']['highFrequency']
+         for param in op_params], dtype=float)
+    self.max_eirps = np.array([param['maxEirp'] for param in op_params],
+                              dtype=float)
+    self.terminated = np.array(
+        [grant.get('terminated', False) for grant in self.grant_records],
+        dtype=bool)
+
+    self._ids_array = np.array(self.ids)
+    self._idx_by_id = {}
+    for k, cbsd_id in enumerate(self.ids):
+      self._idx_by_id.setdefault(cbsd_id, k)
+    # Frequency index: grants sorted by low frequency.
+    self._freq_order = np.argsort(self.low_frequencies, kind='mergesort')
+    self._sorted_low_frequencies = self.low_frequencies[self._freq_order]
+
+  def getCbsdIdx(self, cbsd_id):
+    """Returns the (first) index of a CBSD from its id, or None if not present."""
+    return self._idx_by_id.get(cbsd_id)
+
+  def getCbsdIdxByFccIdAndSerial(self, fcc_id, serial_number):
+    """Returns the index of a CBSD from its FCC id and serial number.
+
+    Returns None if the CBSD is not present.
+    """
+    return self.getCbsdIdx('cbsd/%s/%s' % (
+        fcc_id, hashlib.sha1(serial_number).hexdigest()))
+
+  def getCbsdIdxs(self, cbsd_ids):
+    """Returns the sorted indices (ndarray) of the CBSDs having one of some ids."""
+    cbsd_ids = list(cbsd_ids)
+    if not cbsd_ids or not self.ids:
+      return np.zeros(0, dtype=int)
+    return np.flatnonzero(np.in1d(self._ids_array, cbsd_ids))
+
+  def getGrantIdxsInFrequencyRange(self, low_frequency, high_frequency):
+    """Returns the grants overlapping a frequency range.
+
+    Args:
+      low_frequency, high_frequency: The frequency range (Hz).
+    Returns:
+      The sorted indices (ndarray) of the grants whose frequency range
+      overlaps (strictly) the given range.
+    """
+    num_candidates = np.searchsorted(self._sorted_low_frequencies,
+                                     high_frequency, side='left')
+    candidates = self._freq_order[:num_candidates]
+    return np.sort(candidates[self.high_frequencies[candidates] > low_frequency])
+
+  def getCbsdIdxsInFrequencyRange(self, low_frequency, high_frequency):
+    """Returns the sorted indices of CBSDs with a grant overlapping a range."""
+    grant_idxs = self.getGrantIdxsInFrequencyRange(low_frequency, high_frequency)
+    return np.unique(self.grant_cbsd_idxs[grant_idxs])
+
 
 class FullActivityDump(object):
 
@@ -52,10 +162,9 @@ class FullActivityDump(object):
     if not filters:
       # Always return a copy for consistency
       return list(self._dump_data[record_type])
-    response = self._dump_data[record_type]
-    for f in filters:
-      response = filter(f, response)
-    return response
+    # Single pass, each filter only applied to records passing previous ones.
+    return [record for record in self._dump_data[record_type]
+            if all(f(record) for f in filters)]
 
   def getCbsdRecords(self, filters=[]):
     """Returns all CBSD records matching ALL of the given filters.
@@ -89,6 +198,24 @@ class FullActivityDump(object):
     """
     self._dump_data['cbsd'] = records
 
+  def getCbsdIndex(self):
+    """Returns a new |CbsdRecordIndex| of the current CBSD records.
+
+    The index is a snapshot: it does not reflect later changes of the records
+    (for example grants purged in place), so it shall not be kept beyond the
+    processing step using it.
+    """
+    return CbsdRecordIndex(self._dump_data['cbsd'])
+
+  def getCbsdRecordsByIds(self, cbsd_ids):
+    """Returns the CBSD records with the given ids, in the order of the dump.
+
+    Args:
+      cbsd_ids: An iterable of CBSD ids. Ids not in the dump are ignored.
+    """
+    index = self.getCbsdIndex()
+    return [index.records[k] for k in index.getCbsdIdxs(cbsd_ids)]
+
   def getEscSensorRecords(self, filters=[]):
     """Returns all ESC sensor records matching the given filters.
 
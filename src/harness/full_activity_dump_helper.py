@@ -15,13 +15,68 @@
 
 from datetime import datetime, timedelta
 import logging
+from multiprocessing.pool import ThreadPool
+import threading
 import time
 from full_activity_dump import FullActivityDump
+import request_handler
+import sas_interface
 import util
 import traceback
 
+# Default number of dump files downloaded concurrently.
+DEFAULT_NUM_WORKERS = 4
 
-def getFullActivityDumpSasUut(sas, sas_admin, ssl_cert=None, ssl_key=None):
+
+class DownloadStats(object):
+  """Statistics of a Full Activity Dump download.
+
+  Updated concurrently by the download workers.
+
+  Attributes:
+    num_files: The number of files to download.
+    num_files_done: The number of downloaded files.
+    num_records: The number of downloaded records.
+    num_bytes: The number of downloaded bytes (when reported by the SAS
+      interface).
+    elapsed_time: The duration of the download (seconds).
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._start_time = None
+    self.num_files = 0
+    self.num_files_done = 0
+    self.num_records = 0
+    self.num_bytes = 0
+    self.elapsed_time = 0.
+
+  def Start(self, num_files):
+    with self._lock:
+      self._start_time = time.time()
+      self.num_files += num_files
+
+  def AddRecord(self):
+    with self._lock:
+      self.num_records += 1
+
+  def AddFile(self, num_bytes):
+    with self._lock:
+      self.num_files_done += 1
+      self.num_bytes += num_bytes or 0
+      self.elapsed_time = time.time() - self._start_time
+
+  def Throughput(self):
+    """Returns the download throughput as (records/s, bytes/s)."""
+    with self._lock:
+      if not self.elapsed_time:
+        return 0., 0.
+      return (self.num_records / self.elapsed_time,
+              self.num_bytes / self.elapsed_time)
+
+
+def getFullActivityDumpSasUut(sas, sas_admin, ssl_cert=None, ssl_key=None,
+                              num_workers=DEFAULT_NUM_WORKERS, stats=None):
   """Returns a FullActivityDump object from the SAS UUT in its current state.
 
   Args:
@@ -29,19 +84,24 @@ def getFullActivityDumpSasUut(sas, sas_admin, ssl_cert=None, ssl_key=None):
     sas_admin: SasAdminInterface to trigger FAD creation over.
     ssl_cert: Optional. ssl certificate to use when making get/post requests.
     ssl_key: Optional. ssl key to use when making get/post requests.
+    num_workers: Optional. The number of files downloaded concurrently.
+    stats: Optional. A |DownloadStats| to be updated during the download.
   Returns:
     A Full Activity Dump object containing FAD data from the given SAS.
   """
   dump = _triggerFullActivityDumpAndWaitUntilComplete(sas, sas_admin, ssl_cert,
                                                       ssl_key)
-  return _processDump(sas, dump, ssl_cert, ssl_key)
+  return _processDump(sas, dump, ssl_cert, ssl_key, num_workers, stats)
 
 
-def getFullActivityDumpSasTestHarness(sas):
+def getFullActivityDumpSasTestHarness(sas, num_workers=DEFAULT_NUM_WORKERS,
+                                      stats=None):
   """Returns a FullActivityDump object for the current state of a SAS test harness.
 
   Args:
     sas: SasInterface to request FAD data from.
+    num_workers: Optional. The number of files downloaded concurrently.
+    stats: Optional. A |DownloadStats| to be updated during the download.
   Returns:
     A Full Activity Dump object containing FAD data from the given SAS test
     harness.
@@ -51,7 +111,7 @@ def getFullActivityDumpSasTestHarness(sas):
   """
   try:
     dump = sas.GetFullActivityDump()
-    return _processDump(sas, dump)
+    return _processDump(sas, dump, num_workers=num_workers, stats=stats)
   except Exception as e:
     # Any exception caused in reading and processing a FAD from a test
     # harness is not the fault of the SAS UUT.
@@ -94,15 +154,46 @@ def _triggerFullActivityDumpAndWaitUntilComplete(sas, sas_admin, ssl_cert,
   return dump_message
 
 
-def _processDump(sas, dump, ssl_cert=None, ssl_key=None):
+def _downloadFileRecords(sas, url, ssl_cert, ssl_key, stats):
+  """Downloads the records of a dump file.
+
+  Returns:
+    The list of records of the file.
+  """
+  records = []
+  def _addRecord(record):
+    records.append(record)
+    stats.AddRecord()
+  if isinstance(sas, sas_interface.SasInterface):
+    num_bytes = sas.DownloadFileRecords(url, _addRecord, ssl_cert=ssl_cert,
+                                        ssl_key=ssl_key)
+  else:
+    num_bytes = None
+    for record in sas.DownloadFile(url, ssl_cert=ssl_cert,
+                                   ssl_key=ssl_key)['recordData']:
+      _addRecord(record)
+  stats.AddFile(num_bytes)
+  logging.debug('Downloaded %d records from %s (%d/%d files)', len(records),
+                url, stats.num_files_done, stats.num_files)
+  return records
+
+
+def _processDump(sas, dump, ssl_cert=None, ssl_key=None,
+                 num_workers=DEFAULT_NUM_WORKERS, stats=None):
   """Clears any existing dump data and downloads current data.
 
+  The dump files are downloaded concurrently, but the records are stored in
+  the order of the files in the dump message. The connections are kept alive
+  between the files, so that each worker thread reuses its TLS session.
+
   Args:
     sas: A SasInterface object to request
     dump: The https://base_url/version/dump message response, used to extract
       the files to be downloaded.
     ssl_cert: Optional. ssl certificate to use when making get requests.
     ssl_key: Optional. ssl key to use when making get requests.
+    num_workers: Optional. The number of files downloaded concurrently.
+    stats: Optional. A |DownloadStats| to be updated during the download.
   Returns:
     A Full Activity Dump with the FAD data from the given SAS as a dictionary
     with the fields: cbsd, esc_sensor, zone. Each field is a list of the
@@ -112,17 +203,41 @@ def _processDump(sas, dump, ssl_cert=None, ssl_key=None):
       request does not return 200.
   """
   util.assertContainsRequiredFields('FullActivityDump.schema.json', dump)
-  dump_data = {'cbsd': [], 'esc_sensor': [], 'zone': []}
+  dump_files = []
   for dump_file in dump['files']:
     if dump_file['recordType'] == 'coordination':
       logging.debug(
           'Coordination event record skipped in downloading Full Activity Dump')
       continue
     util.assertContainsRequiredFields('ActivityDumpFile.schema.json', dump_file)
-    dump_data[dump_file['recordType']].extend(
-        sas.DownloadFile(dump_file['url'], ssl_cert=ssl_cert,
-                         ssl_key=ssl_key)['recordData'])
+    dump_files.append(dump_file)
+
+  if stats is None:
+    stats = DownloadStats()
+  stats.Start(len(dump_files))
+  def _download(dump_file):
+    return _downloadFileRecords(sas, dump_file['url'], ssl_cert, ssl_key, stats)
+  num_workers = max(1, min(num_workers, len(dump_files)))
+  with request_handler.KeepAlive():
+    if num_workers == 1:
+      files_records = map(_download, dump_files)
+    else:
+      pool = ThreadPool(num_workers)
+      try:
+        files_records = pool.map(_download, dump_files)
+      finally:
+        pool.close()
+        pool.join()
+
+  dump_data = {'cbsd': [], 'esc_sensor': [], 'zone': []}
+  for dump_file, records in zip(dump_files, files_records):
+    dump_data[dump_file['recordType']].extend(records)
     logging.debug('%s record added to Full Activity Dump',
                   dump_file['recordType'])
+  records_per_sec, bytes_per_sec = stats.Throughput()
+  logging.info('Full Activity Dump downloaded: %d files, %d records, %d bytes '
+               'in %.1fs (%.0f records/s, %.0f bytes/s)',
+               stats.num_files_done, stats.num_records, stats.num_bytes,
+               stats.elapsed_time, records_per_sec, bytes_per_sec)
 
   return FullActivityDump(dump_data)
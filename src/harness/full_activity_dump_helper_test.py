@@ -19,6 +19,11 @@ import unittest
 import mock
 import logging
 import copy
+import time
+import pycurl
+import request_handler
+from request_handler_test import FakeCurl
+import sas_interface
 
 
 class FullActivityDumpHelperTest(unittest.TestCase):
@@ -110,3 +115,67 @@ class FullActivityDumpHelperTest(unittest.TestCase):
             'esc_sensor': [{'d': 1}],
             'zone': [{'g': 1}]
         })
+
+  def test_download_stats(self):
+    """Tests the download statistics."""
+    mock_sas = FullActivityDumpHelperTest.getMockSasInterface()
+    stats = full_activity_dump_helper.DownloadStats()
+    full_activity_dump_helper.getFullActivityDumpSasTestHarness(
+        mock_sas, num_workers=1, stats=stats)
+    self.assertEqual(stats.num_files, 4)
+    self.assertEqual(stats.num_files_done, 4)
+    self.assertEqual(stats.num_records, 5)
+    self.assertEqual(stats.num_bytes, 0)
+
+  def test_streaming_download_keeps_file_order(self):
+    """Tests that records are streamed and kept in dump file order."""
+    def downloadFileRecords(url, record_fn, ssl_cert=None, ssl_key=None):
+      # Finish the first file last.
+      if url == 'cbsd/cbsd_test_url.json':
+        time.sleep(0.1)
+      records = FullActivityDumpHelperTest.downloadFileHelper(url)['recordData']
+      for record in records:
+        record_fn(record)
+      return 10 * len(records)
+
+    mock_sas = mock.MagicMock(spec=sas_interface.SasInterface)
+    mock_sas.GetFullActivityDump.side_effect = FullActivityDumpHelperTest.getFullActivityDumpHelper
+    mock_sas.DownloadFileRecords.side_effect = downloadFileRecords
+    stats = full_activity_dump_helper.DownloadStats()
+    fad = full_activity_dump_helper.getFullActivityDumpSasTestHarness(
+        mock_sas, num_workers=4, stats=stats)
+    mock_sas.DownloadFile.assert_not_called()
+    self.assertDictEqual(
+        fad.getData(), {
+            'cbsd': [{'a': 1, 'b': 2}, {'c': 3}, {'j': 1}],
+            'esc_sensor': [{'d': 1}],
+            'zone': [{'g': 1}]
+        })
+    self.assertEqual(stats.num_records, 5)
+    self.assertEqual(stats.num_bytes, 50)
+
+  def test_streaming_download_reuses_connections(self):
+    """Tests that the connections are reused across the dump files."""
+    config = request_handler.TlsConfig()
+    def downloadFileRecords(url, record_fn, ssl_cert=None, ssl_key=None):
+      parser = request_handler.RecordStreamParser(record_fn)
+      num_bytes = request_handler.RequestGetStream(url, config, parser.Feed)
+      parser.Close()
+      return num_bytes
+
+    mock_sas = mock.MagicMock(spec=sas_interface.SasInterface)
+    mock_sas.GetFullActivityDump.side_effect = FullActivityDumpHelperTest.getFullActivityDumpHelper
+    mock_sas.DownloadFileRecords.side_effect = downloadFileRecords
+    for num_workers in [1, 2]:
+      connections = []
+      def newCurl():
+        connections.append(FakeCurl(200, ['{"recordData": [{"a": 1}]}']))
+        return connections[-1]
+      with mock.patch.object(pycurl, 'Curl', side_effect=newCurl):
+        fad = full_activity_dump_helper.getFullActivityDumpSasTestHarness(
+            mock_sas, num_workers=num_workers)
+      self.assertEqual(len(fad.getData()['cbsd']), 2)
+      # At most one connection per worker thread, all closed at the end.
+      self.assertLessEqual(len(connections), num_workers)
+      self.assertEqual(sum(conn.num_performs for conn in connections), 4)
+      self.assertTrue(all(conn.closed for conn in connections))
@@ -13,8 +13,12 @@
 #    limitations under the License.
 """Tests for the Full Activity Dump object."""
 
+import glob
+import json
+import os
 import unittest
 from full_activity_dump import FullActivityDump
+from reference_models.common import data
 
 
 class FullActivityDumpTest(unittest.TestCase):
@@ -124,3 +128,77 @@ class FullActivityDumpTest(unittest.TestCase):
         'esc_sensor': [],
         'zone': []
     })
+
+  @staticmethod
+  def makeCbsdRecord(cbsd_id, category, latitude, frequency_ranges):
+    return {
+        'id': cbsd_id,
+        'registration': {
+            'cbsdCategory': category,
+            'installationParam': {'latitude': latitude, 'longitude': -80.}
+        },
+        'grants': [{
+            'id': 'grant_%d' % k,
+            'operationParam': {
+                'maxEirp': 20,
+                'operationFrequencyRange': {
+                    'lowFrequency': low_freq, 'highFrequency': high_freq}
+            }
+        } for k, (low_freq, high_freq) in enumerate(frequency_ranges)]
+    }
+
+  def test_cbsd_index(self):
+    """Tests the columnar index of the cbsd records."""
+    records = [
+        self.makeCbsdRecord('cbsd/fcc1/' +
+                            '50de66b735d30738618568294742fcf1dfa52a47',
+                            'A', 37., [(3550e6, 3560e6), (3600e6, 3620e6)]),
+        self.makeCbsdRecord('cbsd/b', 'B', 38., []),
+        self.makeCbsdRecord('cbsd/c', 'B', 39., [(3560e6, 3570e6)])]
+    fad = FullActivityDump({'cbsd': records})
+    index = fad.getCbsdIndex()
+    self.assertEqual(index.ids, ['cbsd/fcc1/' +
+                                 '50de66b735d30738618568294742fcf1dfa52a47',
+                                 'cbsd/b', 'cbsd/c'])
+    self.assertEqual(list(index.latitudes), [37., 38., 39.])
+    self.assertEqual(list(index.is_cat_b), [False, True, True])
+    self.assertEqual(list(index.grant_cbsd_idxs), [0, 0, 2])
+    self.assertEqual(list(index.low_frequencies), [3550e6, 3600e6, 3560e6])
+    self.assertEqual(list(index.terminated), [False, False, False])
+    self.assertEqual(index.getCbsdIdx('cbsd/c'), 2)
+    self.assertIsNone(index.getCbsdIdx('cbsd/d'))
+    self.assertEqual(index.getCbsdIdxByFccIdAndSerial('fcc1', 'serial'), 0)
+    self.assertEqual(list(index.getCbsdIdxs(['cbsd/c', 'cbsd/d', 'cbsd/b'])),
+                     [1, 2])
+    self.assertEqual(fad.getCbsdRecordsByIds(['cbsd/c', 'cbsd/b']),
+                     records[1:])
+    # Frequency overlap is strict.
+    self.assertEqual(list(index.getGrantIdxsInFrequencyRange(3555e6, 3610e6)),
+                     [0, 1, 2])
+    self.assertEqual(list(index.getGrantIdxsInFrequencyRange(3560e6, 3600e6)),
+                     [2])
+    self.assertEqual(list(index.getCbsdIdxsInFrequencyRange(3500e6, 3700e6)),
+                     [0, 2])
+    # Index reflects the current records, including in place changes.
+    records[2]['grants'].pop()
+    self.assertEqual(len(fad.getCbsdIndex().grant_records), 2)
+    fad.setCbsdRecords(records[1:])
+    self.assertEqual(fad.getCbsdIndex().ids, ['cbsd/b', 'cbsd/c'])
+
+  def test_grant_info_from_cbsd_index(self):
+    """Tests the grant info extracted from the index of the cbsd records."""
+    test_dir = os.path.join(os.path.dirname(__file__), 'reference_models',
+                            'interference', 'test_data')
+    records = [json.load(open(filename))
+               for filename in sorted(glob.glob(os.path.join(test_dir,
+                                                             'cbsd_*.json')))]
+    fad = FullActivityDump({'cbsd': records})
+    self.assertEqual(
+        data.getAllGrantInfoFromCbsdIndex(fad.getCbsdIndex(), False),
+        data.getAllGrantInfoFromCbsdDataDump(records, False))
+    ppa_record = {'ppaInfo': {'cbsdReferenceId': [records[0]['id'],
+                                                  records[3]['id']]}}
+    self.assertEqual(
+        data.getAllGrantInfoFromCbsdIndex(fad.getCbsdIndex(),
+                                          ppa_record=ppa_record),
+        data.getAllGrantInfoFromCbsdDataDump(records, ppa_record=ppa_record))
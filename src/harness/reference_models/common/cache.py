@@ -13,30 +13,129 @@
 #    limitations under the License.
 
 """Cache engine.
+
+Provides:
+  - an in-process LRU memoizing cache (`LruCache` and `CacheManager`).
+  - a persistent on-disk store (`PersistentCache`), backed by a SQLite
+    database, which can be plugged under the in-process cache of a
+    `CacheManager` or `LruCache` for reusing results (typically path losses)
+    across runs.
+  - a cross-process shared store (`SharedCache`), using the same backend on a
+    temporary file, for sharing results between the |mpool| worker processes.
+  - a binary cache of text data grids (`LoadTextArray`), memory-mapped so that
+    the parsing cost is paid only once across processes and runs.
+
+Both stores can be bounded in size (LRU eviction) and maintain hit/miss
+counters aggregated over all processes (see `Info()`).
+
+Typical usage of persistent store:
+  store = PersistentCache('/path/to/cache_dir', version='ned_2018')
+  with CacheManager(wf_itm.CalcItmPropagationLoss, store=store,
+                    version='itm_1'):
+    # run the code using the ITM propagation model
+
+The store keys include both the data `version` of the store (for example the
+terrain data version) and the `version` of the memoized function, which shall
+be changed whenever the function results change (model or code change).
+
+Typical usage of shared store:
+  store = SharedCache(maxsize=100000)
+  fn = functools.partial(my_worker_fn, store=store)
+  pool.map(fn, points)  # with my_worker_fn using a `CacheManager(store=store)`
+  logging.info('Shared cache: %s', store.Info())
+  store.Close()
 """
+import cPickle as pickle
+import functools
+import hashlib
+import logging
+import numbers
+import os
+import shutil
+import sqlite3
+import tempfile
+import thread
+import time
+from collections import namedtuple
+
+import enum
 import functools32
+import numpy as np
+
+from reference_models.common import telemetry
 
-# Note: for now only use the lru_cache from functools, backported to Python 2.7 as
-# functools32. A better cache engine needs to be implemented that:
-# 1) supports sharing across process (optionally)
-# 2) ...
+# Note: the in-process cache uses the lru_cache from functools, backported to
+# Python 2.7 as functools32. Persistent or cross-process sharing is provided by
+# the optional stores (see `PersistentCache` and `SharedCache`).
 
 
 # A cache decorator
-# Note: for now the cache simply wraps the functools.lrucache.
-# Will be expanded for multiprocess support.
-def LruCache(maxsize=None):
+def LruCache(maxsize=None, store=None, version=''):
   """LRU Cache decorator.
 
   Args:
     maxsize: the maximum cache size, or None for unlimited size.
+    store: an optional persistent or shared store (`PersistentCache` or
+      `SharedCache`) used under the in-process LRU cache.
+    version: the version of the function, part of the store keys.
   """
   def wrapper(fn):
+    if store is not None:
+      fn = store.Memoize(fn, version)
     return functools32.lru_cache(maxsize=maxsize)(fn)
 
   return wrapper
 
 
+# Binary cache of text data files
+def LoadTextArray(txt_file, dtype=float):
+  """Loads an array from a text file, using a binary cache.
+
+  On first load, the array parsed by `np.loadtxt()` is saved alongside the text
+  file as a `.npy` file. Subsequent loads (in any process) memory-map this
+  binary file instead of parsing the text file.
+  The binary file is regenerated if older than the text file. If it cannot
+  be written (for example read-only directory), the parsed array is returned.
+
+  Args:
+    txt_file: The path of the text file.
+    dtype: The data type of the array.
+
+  Returns:
+    The array, as a ndarray (read-only memory-mapped if loaded from the
+    binary cache).
+  """
+  npy_file = txt_file + '.npy'
+  try:
+    if os.path.getmtime(npy_file) >= os.path.getmtime(txt_file):
+      data = np.load(npy_file, mmap_mode='r')
+      if data.dtype == np.dtype(dtype):
+        # Use a plain ndarray view on the mapping.
+        return data.view(np.ndarray)
+  except (IOError, OSError, ValueError):
+    pass
+
+  data = np.loadtxt(txt_file, dtype=dtype)
+  # Write atomically, as several processes can do it concurrently.
+  try:
+    fd, tmp_file = tempfile.mkstemp(suffix='.npy',
+                                    dir=os.path.dirname(npy_file))
+  except (IOError, OSError):
+    logging.warning('Cannot write binary cache %s', npy_file)
+    return data
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      np.save(f, data)
+    os.rename(tmp_file, npy_file)
+  except (IOError, OSError):
+    logging.warning('Cannot write binary cache %s', npy_file)
+    try:
+      os.remove(tmp_file)
+    except OSError:
+      pass
+  return data
+
+
 # Cache management
 class CacheManager(object):
   """Cache context manager.
@@ -48,22 +147,42 @@ class CacheManager(object):
     - get repeatable results of function with random component:
     the function results will be the same within one 'with' context.
 
+  Optionally a persistent `store` can be used under the LRU cache, in which
+  case the function results are also read from (and written to) that store.
+  Note that the store is not cleared when getting out of the 'with' context.
+
   Usage:
     #  Temporarily install a LRU memoizing cache on some function.
     with CacheManager(my_function, maxsize=None) as cm:
       # run the code using my_function
+
+    # Same with a persistent store
+    with CacheManager(my_function,
+                      store=PersistentCache(cache_dir, data_version),
+                      version=my_function_version) as cm:
+      # run the code using my_function
   """
-  def __init__(self, fn, maxsize=None):
+  def __init__(self, fn, maxsize=None, store=None, version=''):
     self._fn = fn
     self._wrapper_fn = None
     self._maxsize = maxsize
+    self._store = store
+    self._version = version
 
   def __enter__(self):
-    self._wrapper_fn = functools32.lru_cache(maxsize=self._maxsize)(self._fn)
+    fn = self._fn
+    if self._store is not None:
+      fn = self._store.Memoize(fn, self._version)
+    self._wrapper_fn = functools32.lru_cache(maxsize=self._maxsize)(fn)
     self._overrideModuleFunctionWith(self._wrapper_fn)
     return self
 
   def __exit__(self, *args):
+    if self._store is not None:
+      self._store.Flush()
+    info = self.cache_info()
+    if info is not None:
+      telemetry.AddCacheInfo(self._fn.__name__, info.hits, info.misses)
     self.clear()
     self._overrideModuleFunctionWith(self._fn)
 
@@ -73,7 +192,338 @@ class CacheManager(object):
 
   def cache_info(self):
     if self._wrapper_fn:
-      self._wrapper_fn.cache_info()
+      return self._wrapper_fn.cache_info()
 
   def _overrideModuleFunctionWith(self, fn):
     self._fn.func_globals[self._fn.__name__] = fn
+
+
+# Persistent store
+def _Quantize(value, decimals):
+  """Returns a canonical (hashable and repr stable) version of a value.
+
+  All numbers are converted into floats rounded to `decimals` digits, and
+  all sequences into tuples.
+
+  Raises:
+    TypeError: if the value (or one of its items) is of an unsupported type,
+      which may not have a stable representation across processes and runs.
+  """
+  if value is None or isinstance(value, (bool, np.bool_, basestring)):
+    return value
+  if isinstance(value, (numbers.Number, np.number)):
+    return round(float(value), decimals)
+  if isinstance(value, enum.Enum):
+    return repr(value)
+  if isinstance(value, dict):
+    return tuple((_Quantize(k, decimals), _Quantize(v, decimals))
+                 for k, v in sorted(value.items()))
+  if isinstance(value, (list, tuple, np.ndarray)):
+    return tuple(_Quantize(v, decimals) for v in value)
+  raise TypeError('Unsupported type for a persistent cache key: %s'
+                  % type(value).__name__)
+
+
+# The store statistics, aggregated over all processes.
+StoreInfo = namedtuple('StoreInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class PersistentCache(object):
+  """Persistent on-disk cache, backed by a SQLite database.
+
+  The cache entries are keyed by a hash of the function name and version, the
+  data `version` and the quantized function arguments. The stored values are
+  pickled function results.
+
+  The store can be passed to worker processes (for example within a
+  `functools.partial`): each process opens its own database connection, and
+  all processes share the same entries.
+
+  If a `maxsize` is specified, the least recently used entries are evicted
+  when the store grows beyond that size.
+
+  Lookups are plain reads and never take the database write lock: the hit and
+  miss counters and the entry access times are accumulated in memory, and
+  written in batch on the next `Set`, every `flush_period` lookups, or on an
+  explicit `Flush`. The LRU eviction order is therefore approximate across
+  processes: a recent hit in another process is only taken into account once
+  that process has flushed.
+
+  Attributes:
+    db_path: The path of the SQLite database file.
+    version: The data version string, part of all keys. Typically used to
+      hold the terrain data version, so that a change of the underlying data
+      does not reuse stale results.
+    decimals: The number of decimals used for quantizing the float arguments.
+    maxsize: The maximum number of entries, or None for unlimited size.
+    flush_period: The number of lookups after which the pending counters and
+      access times are written to the database.
+    hits: The number of hits in the current process.
+    misses: The number of misses in the current process.
+  """
+  def __init__(self, cache_dir, version, name='cache', decimals=7,
+               maxsize=None, flush_period=1000):
+    """Initializes the persistent cache.
+
+    Args:
+      cache_dir: The directory holding the database file (created if needed).
+      version: The data version string, for example the terrain data version.
+        Required so that results of a different data set are never reused.
+      name: The name of the database (file is `<cache_dir>/<name>.sqlite`).
+      decimals: The number of decimals used for quantizing float arguments.
+        The default 7 corresponds to about 1cm for latitudes and longitudes.
+      maxsize: The maximum number of entries, or None for unlimited size.
+      flush_period: The number of lookups between writes of the pending
+        counters and access times.
+    """
+    self._cache_dir = cache_dir
+    self.db_path = os.path.join(cache_dir, name + '.sqlite')
+    self.version = version
+    self.decimals = decimals
+    self.maxsize = maxsize
+    self.flush_period = flush_period
+    self.hits = 0
+    self.misses = 0
+    self._conns = {}
+    self._pending = {}
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state['_conns'] = {}
+    state['_pending'] = {}
+    state['hits'] = 0
+    state['misses'] = 0
+    return state
+
+  def _Connection(self):
+    """Returns the database connection for the current process and thread."""
+    conn_key = (os.getpid(), thread.get_ident())
+    conn = self._conns.get(conn_key)
+    if conn is None:
+      if not os.path.isdir(self._cache_dir):
+        try:
+          os.makedirs(self._cache_dir)
+        except OSError:
+          if not os.path.isdir(self._cache_dir):
+            raise
+      conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None,
+                             check_same_thread=False)
+      # Write ahead log allows concurrent readers during writes.
+      conn.execute('PRAGMA journal_mode=WAL')
+      conn.execute('PRAGMA synchronous=NORMAL')
+      with _Transaction(conn):
+        conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                     '(key TEXT PRIMARY KEY, value BLOB, access REAL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_access '
+                     'ON cache (access)')
+        conn.execute('CREATE TABLE IF NOT EXISTS stats '
+                     '(name TEXT PRIMARY KEY, value INTEGER)')
+        for name in ['hits', 'misses', 'evictions', 'size']:
+          conn.execute('INSERT OR IGNORE INTO stats VALUES (?, 0)', (name,))
+      self._conns[conn_key] = conn
+    return conn
+
+  def _Pending(self):
+    """Returns the pending statistics of the current process and thread."""
+    conn_key = (os.getpid(), thread.get_ident())
+    pending = self._pending.get(conn_key)
+    if pending is None:
+      pending = self._pending[conn_key] = _PendingStats()
+    return pending
+
+  def _WritePending(self, conn, pending):
+    """Writes the pending statistics. Must be called within a transaction."""
+    if pending.hits or pending.misses:
+      conn.execute("UPDATE stats SET value=value+? WHERE name='hits'",
+                   (pending.hits,))
+      conn.execute("UPDATE stats SET value=value+? WHERE name='misses'",
+                   (pending.misses,))
+    if pending.accessed:
+      conn.executemany('UPDATE cache SET access=? WHERE key=?',
+                       [(access, key)
+                        for key, access in pending.accessed.iteritems()])
+    pending.Reset()
+
+  def Flush(self):
+    """Writes the pending counters and access times of the current thread."""
+    pending = self._Pending()
+    if pending.IsEmpty():
+      return
+    conn = self._Connection()
+    with _Transaction(conn):
+      self._WritePending(conn, pending)
+
+  def MakeKey(self, fn, args, kwargs, fn_version=''):
+    """Returns the key of a function call.
+
+    Raises:
+      TypeError: if an argument type is not supported (see `_Quantize`).
+    """
+    key = (fn.__module__, fn.__name__, fn_version, self.version,
+           _Quantize(args, self.decimals), _Quantize(kwargs, self.decimals))
+    return hashlib.sha1(repr(key)).hexdigest()
+
+  def Get(self, key):
+    """Gets a value from the store, and updates the hit/miss counters.
+
+    The counters and access time are only updated in memory, see `Flush`.
+
+    Returns:
+      A tuple (found, value), where found is False if the key is not in store.
+    """
+    row = self._Connection().execute(
+        'SELECT value FROM cache WHERE key=?', (key,)).fetchone()
+    pending = self._Pending()
+    if row is None:
+      self.misses += 1
+      pending.misses += 1
+    else:
+      self.hits += 1
+      pending.hits += 1
+      pending.accessed[key] = time.time()
+    if pending.hits + pending.misses >= self.flush_period:
+      self.Flush()
+    if row is None:
+      return False, None
+    return True, pickle.loads(str(row[0]))
+
+  def Set(self, key, value):
+    """Sets a value in the store, evicting the oldest entries if needed."""
+    value = sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    conn = self._Connection()
+    with _Transaction(conn):
+      # Write the pending access times first, so that eviction sees them.
+      self._WritePending(conn, self._Pending())
+      is_new = conn.execute('UPDATE cache SET value=?, access=? WHERE key=?',
+                            (value, time.time(), key)).rowcount == 0
+      if not is_new:
+        return
+      conn.execute('INSERT INTO cache (key, value, access) VALUES (?, ?, ?)',
+                   (key, value, time.time()))
+      conn.execute("UPDATE stats SET value=value+1 WHERE name='size'")
+      if self.maxsize is None:
+        return
+      size = conn.execute("SELECT value FROM stats WHERE name='size'").fetchone()[0]
+      if size > self.maxsize:
+        num_evicted = conn.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY access LIMIT ?)',
+            (size - self.maxsize,)).rowcount
+        conn.execute("UPDATE stats SET value=value-? WHERE name='size'",
+                     (num_evicted,))
+        conn.execute("UPDATE stats SET value=value+? WHERE name='evictions'",
+                     (num_evicted,))
+
+  def Clear(self):
+    """Removes all entries from the store (counters are kept)."""
+    conn = self._Connection()
+    with _Transaction(conn):
+      conn.execute('DELETE FROM cache')
+      conn.execute("UPDATE stats SET value=0 WHERE name='size'")
+
+  def Info(self):
+    """Returns the store statistics (all processes) as a |StoreInfo|.
+
+    Only the flushed counters of other processes and threads are included.
+    """
+    self.Flush()
+    stats = dict(self._Connection().execute('SELECT name, value FROM stats'))
+    return StoreInfo(hits=stats['hits'], misses=stats['misses'],
+                     evictions=stats['evictions'], maxsize=self.maxsize,
+                     currsize=stats['size'])
+
+  def __len__(self):
+    return self.Info().currsize
+
+  def Memoize(self, fn, version=''):
+    """Returns a memoized version of `fn` using this store.
+
+    Args:
+      fn: The function to memoize.
+      version: The version of the function, part of the keys. It shall be
+        changed whenever the function results change (model or code change).
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      key = self.MakeKey(fn, args, kwargs, version)
+      found, value = self.Get(key)
+      if not found:
+        value = fn(*args, **kwargs)
+        self.Set(key, value)
+      return value
+    return wrapper
+
+
+class SharedCache(PersistentCache):
+  """Cross-process shared cache.
+
+  This is a `PersistentCache` on a temporary file, intended for sharing
+  results between worker processes during a run (for example between the
+  |mpool| workers, by passing the store in the mapped function arguments).
+
+  The temporary file is removed by the creating process on `Close()`.
+  """
+  def __init__(self, maxsize=None, decimals=7):
+    """Initializes the shared cache.
+
+    Args:
+      maxsize: The maximum number of entries, or None for unlimited size.
+      decimals: The number of decimals used for quantizing float arguments.
+    """
+    # No data version needed, as the store only lives during the run.
+    super(SharedCache, self).__init__(tempfile.mkdtemp(prefix='sas_cache_'),
+                                      version='', name='shared',
+                                      decimals=decimals, maxsize=maxsize)
+    self._owner_pid = os.getpid()
+
+  def Close(self):
+    """Closes the store, removing the temporary file if creating process."""
+    if os.getpid() != self._owner_pid:
+      self.Flush()
+    pid = os.getpid()
+    for (conn_pid, _), conn in self._conns.items():
+      if conn_pid == pid:
+        conn.close()
+    self._conns = {}
+    self._pending = {}
+    if os.getpid() == self._owner_pid:
+      shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+
+class _PendingStats(object):
+  """The statistics of a store not yet written to the database.
+
+  Attributes:
+    hits: The number of pending hits.
+    misses: The number of pending misses.
+    accessed: A dict of the last access time of the hit keys.
+  """
+  def __init__(self):
+    self.Reset()
+
+  def Reset(self):
+    self.hits = 0
+    self.misses = 0
+    self.accessed = {}
+
+  def IsEmpty(self):
+    return not (self.hits or self.misses or self.accessed)
+
+
+class _Transaction(object):
+  """Context manager for an immediate transaction on a SQLite connection.
+
+  The connection must be in autocommit mode (isolation_level=None).
+  """
+  def __init__(self, conn):
+    self._conn = conn
+
+  def __enter__(self):
+    self._conn.execute('BEGIN IMMEDIATE')
+
+  def __exit__(self, exc_type, *args):
+    if exc_type is None:
+      self._conn.execute('COMMIT')
+    else:
+      self._conn.execute('ROLLBACK')
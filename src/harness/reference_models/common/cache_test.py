@@ -0,0 +1,213 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import functools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import numpy as np
+
+from reference_models.common import cache
+
+_num_calls = [0]
+
+
+def _PathLoss(lat, lon, height, reliabilities=None):
+  _num_calls[0] += 1
+  loss = 100 + lat + lon + height
+  if reliabilities is not None:
+    loss = [loss + r for r in reliabilities]
+  return loss
+
+
+def _CallPathLoss(*args, **kwargs):
+  # Use the module level function, as overriden by the cache manager.
+  return _PathLoss(*args, **kwargs)
+
+
+def _WorkerPathLoss(lat, store):
+  # Runs in a worker process: returns the number of actual computations.
+  _num_calls[0] = 0
+  with cache.CacheManager(_PathLoss, store=store):
+    _CallPathLoss(lat, 2, 3)
+    _CallPathLoss(lat + 1, 2, 3)
+  return _num_calls[0]
+
+
+class TestCache(unittest.TestCase):
+
+  def setUp(self):
+    _num_calls[0] = 0
+    self.cache_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.cache_dir)
+
+  def test_lru_cache_manager(self):
+    with cache.CacheManager(_PathLoss):
+      self.assertEqual(_CallPathLoss(1, 2, 3), 106)
+      self.assertEqual(_CallPathLoss(1, 2, 3), 106)
+      self.assertEqual(_num_calls[0], 1)
+    self.assertEqual(_CallPathLoss(1, 2, 3), 106)
+    self.assertEqual(_num_calls[0], 2)
+
+  def test_persistent_cache(self):
+    store = cache.PersistentCache(self.cache_dir, 'v1')
+    with cache.CacheManager(_PathLoss, store=store):
+      self.assertEqual(_CallPathLoss(1.5, 2, 3), 106.5)
+      self.assertEqual(_CallPathLoss(1, 2, 3, reliabilities=(0.1, 0.5)),
+                       [106.1, 106.5])
+    self.assertEqual(_num_calls[0], 2)
+    self.assertEqual(len(store), 2)
+
+    # New store on same directory reuses the previous results
+    store = cache.PersistentCache(self.cache_dir, 'v1')
+    with cache.CacheManager(_PathLoss, store=store):
+      self.assertEqual(_CallPathLoss(1.5, 2, 3), 106.5)
+      self.assertEqual(_CallPathLoss(1, 2, 3, reliabilities=(0.1, 0.5 + 1e-12)),
+                       [106.1, 106.5])
+      # Quantized arguments
+      self.assertEqual(_CallPathLoss(1.5 + 1e-9, 2, 3), 106.5)
+      self.assertEqual(_num_calls[0], 2)
+      # New link is computed
+      self.assertEqual(_CallPathLoss(1.5, 2, 4), 107.5)
+      self.assertEqual(_num_calls[0], 3)
+
+  def test_persistent_cache_version(self):
+    with cache.CacheManager(_PathLoss,
+                            store=cache.PersistentCache(self.cache_dir, version='v1')):
+      _CallPathLoss(1, 2, 3)
+    with cache.CacheManager(_PathLoss,
+                            store=cache.PersistentCache(self.cache_dir, version='v2')):
+      _CallPathLoss(1, 2, 3)
+    self.assertEqual(_num_calls[0], 2)
+    # Same data version, but a different function version.
+    with cache.CacheManager(_PathLoss,
+                            store=cache.PersistentCache(self.cache_dir, version='v2'),
+                            version='fn2'):
+      _CallPathLoss(1, 2, 3)
+    self.assertEqual(_num_calls[0], 3)
+
+  def test_persistent_cache_unsupported_args(self):
+    store = cache.PersistentCache(self.cache_dir, 'v1')
+    with self.assertRaises(TypeError):
+      store.MakeKey(_PathLoss, (object(), 2, 3), {})
+    with self.assertRaises(TypeError):
+      store.MakeKey(_PathLoss, (1, 2, 3), {'reliabilities': [object()]})
+
+  def test_persistent_cache_clear(self):
+    store = cache.PersistentCache(self.cache_dir, 'v1', name='other')
+    store.Memoize(_PathLoss)(1, 2, 3)
+    self.assertEqual(len(store), 1)
+    store.Clear()
+    self.assertEqual(len(store), 0)
+
+  def test_lru_cache_decorator_with_store(self):
+    store = cache.PersistentCache(self.cache_dir, 'v1')
+    fn = cache.LruCache(store=store)(_PathLoss)
+    self.assertEqual(fn(1, 2, 3), 106)
+    fn = cache.LruCache(store=store)(_PathLoss)
+    self.assertEqual(fn(1, 2, 3), 106)
+    self.assertEqual(_num_calls[0], 1)
+
+  def test_bounded_store(self):
+    store = cache.PersistentCache(self.cache_dir, 'v1', maxsize=3)
+    fn = store.Memoize(_PathLoss)
+    for lat in [1, 2, 3]:
+      fn(lat, 2, 3)
+    fn(1, 2, 3)  # Refresh oldest entry
+    fn(4, 2, 3)  # Evicts entry 2
+    self.assertEqual(len(store), 3)
+    info = store.Info()
+    self.assertEqual((info.hits, info.misses, info.evictions, info.maxsize,
+                      info.currsize), (1, 4, 1, 3, 3))
+    self.assertEqual((store.hits, store.misses), (1, 4))
+    self.assertTrue(store.Get(store.MakeKey(_PathLoss, (1, 2, 3), {}))[0])
+    self.assertFalse(store.Get(store.MakeKey(_PathLoss, (2, 2, 3), {}))[0])
+
+  def test_store_lookups_do_not_write(self):
+    store = cache.PersistentCache(self.cache_dir, 'v1', flush_period=3)
+    key = store.MakeKey(_PathLoss, (1, 2, 3), {})
+    store.Set(key, 106)
+    wal_size = os.path.getsize(store.db_path + '-wal')
+    store.Get(key)
+    store.Get('missing')
+    # Counters and access time are pending in memory.
+    self.assertEqual(os.path.getsize(store.db_path + '-wal'), wal_size)
+    self.assertEqual((store.hits, store.misses), (1, 1))
+    # Written in batch after `flush_period` lookups.
+    store.Get(key)
+    self.assertGreater(os.path.getsize(store.db_path + '-wal'), wal_size)
+    other = cache.PersistentCache(self.cache_dir, 'v1')
+    info = other.Info()
+    self.assertEqual((info.hits, info.misses), (2, 1))
+
+  def test_shared_cache_across_processes(self):
+    store = cache.SharedCache(maxsize=100)
+    # Populate from this process.
+    self.assertEqual(_WorkerPathLoss(1, store), 2)
+    self.assertEqual(_WorkerPathLoss(3, store), 2)
+    pool = multiprocessing.Pool(2)
+    try:
+      num_calls = pool.map(functools.partial(_WorkerPathLoss, store=store),
+                           [1, 2, 3])
+    finally:
+      pool.close()
+      pool.join()
+    # All links already computed by the main process.
+    self.assertEqual(num_calls, [0, 0, 0])
+    info = store.Info()
+    self.assertEqual((info.hits, info.misses, info.currsize), (6, 4, 4))
+    store.Close()
+
+  def test_load_text_array(self):
+    txt_file = os.path.join(self.cache_dir, 'grid.txt')
+    np.savetxt(txt_file, np.arange(12).reshape(3, 4), fmt='%d')
+    data = cache.LoadTextArray(txt_file)
+    self.assertTrue(os.path.isfile(txt_file + '.npy'))
+    self.assertTrue(np.array_equal(data, np.loadtxt(txt_file)))
+    # Second load from the binary cache
+    cached_data = cache.LoadTextArray(txt_file)
+    self.assertIsInstance(cached_data.base, np.memmap)
+    self.assertTrue(np.array_equal(cached_data, data))
+    # Other dtype: not used, and regenerated
+    int_data = cache.LoadTextArray(txt_file, dtype=int)
+    self.assertEqual(int_data.dtype, np.dtype(int))
+    self.assertEqual(np.load(txt_file + '.npy').dtype, np.dtype(int))
+    # Updated text file
+    np.savetxt(txt_file, np.ones((2, 2)), fmt='%d')
+    os.utime(txt_file, (time.time() + 10, time.time() + 10))
+    self.assertTrue(np.array_equal(cache.LoadTextArray(txt_file, dtype=int),
+                                   np.ones((2, 2))))
+
+  def test_load_text_array_write_failure(self):
+    txt_file = os.path.join(self.cache_dir, 'grid.txt')
+    np.savetxt(txt_file, np.arange(12).reshape(3, 4), fmt='%d')
+    def FailingRename(src, dst):
+      # The temporary file is gone as well (for example disk cleanup).
+      os.remove(src)
+      raise OSError('Cannot rename')
+    with mock.patch.object(os, 'rename', side_effect=FailingRename):
+      data = cache.LoadTextArray(txt_file)
+    self.assertTrue(np.array_equal(data, np.loadtxt(txt_file)))
+    self.assertFalse(os.path.exists(txt_file + '.npy'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -78,6 +78,192 @@ class CbsdGrantInfo(namedtuple('CbsdGrantInfo',
     """Returns unique CBSD key (ie key based on installation params only)."""
     return self[0:8]
 
+
+class GrantBatch(object):
+  """Columnar representation of a sequence of CBSD grants.
+
+  Holds the same fields as |CbsdGrantInfo| in ndarrays, one element per grant,
+  allowing to vectorize the computations over many grants. Undefined antenna
+  azimuth and beamwidth (None) are stored as NaN.
+
+  Slicing a batch returns a new batch holding views of the same arrays (no
+  copy), while indexing with an integer returns a |CbsdGrantInfo|.
+
+  Typical usage:
+    batch = GrantBatch.FromFad(sas_uut_fad, sas_th_fads)
+    cat_b = batch[batch.cbsd_category == 'B']
+    in_move_list = batch.IsIn(move_list)
+
+  Attributes:
+    latitude, longitude, height_agl, indoor_deployment, cbsd_category,
+    antenna_azimuth, antenna_gain, antenna_beamwidth, max_eirp, low_frequency,
+    high_frequency, is_managed_grant: The ndarray of each |CbsdGrantInfo|
+    field.
+  """
+  _FLOAT_FIELDS = ('latitude', 'longitude', 'height_agl', 'antenna_azimuth',
+                   'antenna_gain', 'antenna_beamwidth', 'max_eirp',
+                   'low_frequency', 'high_frequency')
+  _BOOL_FIELDS = ('indoor_deployment', 'is_managed_grant')
+  _OPTIONAL_FIELDS = ('antenna_azimuth', 'antenna_beamwidth')
+
+  def __init__(self, **fields):
+    """Initializes the batch from the sequences of each |CbsdGrantInfo| field.
+
+    The fields shall be all specified with the same length. Arrays of the
+    proper type are used without copy.
+    """
+    if sorted(fields) != sorted(CbsdGrantInfo._fields):
+      raise ValueError('GrantBatch requires all fields of CbsdGrantInfo.')
+    for name in self._FLOAT_FIELDS:
+      values = fields[name]
+      if name in self._OPTIONAL_FIELDS and not isinstance(values, np.ndarray):
+        values = [np.nan if v is None else v for v in values]
+      setattr(self, name, np.asarray(values, dtype=float))
+    for name in self._BOOL_FIELDS:
+      setattr(self, name, np.asarray(fields[name], dtype=bool))
+    self.cbsd_category = np.asarray(fields['cbsd_category'], dtype='S1')
+    if len(set(len(getattr(self, name)) for name in CbsdGrantInfo._fields)) > 1:
+      raise ValueError('GrantBatch fields shall have the same length.')
+
+  @classmethod
+  def FromGrants(cls, grants):
+    """Creates a batch from a sequence of |CbsdGrantInfo|."""
+    grants = list(grants)
+    if not grants:
+      return cls(**{name: [] for name in CbsdGrantInfo._fields})
+    return cls(**dict(zip(CbsdGrantInfo._fields, zip(*grants))))
+
+  @classmethod
+  def FromRequests(cls, registration_requests, grant_requests,
+                   is_managing_sas=True):
+    """Creates a batch from registration and grant requests.
+
+    See `getGrantsFromRequests()` for the arguments.
+    """
+    return cls.FromGrants(getGrantsFromRequests(
+        registration_requests, grant_requests, is_managing_sas))
+
+  @classmethod
+  def FromCbsdIndex(cls, cbsd_index, is_managing_sas=True, ppa_record=None):
+    """Creates a batch from a FAD CBSD index.
+
+    See `getAllGrantInfoFromCbsdIndex()` for the arguments.
+    """
+    grant_idxs = _getCbsdIndexGrantIdxs(cbsd_index, ppa_record)
+    # Registration information, only for the CBSDs having selected grants.
+    cbsd_idxs, grant_cbsd_pos = np.unique(
+        cbsd_index.grant_cbsd_idxs[grant_idxs], return_inverse=True)
+    registrations = [cbsd_index.records[cbsd_idx]['registration']
+                     for cbsd_idx in cbsd_idxs]
+    install_params = [reg['installationParam'] for reg in registrations]
+    def _CbsdField(key, dtype=float):
+      values = [param[key] for param in install_params]
+      if dtype is float:
+        values = [np.nan if v is None else v for v in values]
+      return np.array(values, dtype=dtype)
+    latitudes = cbsd_index.latitudes[cbsd_idxs]
+    longitudes = cbsd_index.longitudes[cbsd_idxs]
+    heights = _CbsdField('height')
+    is_amsl = np.array([param['heightType'] == 'AMSL'
+                        for param in install_params], dtype=bool)
+    if np.any(is_amsl):
+      # TODO(sbdt): move the feature of AMSL support within the prop models.
+      heights[is_amsl] -= drive.terrain_driver.GetTerrainElevation(
+          latitudes[is_amsl], longitudes[is_amsl])
+    categories = np.array([reg['cbsdCategory'] for reg in registrations],
+                          dtype='S1')
+
+    return cls(
+        latitude=latitudes[grant_cbsd_pos],
+        longitude=longitudes[grant_cbsd_pos],
+        height_agl=heights[grant_cbsd_pos],
+        indoor_deployment=_CbsdField('indoorDeployment', bool)[grant_cbsd_pos],
+        cbsd_category=categories[grant_cbsd_pos],
+        antenna_azimuth=_CbsdField('antennaAzimuth')[grant_cbsd_pos],
+        antenna_gain=_CbsdField('antennaGain')[grant_cbsd_pos],
+        antenna_beamwidth=_CbsdField('antennaBeamwidth')[grant_cbsd_pos],
+        max_eirp=cbsd_index.max_eirps[grant_idxs],
+        low_frequency=cbsd_index.low_frequencies[grant_idxs],
+        high_frequency=cbsd_index.high_frequencies[grant_idxs],
+        is_managed_grant=np.full(len(grant_idxs), is_managing_sas, dtype=bool))
+
+  @classmethod
+  def FromFad(cls, sas_uut_fad_object, sas_th_fad_objects, ppa_record=None):
+    """Creates a batch for SAS UUT and peer SAS TH.
+
+    See `getGrantObjectsFromFAD()` for the arguments.
+    """
+    return cls.Concatenate(
+        [cls.FromCbsdIndex(sas_uut_fad_object.getCbsdIndex(), True, ppa_record)]
+        + [cls.FromCbsdIndex(fad.getCbsdIndex(), False, ppa_record)
+           for fad in sas_th_fad_objects])
+
+  @classmethod
+  def Concatenate(cls, batches):
+    """Returns the concatenation of a sequence of batches."""
+    return cls(**{name: np.concatenate([getattr(batch, name)
+                                        for batch in batches])
+                  for name in CbsdGrantInfo._fields})
+
+  def __len__(self):
+    return len(self.latitude)
+
+  def __getitem__(self, key):
+    """Returns a |CbsdGrantInfo| for an integer key, a |GrantBatch| otherwise.
+
+    The key can be a slice (the batch arrays are views), an array of indices
+    or a boolean mask.
+    """
+    if isinstance(key, (int, long, np.integer)):
+      values = [getattr(self, name)[key].item()
+                for name in CbsdGrantInfo._fields]
+      grant = CbsdGrantInfo(*values)
+      return grant._replace(**{name: None for name in self._OPTIONAL_FIELDS
+                               if np.isnan(getattr(grant, name))})
+    return GrantBatch(**{name: getattr(self, name)[key]
+                         for name in CbsdGrantInfo._fields})
+
+  def __iter__(self):
+    for k in xrange(len(self)):
+      yield self[k]
+
+  def ToGrants(self):
+    """Returns the list of |CbsdGrantInfo| of the batch."""
+    return list(self)
+
+  def GetKeys(self):
+    """Returns the hashing keys of the grants.
+
+    Two grants have the same key iff the corresponding |CbsdGrantInfo| are
+    equal, so that the keys can be used for set operations (`np.in1d`,
+    `np.unique`, ...) or as dictionary keys.
+
+    Returns:
+      A ndarray of opaque keys (numpy void scalars), one per grant.
+    """
+    keys = np.zeros(len(self), dtype=[(name, getattr(self, name).dtype)
+                                      for name in CbsdGrantInfo._fields])
+    for name in CbsdGrantInfo._fields:
+      values = getattr(self, name)
+      if name in self._FLOAT_FIELDS:
+        # Normalize -0. and NaN (undefined), so that equal values share a key.
+        values = np.where(np.isnan(values), np.inf, values + 0.)
+      keys[name] = values
+    return keys.view(np.dtype((np.void, keys.dtype.itemsize)))
+
+  def IsIn(self, grants):
+    """Returns a boolean mask of the grants belonging to some other grants.
+
+    Args:
+      grants: A |GrantBatch| or an iterable of |CbsdGrantInfo|, for example a
+        move list set.
+    """
+    if not isinstance(grants, GrantBatch):
+      grants = GrantBatch.FromGrants(grants)
+    if not len(self) or not len(grants):
+      return np.zeros(len(self), dtype=bool)
+    return np.in1d(self.GetKeys(), grants.GetKeys())
+
 # Define FSS Protection Point, i.e., a tuple with named fields of
 # 'latitude', 'longitude', 'height_agl', 'max_gain_dbi', 'pointing_azimuth',
 # 'pointing_elevation'
@@ -251,13 +437,38 @@ def getGrantObjectsFromFAD(sas_uut_fad_object, sas_th_fad_objects,
       are not part of the PPA cluster list.
   """
   # List of CBSD grant tuples extracted from FAD record
-  grants = getAllGrantInfoFromCbsdDataDump(
-      sas_uut_fad_object.getCbsdRecords(), True, ppa_record)
-  for fad in sas_th_fad_objects:
-    grants.extend(getAllGrantInfoFromCbsdDataDump(
-        fad.getCbsdRecords(), False, ppa_record))
+  return GrantBatch.FromFad(sas_uut_fad_object, sas_th_fad_objects,
+                            ppa_record).ToGrants()
 
-  return grants
+
+def _getCbsdIndexGrantIdxs(cbsd_index, ppa_record=None):
+  """Returns the index of the grants of a CBSD index not part of a PPA cluster."""
+  grant_idxs = np.arange(len(cbsd_index.grant_records))
+  if ppa_record is not None:
+    cluster_idxs = cbsd_index.getCbsdIdxs(
+        ppa_record['ppaInfo']['cbsdReferenceId'])
+    grant_idxs = grant_idxs[
+        ~np.in1d(cbsd_index.grant_cbsd_idxs, cluster_idxs)]
+  return grant_idxs
+
+
+def getAllGrantInfoFromCbsdIndex(cbsd_index, is_managing_sas=True,
+                                 ppa_record=None):
+  """Returns a list of |CbsdGrantInfo| from a FAD CBSD index.
+
+  Same as `getAllGrantInfoFromCbsdDataDump()`, but using the columnar data of
+  a |full_activity_dump.CbsdRecordIndex|. Note that the numeric fields of the
+  returned grants are always floats (even if integers in the FAD records).
+
+  Args:
+    cbsd_index: A |CbsdRecordIndex| of the FAD CBSD records.
+    is_managing_sas: Flag indicating if the `cbsd_data_record` from the managing SAS
+      (True) or a peer SAS (False).
+    ppa_record: A PPA record dictionary. If None, ignored. If set, the returned grants
+      are not part of the PPA cluster list.
+  """
+  return GrantBatch.FromCbsdIndex(cbsd_index, is_managing_sas,
+                                  ppa_record).ToGrants()
 
 
 def getGrantsFromRequests(registration_requests, grant_requests, is_managing_sas=True):
@@ -0,0 +1,112 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import copy
+import glob
+import json
+import os
+import unittest
+
+import mock
+import numpy as np
+
+from full_activity_dump import FullActivityDump
+from reference_models.common import data
+from reference_models.common import grant_index
+
+TEST_DIR = os.path.join(os.path.dirname(__file__), '..', 'interference',
+                        'test_data')
+
+
+class TestGrantBatch(unittest.TestCase):
+
+  def setUp(self):
+    self.records = [json.load(open(filename))
+                    for filename in sorted(glob.glob(os.path.join(
+                        TEST_DIR, 'cbsd_*.json')))]
+    self.grants = data.getAllGrantInfoFromCbsdDataDump(self.records)
+    self.grants[1] = self.grants[1]._replace(antenna_beamwidth=None,
+                                             antenna_azimuth=None)
+
+  def test_from_grants(self):
+    batch = data.GrantBatch.FromGrants(self.grants)
+    self.assertEqual(len(batch), len(self.grants))
+    self.assertEqual(batch.ToGrants(), self.grants)
+    self.assertIsNone(batch[1].antenna_beamwidth)
+    self.assertTrue(np.isnan(batch.antenna_azimuth[1]))
+    self.assertEqual(len(data.GrantBatch.FromGrants([])), 0)
+
+  def test_from_fad(self):
+    fad_uut = FullActivityDump({'cbsd': self.records[:10]})
+    fad_th = FullActivityDump({'cbsd': self.records[10:]})
+    ppa_record = {'ppaInfo': {'cbsdReferenceId': [self.records[0]['id']]}}
+    batch = data.GrantBatch.FromFad(fad_uut, [fad_th], ppa_record)
+    self.assertEqual(
+        batch.ToGrants(),
+        data.getAllGrantInfoFromCbsdDataDump(self.records[:10], True,
+                                             ppa_record)
+        + data.getAllGrantInfoFromCbsdDataDump(self.records[10:], False,
+                                               ppa_record))
+    self.assertFalse(np.all(batch.is_managed_grant))
+
+  def test_from_cbsd_index_amsl(self):
+    records = copy.deepcopy(self.records[:3])
+    for record in records:
+      record['registration']['installationParam']['heightType'] = 'AMSL'
+    records[1]['grants'] = []
+    ppa_record = {'ppaInfo': {'cbsdReferenceId': [records[2]['id']]}}
+    index = FullActivityDump({'cbsd': records}).getCbsdIndex()
+    with mock.patch.object(data.drive.terrain_driver, 'GetTerrainElevation',
+                           return_value=np.array([10.])) as get_elevation:
+      batch = data.GrantBatch.FromCbsdIndex(index, ppa_record=ppa_record)
+    # Terrain only queried for the CBSDs with selected grants.
+    lats, lons = get_elevation.call_args[0]
+    self.assertEqual(list(lats), [records[0]['registration']
+                                  ['installationParam']['latitude']])
+    self.assertEqual(len(batch), len(records[0]['grants']))
+    self.assertTrue(np.all(
+        batch.height_agl ==
+        records[0]['registration']['installationParam']['height'] - 10.))
+
+  def test_views(self):
+    batch = data.GrantBatch.FromGrants(self.grants)
+    cat_b = batch[batch.cbsd_category == 'B']
+    self.assertEqual(cat_b.ToGrants(),
+                     [g for g in self.grants if g.cbsd_category == 'B'])
+    sub_batch = batch[2:5]
+    self.assertEqual(sub_batch.ToGrants(), self.grants[2:5])
+    sub_batch.max_eirp[0] = -100
+    self.assertEqual(batch.max_eirp[2], -100)
+
+  def test_set_operations(self):
+    batch = data.GrantBatch.FromGrants(self.grants)
+    move_list = set(self.grants[k] for k in (0, 1, 5))
+    self.assertEqual(list(np.flatnonzero(batch.IsIn(move_list))), [0, 1, 5])
+    keys = batch.GetKeys()
+    self.assertEqual(len(np.unique(keys)), len(set(self.grants)))
+    batch2 = data.GrantBatch.FromGrants(self.grants[::-1])
+    self.assertTrue(np.all(batch.IsIn(batch2)))
+    self.assertFalse(np.any(batch.IsIn([])))
+
+  def test_grant_index(self):
+    batch = data.GrantBatch.FromGrants(self.grants)
+    index_batch = grant_index.GrantSpatialIndex(batch)
+    index_list = grant_index.GrantSpatialIndex(self.grants)
+    lat, lon = self.grants[0].latitude, self.grants[0].longitude
+    self.assertEqual(list(index_batch.QueryRadius(lat, lon, (40, 150))),
+                     list(index_list.QueryRadius(lat, lon, (40, 150))))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,141 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Spatial index of CBSD grants.
+
+This index allows to quickly find the grants in the neighborhood of a
+protection point, without scanning the full list of grants.
+
+The grants are bucketed in a regular lat/lon grid. A query first selects the
+candidate grants in all the grid cells overlapping a conservative bounding box
+of the neighborhood, then applies the exact Vincenty distance check on these
+candidates only. The result is strictly identical to a full scan with
+`vincenty.GeodesicDistanceBearing()`.
+
+Typical usage:
+  # Build the index once for a given list of grants
+  grant_index = GrantSpatialIndex(grants)
+
+  # Get indices of all grants within 40km (cat A) or 80km (cat B) of a point
+  idxs = grant_index.QueryRadius(lat, lon, (40, 80))
+  grants_inside = [grants[k] for k in idxs]
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from reference_models.geo import vincenty
+
+# Minimum radius of curvature of the WGS84 ellipsoid (meridional, at equator).
+# Used for deriving conservative angular bounding boxes.
+_MIN_RADIUS_KM = 6335.0
+# Safety factor on bounding boxes.
+_BBOX_SAFETY_FACTOR = 1.01
+
+
+class GrantSpatialIndex(object):
+  """A spatial index of CBSD grants.
+
+  Attributes:
+    num_grants: The number of indexed grants.
+  """
+  def __init__(self, grants, cell_size_deg=0.5):
+    """Initializes the index.
+
+    Args:
+      grants: A sequence of CBSD grants of type |data.CbsdGrantInfo|, or any
+        object having attributes `latitude`, `longitude` and `cbsd_category`.
+        Can also be a |data.GrantBatch|, in which case its arrays are used
+        directly.
+      cell_size_deg: The size of the grid cells (degrees).
+    """
+    self._cell_size = float(cell_size_deg)
+    self._num_lon_cells = int(np.ceil(360. / self._cell_size))
+    if isinstance(getattr(grants, 'latitude', None), np.ndarray):
+      self._latitudes = np.asarray(grants.latitude, dtype=float)
+      self._longitudes = np.asarray(grants.longitude, dtype=float)
+      self._is_cat_b = grants.cbsd_category == 'B'
+    else:
+      self._latitudes = np.array([grant.latitude for grant in grants],
+                                 dtype=float)
+      self._longitudes = np.array([grant.longitude for grant in grants],
+                                  dtype=float)
+      self._is_cat_b = np.array([grant.cbsd_category == 'B' for grant in grants],
+                                dtype=bool)
+    self.num_grants = len(self._latitudes)
+
+    ilats = self._LatCell(self._latitudes)
+    ilons = self._LonCell(self._longitudes)
+    buckets = defaultdict(list)
+    for k, key in enumerate(zip(ilats, ilons)):
+      buckets[key].append(k)
+    self._buckets = {key: np.array(idxs, dtype=int)
+                     for key, idxs in buckets.iteritems()}
+
+  def _LatCell(self, lat):
+    return np.floor(np.asarray(lat) / self._cell_size).astype(int)
+
+  def _LonCell(self, lon):
+    return (np.floor(np.mod(lon, 360.) / self._cell_size).astype(int)
+            % self._num_lon_cells)
+
+  def _CandidateIdxs(self, lat, lon, radius_km):
+    """Returns the indices of the grants within a bounding box of a circle."""
+    dlat = np.degrees(radius_km / _MIN_RADIUS_KM) * _BBOX_SAFETY_FACTOR
+    ilat_min = int(self._LatCell(lat - dlat))
+    ilat_max = int(self._LatCell(lat + dlat))
+    # Max longitude extent of the circle, as seen from the center latitude.
+    sin_dlon = (np.sin(min(radius_km / _MIN_RADIUS_KM, np.pi/2.))
+                / np.cos(np.radians(min(abs(lat), 90.))))
+    if abs(lat) + dlat >= 90. or sin_dlon >= 1:
+      ilons = range(self._num_lon_cells)
+    else:
+      dlon = np.degrees(np.arcsin(sin_dlon)) * _BBOX_SAFETY_FACTOR
+      if 2 * dlon + 2 * self._cell_size >= 360.:
+        ilons = range(self._num_lon_cells)
+      else:
+        ilon_min = int(np.floor((lon - dlon) / self._cell_size))
+        ilon_max = int(np.floor((lon + dlon) / self._cell_size))
+        ilons = set(ilon % self._num_lon_cells
+                    for ilon in range(ilon_min, ilon_max + 1))
+    candidates = [self._buckets[(ilat, ilon)]
+                  for ilat in range(ilat_min, ilat_max + 1)
+                  for ilon in ilons
+                  if (ilat, ilon) in self._buckets]
+    if not candidates:
+      return np.zeros(0, dtype=int)
+    return np.sort(np.concatenate(candidates))
+
+  def QueryRadius(self, lat, lon, radius_km_by_category):
+    """Finds the grants within some distance of a point.
+
+    Args:
+      lat, lon: The point coordinates (degrees).
+      radius_km_by_category: The neighborhood distances (km) as a sequence
+        (cat_a_dist, cat_b_dist).
+
+    Returns:
+      The sorted indices (ndarray) of the grants in the neighborhood, ie the
+      grants whose distance to the point is below or equal to their category
+      neighborhood distance.
+    """
+    radius_a, radius_b = radius_km_by_category
+    idxs = self._CandidateIdxs(lat, lon, max(radius_a, radius_b))
+    if not len(idxs):
+      return idxs
+    # Exact check, using same order of points than the reference scan.
+    dists_km, _, _ = vincenty.GeodesicDistanceBearings(
+        self._latitudes[idxs], self._longitudes[idxs], lat, lon)
+    max_dists_km = np.where(self._is_cat_b[idxs], radius_b, radius_a)
+    return idxs[dists_km <= max_dists_km]
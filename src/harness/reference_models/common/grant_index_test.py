@@ -0,0 +1,71 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from collections import namedtuple
+import numpy as np
+import unittest
+
+from reference_models.common import grant_index
+from reference_models.geo import vincenty
+
+_Grant = namedtuple('_Grant', ['latitude', 'longitude', 'cbsd_category'])
+
+
+def _FullScan(grants, lat, lon, radius_km_by_category):
+  return [k for k, grant in enumerate(grants)
+          if vincenty.GeodesicDistanceBearing(
+              grant.latitude, grant.longitude, lat, lon)[0]
+          <= radius_km_by_category[grant.cbsd_category == 'B']]
+
+
+class TestGrantIndex(unittest.TestCase):
+
+  def setUp(self):
+    np.random.seed(1234)
+    num_grants = 3000
+    lats = np.random.uniform(35, 40, num_grants)
+    lons = np.random.uniform(-125, -118, num_grants)
+    cats = np.random.choice(['A', 'B'], num_grants)
+    self.grants = [_Grant(lat, lon, cat) for lat, lon, cat in zip(lats, lons, cats)]
+
+  def test_same_as_full_scan(self):
+    index = grant_index.GrantSpatialIndex(self.grants)
+    self.assertEqual(index.num_grants, len(self.grants))
+    for lat, lon, radii in [(37.5, -121.5, (40, 80)),
+                            (36.0, -124.0, (150, 200)),
+                            (39.9, -118.1, (0, 25)),
+                            (34.0, -121.0, (40, 200)),
+                            (45.0, -100.0, (40, 80))]:
+      idxs = index.QueryRadius(lat, lon, radii)
+      self.assertEqual(list(idxs), _FullScan(self.grants, lat, lon, radii))
+
+  def test_cell_size(self):
+    index = grant_index.GrantSpatialIndex(self.grants, cell_size_deg=0.1)
+    idxs = index.QueryRadius(37.5, -121.5, (40, 80))
+    self.assertEqual(list(idxs), _FullScan(self.grants, 37.5, -121.5, (40, 80)))
+
+  def test_antimeridian_and_pole(self):
+    grants = [_Grant(60, 179.9, 'A'), _Grant(60, -179.9, 'A'),
+              _Grant(89.9, 10, 'B'), _Grant(89.9, -170, 'B')]
+    index = grant_index.GrantSpatialIndex(grants)
+    self.assertEqual(list(index.QueryRadius(60, 179.95, (40, 40))), [0, 1])
+    self.assertEqual(list(index.QueryRadius(89.95, 100, (40, 40))), [2, 3])
+
+  def test_empty(self):
+    index = grant_index.GrantSpatialIndex([])
+    self.assertEqual(len(index.QueryRadius(37.5, -121.5, (40, 80))), 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
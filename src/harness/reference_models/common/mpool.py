@@ -36,6 +36,20 @@ mpool.RunOnEachWorkerProcess(fn, 3, arg2=4)
 pool = mpool.Pool()
 pool.map(...)
 pool.apply_async(...)
+
+# Alternatively configure a pool of threads within the current process.
+# The propagation models release the GIL during their calculation, so
+# this allows to use several cpus while sharing the terrain tile caches.
+mpool.Configure(-1, use_threads=True)
+
+# Initialize each worker at pool creation, for example by preloading
+# the geo data it will use.
+mpool.Configure(-1, initializer=drive.Preload,
+                initargs=(terrain_tiles, nlcd_tiles, True, zone_getters))
+
+# Map a function on protection points, dispatching spatially contiguous
+# chunks of points to the workers (results in the order of the points).
+results = mpool.SpatialMap(fn, protection_points)
 """
 # NOTE: This has been tested in Linux only.
 # Windows has some special way of launching processes, not using fork(),
@@ -48,8 +62,45 @@ pool.apply_async(...)
 
 from functools import partial
 import multiprocessing
+import multiprocessing.pool
 import time
 
+import numpy as np
+
+class _Barrier(object):
+  """A reusable barrier synchronizing the worker processes.
+
+  Equivalent to `multiprocessing.Barrier`, not available in python 2.
+  """
+  def __init__(self, parties):
+    self._parties = parties
+    self._count = multiprocessing.Value('i', 0, lock=False)
+    self._generation = multiprocessing.Value('i', 0, lock=False)
+    self._cond = multiprocessing.Condition()
+
+  def wait(self, timeout=None):
+    """Waits until all parties have called `wait()`.
+
+    Raises:
+      RuntimeError: if the barrier is not released within `timeout` seconds.
+    """
+    with self._cond:
+      generation = self._generation.value
+      self._count.value += 1
+      if self._count.value == self._parties:
+        self._count.value = 0
+        self._generation.value += 1
+        self._cond.notify_all()
+        return
+      deadline = None if timeout is None else time.time() + timeout
+      while generation == self._generation.value:
+        remaining = None if deadline is None else deadline - time.time()
+        if remaining is not None and remaining <= 0:
+          self._count.value -= 1
+          raise RuntimeError('Barrier timeout after %.1fs' % timeout)
+        self._cond.wait(remaining)
+
+
 class _DummyPool(object):
   """A dummy pool for replacement of `multiprocessing.Pool`
 
@@ -71,7 +122,7 @@ class _DummyPool(object):
         return True
       def successful(self):
         return True
-    result = Result(fn(*args, **kwargs))
+    result = Result(fn(*args, **kwds))
     if callback is not None:
       callback(result.get())
     return result
@@ -87,6 +138,40 @@ _pool = _DummyPool()
 # Number of workers in current pool
 _num_workers = 0
 
+# True if the workers are threads of the current process
+_use_threads = False
+
+# The worker initializer and its arguments
+_initializer = None
+_initargs = ()
+
+# The barrier synchronizing the workers of the current pool, if created here.
+# In the worker processes, it is set by the worker initializer.
+_barrier = None
+
+
+def _InitWorker(barrier, initializer, initargs):
+  """Initializes a worker process."""
+  global _barrier
+  _barrier = barrier
+  if initializer is not None:
+    initializer(*initargs)
+
+
+def _CreatePool(num_workers):
+  """Creates a pool of workers, either processes or threads."""
+  global _barrier
+  if _use_threads:
+    # Threads share the state of the current process: initialize it once.
+    _barrier = None
+    if _initializer is not None:
+      _initializer(*_initargs)
+    return multiprocessing.pool.ThreadPool(processes=num_workers)
+  _barrier = _Barrier(num_workers)
+  return multiprocessing.Pool(processes=num_workers,
+                              initializer=_InitWorker,
+                              initargs=(_barrier, _initializer, _initargs))
+
 # External interface
 def Pool(reinit=False):
   """Returns the worker pool.
@@ -101,15 +186,20 @@ def Pool(reinit=False):
   """
   global _pool
   if reinit and _num_workers:
-    _pool = multiprocessing.Pool(processes=_num_workers)
+    _pool = _CreatePool(_num_workers)
   return _pool
 
 
 def GetNumWorkerProcesses():
-  """Returns the number of worker processes."""
+  """Returns the number of worker processes (or threads)."""
   return _num_workers
 
 
+def UsesThreads():
+  """Returns True if the pool workers are threads of the current process."""
+  return _use_threads
+
+
 def _partial_fn(fn):
   # sleep to avoid returning too fast so each worker
   # gets one job in the RunOnEachWorkerProcess.
@@ -117,15 +207,36 @@ def _partial_fn(fn):
   return fn()
 
 
+def _barrier_fn(fn):
+  # wait for all workers to run the function, so each worker
+  # gets one job in the RunOnEachWorkerProcess.
+  try:
+    return fn()
+  finally:
+    _barrier.wait()
+
+
 def RunOnEachWorkerProcess(fn, * args, **kwargs):
-  """Runs a function on each of the pool process."""
+  """Runs a function on each of the pool process.
+
+  When using a pool of threads, all workers share the state of the current
+  process, and the function is run only once in the current thread.
+
+  Returns:
+    The list of the function results on each worker.
+  """
   if not _num_workers:
     return
+  if _use_threads:
+    return [fn(*args, **kwargs)]
   pfn = partial(fn, *args, **kwargs)
-  return _pool.map(_partial_fn, [pfn] * _num_workers, chunksize=1)
+  # For an external pool, the workers do not share a barrier.
+  run_fn = _barrier_fn if _barrier is not None else _partial_fn
+  return _pool.map(run_fn, [pfn] * _num_workers, chunksize=1)
 
 
-def Configure(num_processes=-1, pool=None):
+def Configure(num_processes=-1, pool=None, use_threads=False,
+              initializer=None, initargs=()):
   """Configure multiprocessing pool.
 
   WARNING: do not call this function in the code executed by the workers.
@@ -141,16 +252,33 @@ def Configure(num_processes=-1, pool=None):
       Only used when `pool` not specified.
     pool: An optional multiprocessing |Pool|. If not specified, a pool will be
       automatically created with `num_processes`.
+    use_threads: If True, the pool workers are threads within the current
+      process instead of processes. Only used when `pool` not specified.
+    initializer: An optional function called with `initargs` in each worker
+      process when it starts, for example |drive.Preload| to configure the
+      drivers and preload their data. When using a pool of threads or no
+      multiprocessing, it is called once in the current process.
+      Only used when `pool` not specified.
+    initargs: The arguments of the `initializer`.
   """
   global _pool
   global _num_workers
+  global _use_threads
+  global _initializer
+  global _initargs
+  global _barrier
   if pool is not None:
     _pool = pool
+    _use_threads = isinstance(pool, multiprocessing.pool.ThreadPool)
+    _barrier = None
   else:
     # Dummy pool with no multiprocessing
     if num_processes == 0:
       _pool = _DummyPool()
       _num_workers = 0
+      _use_threads = False
+      if initializer is not None:
+        initializer(*initargs)
       return
     # Actual multiprocessing pool of workers
     num_cpus = multiprocessing.cpu_count()
@@ -164,8 +292,121 @@ def Configure(num_processes=-1, pool=None):
     if num_processes <= 1:
       _pool = _DummyPool()
       _num_workers = 0
+      _use_threads = False
+      if initializer is not None:
+        initializer(*initargs)
       return
     # Instantiate the pool if it has changed.
     if pool is None or num_processes != _num_workers:
-      _pool = multiprocessing.Pool(processes=num_processes)
+      _use_threads = use_threads
+      _initializer, _initargs = initializer, tuple(initargs)
+      _pool = _CreatePool(num_processes)
       _num_workers = num_processes
+
+
+# Tile-locality aware scheduling.
+# The geo tiles are 1x1 degree. Points are ordered along a Morton (Z-order)
+# curve over a grid of 2**_MORTON_BITS_PER_DEG cells per degree aligned on the
+# tiles, so that all the points of a tile (and of any aligned power-of-2
+# sub-block) are contiguous in the ordering.
+_MORTON_BITS_PER_DEG = 10
+# Minimum number of chunks per worker, for load balancing.
+_MIN_CHUNKS_PER_WORKER = 4
+
+
+def _SpreadBits(values):
+  """Interleaves zeros between the (up to 26) bits of integer values."""
+  values = values.astype(np.int64)
+  result = np.zeros(values.shape, dtype=np.int64)
+  for bit in xrange(26):
+    result |= ((values >> bit) & 1) << (2 * bit)
+  return result
+
+
+def GetSpatialOrder(latitudes, longitudes):
+  """Returns the Morton (Z-order) ordering of points.
+
+  Args:
+    latitudes, longitudes: The point coordinates (degrees), as sequences.
+
+  Returns:
+    A tuple (order, tiles) of ndarray: the indices of the points sorted along
+    the Morton curve, and the (ilat, ilon) integer coordinates of the 1x1 degree
+    tile holding each point (in original order), as an array of shape (N, 2).
+  """
+  latitudes = np.asarray(latitudes, dtype=float)
+  longitudes = np.asarray(longitudes, dtype=float)
+  tiles = np.column_stack((np.floor(latitudes), np.floor(longitudes)))
+  if not len(latitudes):
+    return np.zeros(0, dtype=int), tiles.astype(int)
+  scale = 2**_MORTON_BITS_PER_DEG
+  ilats = ((latitudes - tiles[:, 0].min()) * scale).astype(np.int64)
+  ilons = ((longitudes - tiles[:, 1].min()) * scale).astype(np.int64)
+  codes = _SpreadBits(ilats) | (_SpreadBits(ilons) << 1)
+  return np.argsort(codes, kind='mergesort'), tiles.astype(int)
+
+
+def GetSpatialChunkSize(tiles, num_workers):
+  """Returns the chunk size for dispatching spatially ordered points.
+
+  Chunks are no larger than the average number of points per occupied tile,
+  so that a chunk mostly hits a single tile neighborhood, and small enough to
+  give each worker several chunks for load balancing.
+
+  Args:
+    tiles: The tile coordinates of the points, as returned by `GetSpatialOrder()`.
+    num_workers: The number of workers.
+  """
+  num_points = len(tiles)
+  if not num_points:
+    return 1
+  num_tiles = len(set(map(tuple, tiles)))
+  points_per_tile = int(np.ceil(num_points / float(num_tiles)))
+  balanced_size = int(np.ceil(
+      num_points / float(max(num_workers, 1) * _MIN_CHUNKS_PER_WORKER)))
+  return max(1, min(points_per_tile, balanced_size))
+
+
+def _GetPointLatLon(point):
+  """Returns the (latitude, longitude) of a point.
+
+  The point is either an object with `latitude` and `longitude` attributes, or
+  a (longitude, latitude) tuple as used by the geometry routines.
+  """
+  try:
+    return point.latitude, point.longitude
+  except AttributeError:
+    return point[1], point[0]
+
+
+def SpatialMap(fn, points, pool=None):
+  """Maps a function on points, with tile-locality aware scheduling.
+
+  The points are ordered along a Morton curve and dispatched to the workers in
+  spatially contiguous chunks, so that each worker processes neighbor points
+  and reuses its cached geo tiles, instead of every worker loading the same
+  tiles. When not using a pool of workers, this is a simple map.
+
+  Args:
+    fn: The function to apply on each point.
+    points: A sequence of points, either having `latitude` and `longitude`
+      attributes, or (longitude, latitude) tuples.
+    pool: The pool to use. If None, uses the global pool.
+
+  Returns:
+    The list of results, in the order of the input `points`.
+  """
+  if pool is None:
+    pool = _pool
+  points = list(points)
+  if isinstance(pool, _DummyPool) or len(points) < 2:
+    return map(fn, points)
+  latitudes, longitudes = zip(*[_GetPointLatLon(point) for point in points])
+  order, tiles = GetSpatialOrder(latitudes, longitudes)
+  num_workers = _num_workers or getattr(pool, '_processes', 1)
+  chunksize = GetSpatialChunkSize(tiles, num_workers)
+  ordered_results = pool.map(fn, [points[k] for k in order], chunksize=chunksize)
+  results = [None] * len(points)
+  for k, result in zip(order, ordered_results):
+    results[k] = result
+  return results
@@ -0,0 +1,143 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import multiprocessing
+import multiprocessing.pool
+import os
+import threading
+import unittest
+
+from reference_models.common import mpool
+from reference_models.propagation.itm import itm
+from reference_models.propagation.itm import itm_test
+
+
+def _ComputeLoss(height_tx):
+  loss, _, _, _, _ = itm.point_to_point(itm_test.PROFILE, height_tx, 8.5,
+                                        15, .005, 314., 573.3, 5, 0, 0.5, 0.5)
+  return loss, os.getpid(), threading.current_thread().ident
+
+_worker_value = None
+
+def _SetWorkerValue(value):
+  global _worker_value
+  _worker_value = value
+
+def _GetWorkerValue():
+  return _worker_value, os.getpid()
+
+def _GetPointAndPid(point):
+  return point, os.getpid()
+
+
+class TestMpool(unittest.TestCase):
+
+  def tearDown(self):
+    mpool.Configure(0)
+
+  def test_dummy_pool(self):
+    mpool.Configure(0)
+    self.assertEqual(mpool.GetNumWorkerProcesses(), 0)
+    self.assertFalse(mpool.UsesThreads())
+    pool = mpool.Pool()
+    self.assertEqual(pool.map(abs, [-1, 2, -3]), [1, 2, 3])
+    self.assertEqual(pool.apply_async(abs, (-4,)).get(1), 4)
+    self.assertIsNone(mpool.RunOnEachWorkerProcess(os.getpid))
+
+  def test_thread_pool(self):
+    mpool.Configure(2, use_threads=True)
+    # Skip on single cpu machines (dummy pool)
+    if not mpool.GetNumWorkerProcesses():
+      return
+    self.assertTrue(mpool.UsesThreads())
+    self.assertEqual(mpool.RunOnEachWorkerProcess(os.getpid), [os.getpid()])
+
+    heights = range(5, 205, 5)
+    results = mpool.Pool().map(_ComputeLoss, heights)
+    for height, (loss, pid, _) in zip(heights, results):
+      self.assertEqual(pid, os.getpid())
+      self.assertEqual(loss, _ComputeLoss(height)[0])
+
+  def test_external_thread_pool(self):
+    mpool.Configure(pool=multiprocessing.pool.ThreadPool(2))
+    self.assertTrue(mpool.UsesThreads())
+    heights = range(5, 205, 5)
+    results = mpool.Pool().map(_ComputeLoss, heights, chunksize=1)
+    for height, (loss, pid, _) in zip(heights, results):
+      self.assertEqual(pid, os.getpid())
+      self.assertEqual(loss, _ComputeLoss(height)[0])
+
+  def test_dummy_pool_initializer(self):
+    mpool.Configure(0, initializer=_SetWorkerValue, initargs=(3,))
+    self.addCleanup(_SetWorkerValue, None)
+    self.assertEqual(_worker_value, 3)
+
+  def test_process_pool_initializer(self):
+    # Force the creation of a pool of 3 processes even on single cpu machines.
+    cpu_count = multiprocessing.cpu_count
+    multiprocessing.cpu_count = lambda: 4
+    try:
+      mpool.Configure(3, initializer=_SetWorkerValue, initargs=('init',))
+    finally:
+      multiprocessing.cpu_count = cpu_count
+    self.addCleanup(mpool.Pool().terminate)
+    self.assertEqual(mpool.GetNumWorkerProcesses(), 3)
+    self.assertIsNone(_worker_value)
+    # Each worker runs the function exactly once, and the barrier is reusable.
+    for _ in range(3):
+      results = mpool.RunOnEachWorkerProcess(_GetWorkerValue)
+      self.assertEqual([value for value, _ in results], ['init'] * 3)
+      self.assertEqual(len(set(pid for _, pid in results)), 3)
+    mpool.RunOnEachWorkerProcess(_SetWorkerValue, value='updated')
+    results = mpool.RunOnEachWorkerProcess(_GetWorkerValue)
+    self.assertEqual([value for value, _ in results], ['updated'] * 3)
+
+  def test_spatial_order(self):
+    # Points of 2 tiles, interleaved.
+    lats = [37.1, 38.9, 37.9, 38.1, 37.5, 38.5]
+    lons = [-122.1, -122.2, -122.9, -122.8, -122.5, -122.5]
+    order, tiles = mpool.GetSpatialOrder(lats, lons)
+    self.assertEqual(sorted(order), range(6))
+    self.assertEqual(tiles.tolist(),
+                     [[37, -123], [38, -123], [37, -123],
+                      [38, -123], [37, -123], [38, -123]])
+    # The points of a tile are contiguous in the ordering.
+    self.assertEqual(sorted(order[:3]), [0, 2, 4])
+    self.assertEqual(sorted(order[3:]), [1, 3, 5])
+    self.assertEqual(mpool.GetSpatialChunkSize(tiles, 1), 2)
+    self.assertEqual(mpool.GetSpatialChunkSize(tiles[[0, 2, 4]], 1), 1)
+    self.assertEqual(mpool.GetSpatialChunkSize(tiles[[0, 2, 4]], 8), 1)
+    self.assertEqual(mpool.GetSpatialChunkSize(tiles[[0, 2]], 0), 1)
+
+  def test_spatial_map(self):
+    points = [(-122.1 + 0.01 * k, 37.1 + 0.5 * (k % 3)) for k in range(20)]
+    mpool.Configure(0)
+    self.assertEqual(mpool.SpatialMap(abs, [-1, 2]), [1, 2])
+    results = mpool.SpatialMap(_GetPointAndPid, points)
+    self.assertEqual([point for point, _ in results], points)
+
+    cpu_count = multiprocessing.cpu_count
+    multiprocessing.cpu_count = lambda: 4
+    try:
+      mpool.Configure(2)
+    finally:
+      multiprocessing.cpu_count = cpu_count
+    self.addCleanup(mpool.Pool().terminate)
+    results = mpool.SpatialMap(_GetPointAndPid, points)
+    self.assertEqual([point for point, _ in results], points)
+    self.assertNotIn(os.getpid(), [pid for _, pid in results])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,308 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Run telemetry: memory, tile cache, memoizing cache and stage timings.
+
+Each process holds its own statistics:
+  - peak resident memory (RSS) of the process.
+  - tile loads, evictions and hits of the NED and NLCD drivers (see
+    |tiles.TileStats|).
+  - hits and misses of the memoizing caches (see |cache.CacheManager|).
+  - cumulative time and count of the calculation stages, such as the
+    neighborhood search, terrain profile extraction, ITM and aggregation.
+
+The top level routines (DPA move list and check, IAP) are decorated with
+`Reported()`: when the telemetry is enabled, the statistics of the current
+process and of all the |mpool| worker processes are reset at their start,
+and merged into a single report at their end.
+
+The telemetry is disabled by default, in which case it has negligible overhead.
+
+Typical usage:
+  # Enable the telemetry (after the mpool configuration).
+  telemetry.Configure(enabled=True)
+
+  # Run some top level routine
+  dpa.ComputeMoveLists()
+
+  # Get the merged report
+  report = telemetry.GetLastReport()
+  print telemetry.FormatReport(report)
+
+  # Instrument a calculation stage (in any process)
+  with telemetry.Stage('itm'):
+    ...
+"""
+import functools
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import weakref
+
+from reference_models.common import mpool
+
+# Whether the telemetry is enabled in this process.
+_enabled = False
+
+# The per process statistics.
+_lock = threading.Lock()
+_stages = {}
+_caches = {}
+_tile_stats = weakref.WeakSet()
+
+# The reporting state.
+_report_depth = 0
+_last_report = None
+
+
+def Configure(enabled=True):
+  """Enables or disables the telemetry in this process and all workers.
+
+  Worker processes created later inherit the setting.
+  """
+  _SetEnabled(enabled)
+  if mpool.GetNumWorkerProcesses() and not mpool.UsesThreads():
+    mpool.RunOnEachWorkerProcess(_SetEnabled, enabled)
+
+
+def _SetEnabled(enabled):
+  global _enabled
+  _enabled = enabled
+
+
+def IsEnabled():
+  """Returns True if the telemetry is enabled."""
+  return _enabled
+
+
+class _StageTimer(object):
+  """Context manager accumulating the time spent in a stage."""
+  __slots__ = ('_name', '_start')
+
+  def __init__(self, name):
+    self._name = name
+
+  def __enter__(self):
+    self._start = time.time()
+
+  def __exit__(self, *args):
+    AddStageTime(self._name, time.time() - self._start)
+
+
+class _NoStageTimer(object):
+  """No-op context manager, used when telemetry is disabled."""
+  __slots__ = ()
+
+  def __enter__(self):
+    pass
+
+  def __exit__(self, *args):
+    pass
+
+_NO_STAGE_TIMER = _NoStageTimer()
+
+
+def Stage(name):
+  """Returns a context manager timing a calculation stage.
+
+  Args:
+    name: The stage name, for example 'itm'.
+  """
+  if not _enabled:
+    return _NO_STAGE_TIMER
+  return _StageTimer(name)
+
+
+def AddStageTime(name, duration):
+  """Adds the duration (in seconds) of one run of a stage."""
+  with _lock:
+    stats = _stages.setdefault(name, [0, 0.])
+    stats[0] += 1
+    stats[1] += duration
+
+
+def AddCacheInfo(name, hits, misses):
+  """Adds the hits and misses of a memoizing cache."""
+  if not _enabled:
+    return
+  with _lock:
+    stats = _caches.setdefault(name, [0, 0])
+    stats[0] += hits
+    stats[1] += misses
+
+
+def RegisterTileStats(tile_stats):
+  """Registers a |tiles.TileStats| to be included in the telemetry."""
+  _tile_stats.add(tile_stats)
+
+
+def _GetPeakRssMb():
+  """Returns the peak resident memory of the process since its start (MB)."""
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Reported in kilobytes on Linux, and bytes on MacOS.
+  if sys.platform == 'darwin':
+    return max_rss / 1024. / 1024.
+  return max_rss / 1024.
+
+
+def _HitRatio(stats):
+  num_requests = stats['hits'] + stats['misses']
+  return float(stats['hits']) / num_requests if num_requests else None
+
+
+def Reset():
+  """Resets the statistics of this process."""
+  with _lock:
+    _stages.clear()
+    _caches.clear()
+  for tile_stats in list(_tile_stats):
+    tile_stats.Reset()
+
+
+def Snapshot():
+  """Returns the statistics of this process, as a dict."""
+  tiles = {}
+  for tile_stats in list(_tile_stats):
+    summary = tiles.setdefault(tile_stats.type,
+                               {'loads': 0, 'evictions': 0, 'hits': 0})
+    summary['loads'] += tile_stats.NumLoads()
+    summary['evictions'] += tile_stats.num_evictions
+    summary['hits'] += tile_stats.num_hits
+  with _lock:
+    stages = {name: {'count': count, 'time_s': duration}
+              for name, (count, duration) in _stages.iteritems()}
+    caches = {name: {'hits': hits, 'misses': misses}
+              for name, (hits, misses) in _caches.iteritems()}
+  return {'pid': os.getpid(),
+          'peak_rss_mb': _GetPeakRssMb(),
+          'stages': stages,
+          'caches': caches,
+          'tiles': tiles}
+
+
+def MergeSnapshots(snapshots):
+  """Merges the statistics of several processes into a single report.
+
+  Counts and times are summed over all processes, and hit ratios derived from
+  the summed counts.
+
+  Args:
+    snapshots: A list of process statistics, as returned by `Snapshot()`.
+
+  Returns:
+    The report as a dict, holding the merged 'stages', 'caches' and 'tiles'
+    statistics, the maximum and total of the per process peak RSS, and the
+    original per process statistics in 'processes'.
+  """
+  def _Sum(key):
+    merged = {}
+    for snapshot in snapshots:
+      for name, stats in snapshot[key].iteritems():
+        merged_stats = merged.setdefault(name, dict.fromkeys(stats, 0))
+        for field, value in stats.iteritems():
+          merged_stats[field] += value
+    return merged
+
+  caches = _Sum('caches')
+  tiles = _Sum('tiles')
+  for stats in caches.values():
+    stats['hit_ratio'] = _HitRatio(stats)
+  for stats in tiles.values():
+    stats['hit_ratio'] = _HitRatio({'hits': stats['hits'],
+                                    'misses': stats['loads']})
+  return {'num_processes': len(snapshots),
+          'max_peak_rss_mb': max(s['peak_rss_mb'] for s in snapshots),
+          'total_peak_rss_mb': sum(s['peak_rss_mb'] for s in snapshots),
+          'stages': _Sum('stages'),
+          'caches': caches,
+          'tiles': tiles,
+          'processes': snapshots}
+
+
+def _UsesWorkerProcesses():
+  return bool(mpool.GetNumWorkerProcesses()) and not mpool.UsesThreads()
+
+
+def ResetAll():
+  """Resets the statistics of this process and all the worker processes."""
+  Reset()
+  if _UsesWorkerProcesses():
+    mpool.RunOnEachWorkerProcess(Reset)
+
+
+def CollectReport():
+  """Returns the merged report of this process and all the worker processes."""
+  snapshots = [Snapshot()]
+  if _UsesWorkerProcesses():
+    snapshots.extend(mpool.RunOnEachWorkerProcess(Snapshot))
+  return MergeSnapshots(snapshots)
+
+
+def GetLastReport():
+  """Returns the last report produced by a `Reported()` routine, or None."""
+  return _last_report
+
+
+def FormatReport(report):
+  """Returns a human readable summary of a report."""
+  lines = ['Telemetry `%s`: %.2fs - %d processes - peak RSS max %.1fMB total %.1fMB'
+           % (report.get('name'), report.get('wall_time_s', 0),
+              report['num_processes'], report['max_peak_rss_mb'],
+              report['total_peak_rss_mb'])]
+  for name, stats in sorted(report['stages'].iteritems()):
+    lines.append('  stage %s: %d runs, %.3fs' % (name, stats['count'],
+                                                 stats['time_s']))
+  for name, stats in sorted(report['tiles'].iteritems()):
+    lines.append('  tiles %s: %d loads, %d evictions, hit ratio %s'
+                 % (name, stats['loads'], stats['evictions'], stats['hit_ratio']))
+  for name, stats in sorted(report['caches'].iteritems()):
+    lines.append('  cache %s: %d hits, %d misses, hit ratio %s'
+                 % (name, stats['hits'], stats['misses'], stats['hit_ratio']))
+  return '\n'.join(lines)
+
+
+def Reported(name):
+  """Decorator producing a telemetry report of a top level routine.
+
+  When the telemetry is enabled, the statistics of all processes are reset
+  before running the routine, and merged into a report afterwards (see
+  `GetLastReport()`). Nested reported routines are part of the outermost one.
+
+  Args:
+    name: The name of the report.
+  """
+  def decorator(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      global _report_depth, _last_report
+      if not _enabled or _report_depth:
+        return fn(*args, **kwargs)
+      ResetAll()
+      start_time = time.time()
+      _report_depth += 1
+      try:
+        result = fn(*args, **kwargs)
+      finally:
+        _report_depth -= 1
+      report = CollectReport()
+      report['name'] = name
+      report['wall_time_s'] = time.time() - start_time
+      _last_report = report
+      logging.info(FormatReport(report))
+      return result
+    return wrapper
+  return decorator
@@ -0,0 +1,132 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import unittest
+
+from reference_models.common import cache
+from reference_models.common import mpool
+from reference_models.common import telemetry
+from reference_models.geo import tiles
+
+
+def _Square(x):
+  return x * x
+
+
+def _SumOfSquares(values):
+  with cache.CacheManager(_Square):
+    return sum(_Square(v) for v in values)
+
+
+@telemetry.Reported('inner')
+def _Inner():
+  with telemetry.Stage('inner_stage'):
+    return 1
+
+
+@telemetry.Reported('outer')
+def _Outer():
+  with telemetry.Stage('outer_stage'):
+    pass
+  return _Inner() + _Inner()
+
+
+class TestTelemetry(unittest.TestCase):
+
+  def setUp(self):
+    mpool.Configure(0)
+    telemetry.Configure(enabled=True)
+    telemetry.Reset()
+
+  def tearDown(self):
+    telemetry.Configure(enabled=False)
+    telemetry.Reset()
+
+  def test_disabled(self):
+    telemetry.Configure(enabled=False)
+    with telemetry.Stage('stage'):
+      pass
+    self.assertEqual(_SumOfSquares([1, 2, 1]), 6)
+    snapshot = telemetry.Snapshot()
+    self.assertEqual(snapshot['stages'], {})
+    self.assertEqual(snapshot['caches'], {})
+
+  def test_stages_and_caches(self):
+    for _ in range(3):
+      with telemetry.Stage('stage'):
+        pass
+    self.assertEqual(_SumOfSquares([1, 2, 1, 2, 3]), 19)
+    snapshot = telemetry.Snapshot()
+    self.assertEqual(snapshot['stages']['stage']['count'], 3)
+    self.assertGreaterEqual(snapshot['stages']['stage']['time_s'], 0)
+    self.assertEqual(snapshot['caches']['_Square'],
+                     {'hits': 2, 'misses': 3})
+    self.assertGreater(snapshot['peak_rss_mb'], 0)
+
+  def test_tile_stats(self):
+    tile_stats = tiles.TileStats('ned')
+    tile_stats.UpdateForTileLoad(38, -123)
+    tile_stats.UpdateForTileHit()
+    tile_stats.UpdateForTileHit()
+    tile_stats.UpdateForTileHit()
+    tile_stats.UpdateForTileEvict()
+    self.assertEqual(tile_stats.NumLoads(), 1)
+    report = telemetry.MergeSnapshots([telemetry.Snapshot()])
+    self.assertGreaterEqual(report['tiles']['ned']['loads'], 1)
+    self.assertGreaterEqual(report['tiles']['ned']['hits'], 3)
+    telemetry.Reset()
+    self.assertEqual(tile_stats.NumLoads(), 0)
+    self.assertEqual(tile_stats.num_hits, 0)
+    self.assertEqual(tile_stats.num_evictions, 0)
+
+  def test_merge_snapshots(self):
+    snapshots = [
+        {'pid': 1, 'peak_rss_mb': 100.,
+         'stages': {'itm': {'count': 2, 'time_s': 1.5}},
+         'caches': {'fn': {'hits': 3, 'misses': 1}},
+         'tiles': {'ned': {'loads': 1, 'evictions': 0, 'hits': 9}}},
+        {'pid': 2, 'peak_rss_mb': 50.,
+         'stages': {'itm': {'count': 1, 'time_s': 0.5},
+                    'profile': {'count': 1, 'time_s': 0.25}},
+         'caches': {'fn': {'hits': 1, 'misses': 3}},
+         'tiles': {'ned': {'loads': 3, 'evictions': 2, 'hits': 7}}}]
+    report = telemetry.MergeSnapshots(snapshots)
+    self.assertEqual(report['num_processes'], 2)
+    self.assertEqual(report['max_peak_rss_mb'], 100.)
+    self.assertEqual(report['total_peak_rss_mb'], 150.)
+    self.assertEqual(report['stages'],
+                     {'itm': {'count': 3, 'time_s': 2.0},
+                      'profile': {'count': 1, 'time_s': 0.25}})
+    self.assertEqual(report['caches'],
+                     {'fn': {'hits': 4, 'misses': 4, 'hit_ratio': 0.5}})
+    self.assertEqual(report['tiles'],
+                     {'ned': {'loads': 4, 'evictions': 2, 'hits': 16,
+                              'hit_ratio': 0.8}})
+    self.assertEqual(report['processes'], snapshots)
+
+  def test_reported_nested(self):
+    with telemetry.Stage('before'):
+      pass
+    self.assertEqual(_Outer(), 2)
+    report = telemetry.GetLastReport()
+    self.assertEqual(report['name'], 'outer')
+    self.assertEqual(report['num_processes'], 1)
+    self.assertNotIn('before', report['stages'])
+    self.assertEqual(report['stages']['outer_stage']['count'], 1)
+    self.assertEqual(report['stages']['inner_stage']['count'], 2)
+    self.assertIn('outer', telemetry.FormatReport(report))
+
+
+if __name__ == '__main__':
+  unittest.main()
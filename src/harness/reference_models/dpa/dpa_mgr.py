@@ -46,7 +46,9 @@ import numpy as np
 
 from reference_models.geo import zones
 from reference_models.common import data
+from reference_models.common import grant_index
 from reference_models.common import mpool
+from reference_models.common import telemetry
 from reference_models.dpa import move_list as ml
 from reference_models.dpa import dpa_builder
 
@@ -115,16 +117,22 @@ class Dpa(object):
     status = dpa.CheckInterference(channel, sas_uut_keep_list, margin_db=1)
   """
   num_iteration = 2000
+  multichannel_move_list = False
 
   @classmethod
   def Configure(cls,
-                num_iteration=2000):
+                num_iteration=2000,
+                multichannel_move_list=False):
     """Configure operating parameters.
 
     Args:
       num_iteration: The number of iteration to use in the Monte Carlo simulation.
+      multichannel_move_list: If True, the move lists of all channels are
+        computed in one pass per protection point, reusing the path loss of
+        each CBSD across all channels (including its random realizations).
     """
     cls.num_iteration = num_iteration
+    cls.multichannel_move_list = multichannel_move_list
 
   def __init__(self, protected_points,
                name='None',
@@ -209,6 +217,7 @@ class Dpa(object):
     self.ResetLists()
     self._has_th_grants = self._DetectIfPeerSas()
 
+  @telemetry.Reported('dpa_move_list')
   def ComputeMoveLists(self):
     """Computes move/neighbor lists.
 
@@ -225,6 +234,10 @@ class Dpa(object):
     logging.debug('  protected points: %s', self.protected_points)
     pool = mpool.Pool()
     self.ResetLists()
+    index = grant_index.GrantSpatialIndex(self._grants)
+    if Dpa.multichannel_move_list:
+      self._ComputeMoveListsMultiChannel(pool, index)
+      return
     for low_freq, high_freq in self.channels:
       moveListConstraint = functools.partial(
           ml.moveListConstraint,
@@ -237,10 +250,11 @@ class Dpa(object):
           beamwidth=self.beamwidth,
           min_azimuth=self.azimuth_range[0],
           max_azimuth=self.azimuth_range[1],
-          neighbor_distances=self.neighbor_distances)
+          neighbor_distances=self.neighbor_distances,
+          grant_index=index)
 
-      move_list, nbor_list = zip(*pool.map(moveListConstraint,
-                                           self.protected_points))
+      move_list, nbor_list = zip(*mpool.SpatialMap(moveListConstraint,
+                                                   self.protected_points, pool))
       # Combine the individual point move lists
       move_list = set().union(*move_list)
       nbor_list = set().union(*nbor_list)
@@ -250,6 +264,34 @@ class Dpa(object):
     logging.info('DPA Result movelist `%s`- MOVE_LIST:%s NBOR_LIST: %s',
                  self.name, self.move_lists, self.nbor_lists)
 
+  def _ComputeMoveListsMultiChannel(self, pool, index):
+    """Computes move/neighbor lists of all channels in one pass per point."""
+    moveListConstraint = functools.partial(
+        ml.moveListConstraintMultiChannel,
+        channels=[(low_freq * 1.e6, high_freq * 1.e6)
+                  for low_freq, high_freq in self.channels],
+        grants=self._grants,
+        inc_ant_height=self.radar_height,
+        num_iter=Dpa.num_iteration,
+        threshold=self.threshold,
+        beamwidth=self.beamwidth,
+        min_azimuth=self.azimuth_range[0],
+        max_azimuth=self.azimuth_range[1],
+        neighbor_distances=self.neighbor_distances,
+        grant_index=index)
+
+    point_lists = mpool.SpatialMap(moveListConstraint, self.protected_points,
+                                   pool)
+    for chan_idx in xrange(len(self.channels)):
+      # Combine the individual point move lists
+      self.move_lists.append(
+          set().union(*[lists[chan_idx][0] for lists in point_lists]))
+      self.nbor_lists.append(
+          set().union(*[lists[chan_idx][1] for lists in point_lists]))
+
+    logging.info('DPA Result movelist `%s`- MOVE_LIST:%s NBOR_LIST: %s',
+                 self.name, self.move_lists, self.nbor_lists)
+
   def _GetChanIdx(self, channel):
     """Gets the channel idx for a given channel."""
     try:
@@ -325,10 +367,11 @@ class Dpa(object):
         do_max=True)
 
     pool = mpool.Pool()
-    max_interf = pool.map(interfCalculator,
-                          self.protected_points)
+    max_interf = mpool.SpatialMap(interfCalculator,
+                                  self.protected_points, pool)
     return max_interf
 
+  @telemetry.Reported('dpa_check_interference')
   def CheckInterference(self, sas_uut_active_grants, margin_db,
                         channel=None, num_iter=None,
                         do_abs_check_single_uut=False):
@@ -418,7 +461,7 @@ class Dpa(object):
     # TODO(sbdt): could do early stop as soon as one fails, although I would expect
     # the criteria to be changed into checking 99.x% of success instead of 100%.
     pool = mpool.Pool()
-    result = pool.map(checkPointInterf, self.protected_points)
+    result = mpool.SpatialMap(checkPointInterf, self.protected_points, pool)
     max_diff_interf = max(result)
 
     if max_diff_interf > margin_db:
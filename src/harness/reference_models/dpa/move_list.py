@@ -50,6 +50,7 @@ from reference_models.geo import drive
 from reference_models.geo import vincenty
 from reference_models.common import cache
 from reference_models.common import data
+from reference_models.common import telemetry
 from reference_models.antenna import antenna
 
 # Constant parameters based on requirements in the WINNF-TS-0112 [R2-SGN-24]
@@ -68,6 +69,11 @@ OOB_POWER_WITHIN_10MHZ = -13
 OOB_POWER_OUTSIDE_10MHZ = -25
 OOB_POWER_BELOW_3530MHZ = -40
 
+# Version of the path loss and interference calculations, part of the keys of
+# the persistent cache stores. It shall be changed whenever these calculations
+# change (propagation model or code), so that stored results are not reused.
+CACHE_VERSION = 'dpa_itm_1'
+
 
 # Define interference contribution, i.e., a tuple with named fields of
 # 'randomInterference', 'bearing_c_cbsd'
@@ -117,34 +123,33 @@ def findGrantsInsideNeighborhood(grants, constraint,
                       neighborhood of that protection `constraint`.
       idxs_inside:    the indices of `grants_inside` in original `grant` list.
   """
-  # Initialize an empty list
-  grants_inside = []
-  idxs_inside = []
-
   neighbor_dists = neighbor_distances[0:2]
   if dpa_type is DpaType.OUT_OF_BAND:
     neighbor_dists = neighbor_distances[2:]
 
-  # Loop over each CBSD grant and filter the ones inside the neighborhood
+  # Filter the CBSD grants on frequency range
+  idxs = []
   for k, grant in enumerate(grants):
-    # Check frequency range
     if dpa_type is not DpaType.OUT_OF_BAND:
       overlapping_bw = (min(grant.high_frequency, constraint.high_frequency)
                         - max(grant.low_frequency, constraint.low_frequency))
       if overlapping_bw <= 0:
         continue
+    idxs.append(k)
+  if not idxs:
+    return [], []
 
-    # Compute distance from CBSD location to protection constraint location
-    dist_km, _, _ = vincenty.GeodesicDistanceBearing(
-        grant.latitude, grant.longitude,
-        constraint.latitude, constraint.longitude)
-
-    # Check if CBSD is inside the neighborhood of protection constraint
-    if dist_km > neighbor_dists[grant.cbsd_category == 'B']:
-      continue
+  # Compute distance from all CBSD locations to protection constraint location
+  dists_km, _, _ = vincenty.GeodesicDistanceBearings(
+      [grants[k].latitude for k in idxs],
+      [grants[k].longitude for k in idxs],
+      constraint.latitude, constraint.longitude)
+  max_dists_km = np.array([neighbor_dists[grants[k].cbsd_category == 'B']
+                           for k in idxs])
 
-    grants_inside.append(grant)
-    idxs_inside.append(k)
+  # Keep the CBSDs inside the neighborhood of protection constraint
+  idxs_inside = [idxs[i] for i in np.where(dists_km <= max_dists_km)[0]]
+  grants_inside = [grants[k] for k in idxs_inside]
 
   return grants_inside, idxs_inside
 
@@ -188,7 +193,46 @@ def ComputeOOBConductedPower(low_freq_cbsd, low_freq_c, high_freq_c):
   return 10 * np.log10(power_mW)
 
 
-def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_type):
+def computePathLoss(latitude, longitude, height_agl, indoor_deployment,
+                    latitude_c, longitude_c, inc_ant_height, num_iteration):
+  """Calculates K random realizations and median of path loss of a link.
+
+  The path loss is frequency independent (calculated at `FREQ_PROP_MODEL`),
+  and can thus be reused across all protected channels. See
+  `moveListConstraintMultiChannel()`.
+
+  Inputs:
+    latitude, longitude: the CBSD location (degrees).
+    height_agl:     the CBSD antenna height above ground level (meters).
+    indoor_deployment: True if the CBSD is indoor.
+    latitude_c, longitude_c: the protection constraint location (degrees).
+    inc_ant_height: reference incumbent antenna height (in meters)
+    num_iteration:  a number of Monte Carlo iterations
+
+  Returns:
+    A tuple of
+      path_loss:        an array of (K+1) path losses (dB): the first K ones
+                        are the random realizations, the last one is the median.
+      incidence_angles: the incidence angles, as returned by
+                        |wf_itm.CalcItmPropagationLoss|.
+  """
+  # Compute median and K random realizations of path loss/interference contribution
+  # based on ITM model as defined in [R2-SGN-03] (in dB)
+  reliabilities = np.random.uniform(0.001, 0.999, num_iteration)  # get K random
+  # reliability values from an uniform distribution over [0.001,0.999)
+  reliabilities = np.append(reliabilities, [0.5])  # add 0.5 (for median loss) as
+  # a last value to reliabilities array
+  results = wf_itm.CalcItmPropagationLoss(
+      latitude, longitude, height_agl,
+      latitude_c, longitude_c, inc_ant_height,
+      indoor_deployment,
+      reliability=reliabilities,
+      freq_mhz=FREQ_PROP_MODEL)
+  return np.array(results.db_loss), results.incidence_angles
+
+
+def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_type,
+                        path_loss_fn=None):
   """Calculate interference contribution of each grant in the neighborhood to
   the protection constraint c.
 
@@ -198,6 +242,8 @@ def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_ty
     inc_ant_height: reference incumbent antenna height (in meters)
     num_iteration:  a number of Monte Carlo iterations
     dpa_type:       an enum member of class DpaType
+    path_loss_fn:   an optional function used instead of `computePathLoss()`,
+                    for example a memoized version of it.
 
   Returns:
     A tuple of
@@ -213,23 +259,18 @@ def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_ty
   low_freq_c = constraint.low_frequency
   high_freq_c = constraint.high_frequency
 
-  # Compute median and K random realizations of path loss/interference contribution
-  # based on ITM model as defined in [R2-SGN-03] (in dB)
-  reliabilities = np.random.uniform(0.001, 0.999, num_iteration)  # get K random
-  # reliability values from an uniform distribution over [0.001,0.999)
-  reliabilities = np.append(reliabilities, [0.5])  # add 0.5 (for median loss) as
-  # a last value to reliabilities array
-  results = wf_itm.CalcItmPropagationLoss(
+  # Compute median and K random realizations of path loss
+  if path_loss_fn is None:
+    path_loss_fn = computePathLoss
+  path_loss, incidence_angles = path_loss_fn(
       grant.latitude, grant.longitude, grant.height_agl,
-      constraint.latitude, constraint.longitude, inc_ant_height,
       grant.indoor_deployment,
-      reliability=reliabilities,
-      freq_mhz=FREQ_PROP_MODEL)
-  path_loss = np.array(results.db_loss)
+      constraint.latitude, constraint.longitude, inc_ant_height,
+      num_iteration)
 
   # Compute CBSD antenna gain in the direction of protection point
   ant_gain = antenna.GetStandardAntennaGains(
-      results.incidence_angles.hor_cbsd,
+      incidence_angles.hor_cbsd,
       grant.antenna_azimuth, grant.antenna_beamwidth, grant.antenna_gain)
 
   # Compute EIRP of CBSD grant inside the frequency range of protection constraint
@@ -257,12 +298,13 @@ def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_ty
 
   # Store interference contributions
   interference = InterferenceContribution(randomInterference=K_interf,
-                                          bearing_c_cbsd=results.incidence_angles.hor_rx)
+                                          bearing_c_cbsd=incidence_angles.hor_rx)
   return interference, median_interf
 
 
 def formInterferenceMatrix(grants, grants_ids, constraint,
-                           inc_ant_height, num_iter, dpa_type):
+                           inc_ant_height, num_iter, dpa_type,
+                           path_loss_fn=None):
   """Form the matrix of interference contributions to protection constraint c.
 
   Inputs:
@@ -273,6 +315,7 @@ def formInterferenceMatrix(grants, grants_ids, constraint,
     inc_ant_height:     reference incumbent antenna height (in meters)
     num_iter:           number of random iterations
     dpa_type:           an enum member of class DpaType
+    path_loss_fn:       an optional function used instead of `computePathLoss()`.
 
   Returns:
     A tuple of:
@@ -286,8 +329,15 @@ def formInterferenceMatrix(grants, grants_ids, constraint,
   interf_list = []
   median_interf = []
   for cbsd_grant in grants:
-    interf, median = computeInterference(cbsd_grant, constraint, inc_ant_height,
-                                         num_iter, dpa_type)
+    # Only pass a custom path loss function, so that the memoizing keys of
+    # |InterferenceCacheManager| are unchanged.
+    if path_loss_fn is None:
+      interf, median = computeInterference(cbsd_grant, constraint,
+                                           inc_ant_height, num_iter, dpa_type)
+    else:
+      interf, median = computeInterference(cbsd_grant, constraint,
+                                           inc_ant_height, num_iter, dpa_type,
+                                           path_loss_fn)
     interf_list.append(interf)
     median_interf.append(median)
   # Sort grants by their median interference contribution, smallest to largest
@@ -298,11 +348,49 @@ def formInterferenceMatrix(grants, grants_ids, constraint,
   return I, sorted_grant_ids, sorted_bearings
 
 
+def _percentileLower(x, k):
+  """Returns the k-th smallest values of `x` along first axis.
+
+  Using `k = floor(PROTECTION_PERCENTILE/100 * (len(x)-1))`, this is same as:
+    np.percentile(x, PROTECTION_PERCENTILE, axis=0, interpolation='lower')
+  but uses partial sorting instead of a full sort.
+  """
+  return np.partition(x, k, axis=0)[k]
+
+
+# Relative tolerance bounding the rounding differences between the fast
+# aggregations of |find_nc| (matrix product and cumulative sum) and the
+# reference `np.sum` aggregation, which sum in different orders.
+_AGG_SUM_RTOL = 1e-6
+
+
+def _exceedsThreshold(agg_interf, t_mW, IG, n, k):
+  """Returns True if the aggregate interference of the first n grants exceeds
+  the threshold.
+
+  The fast aggregate interference `agg_interf` is used, unless it is within the
+  rounding tolerance of the threshold, in which case the decision is taken on
+  the reference aggregation of the first n columns of `IG`.
+  """
+  if abs(agg_interf - t_mW) > _AGG_SUM_RTOL * t_mW:
+    return agg_interf > t_mW
+  return _percentileLower(np.sum(IG[:, 0:n], axis=1), k) > t_mW
+
+
 def find_nc(I, bearings, t, beamwidth, min_azimuth, max_azimuth):
   """Returns the index (nc) of the grant in the ordered list of grants such that
   the protection percentile of the interference from the first nc grants is below the
   threshold for all azimuths of the receiver antenna.
 
+  The aggregate interference with all grants is first computed for all azimuths
+  at once (as a matrix product). Then, for each azimuth exceeding the threshold,
+  the aggregate interference of the first n grants is obtained for all n from a
+  cumulative sum over the sorted grants, and a binary search on n finds the
+  number of grants to keep. As these sum in a different order than the
+  reference `np.sum` over the grants, decisions closer to the threshold than
+  the rounding tolerance are taken on the reference aggregation, so that the
+  result is the same.
+
   Inputs:
     I:      2D array of interference contributions (dBm/10 MHz); columns
             correspond to grants, and rows correspond to Monte Carlo iterations.
@@ -325,25 +413,42 @@ def find_nc(I, bearings, t, beamwidth, min_azimuth, max_azimuth):
     azimuths[azimuths>=360] -= 360
 
   # Initialize nc to Nc.
-  Nc = I.shape[1]
+  num_iter, Nc = I.shape
   nc = Nc
+  if nc == 0:
+    return 0
+
+  # Index of the protection percentile in the sorted aggregate interference.
+  k_pct = int(np.floor(PROTECTION_PERCENTILE / 100. * (num_iter - 1)))
 
   # Convert protection threshold and interference matrix to linear units.
   t_mW = np.power(10.0, t/10.0)
   I_mW = np.power(10.0, I/10.0)
 
-  # Loop through every azimuth angle.
-  for azi in azimuths:
+  # Linear receiver antenna gains, for all azimuths and grants.
+  gains = np.array([
+      10**(antenna.GetRadarNormalizedAntennaGains(bearings, azi, beamwidth)/10.0)
+      * np.ones(Nc)
+      for azi in azimuths])
+
+  # Protection percentile of the aggregate interference of all grants, for all
+  # azimuths at once. Azimuths clearly below the threshold need no further
+  # processing (as the aggregate interference can only decrease when removing
+  # grants).
+  agg_interfs = _percentileLower(I_mW.dot(gains.T), k_pct)
 
-    # Calculate interference contributions at output of receiver antenna.
-    dpa_gains = antenna.GetRadarNormalizedAntennaGains(bearings, azi, beamwidth)
-    IG = I_mW * 10**(dpa_gains/10.0)
+  # Loop through every azimuth angle above the threshold.
+  for azi_idx in np.where(agg_interfs > t_mW * (1 - _AGG_SUM_RTOL))[0]:
+
+    # Calculate cumulated interference contributions at output of receiver
+    # antenna: column n-1 holds the aggregate interference of first n grants.
+    IG = I_mW * gains[azi_idx]
+    cum_IG = np.cumsum(IG[:, 0:nc], axis=1)
 
     # Compute the protection percentile of the aggregate interference, and remove
     # grants until the protection threshold is met or all grants are moved.
-    agg_interf = np.percentile(np.sum(IG[:, 0:nc], axis=1),
-                               PROTECTION_PERCENTILE, interpolation='lower')
-    if agg_interf <= t_mW:
+    agg_interf = _percentileLower(cum_IG[:, nc-1], k_pct)
+    if not _exceedsThreshold(agg_interf, t_mW, IG, nc, k_pct):
       continue
 
     # Conduct binary search for nc.
@@ -351,9 +456,8 @@ def find_nc(I, bearings, t, beamwidth, min_azimuth, max_azimuth):
     lo = 0
     while (hi - lo) > 1:
       mid = (hi + lo) / 2
-      agg_interf = np.percentile(np.sum(IG[:, 0:mid], axis=1),
-                                 PROTECTION_PERCENTILE, interpolation='lower')
-      if agg_interf > t_mW:
+      agg_interf = _percentileLower(cum_IG[:, mid-1], k_pct)
+      if _exceedsThreshold(agg_interf, t_mW, IG, mid, k_pct):
         hi = mid
       else:
         lo = mid
@@ -378,7 +482,8 @@ def moveListConstraint(protection_point, low_freq, high_freq,
                        inc_ant_height,
                        num_iter, threshold, beamwidth,
                        neighbor_distances,
-                       min_azimuth=0, max_azimuth=360):
+                       min_azimuth=0, max_azimuth=360,
+                       grant_index=None, path_loss_fn=None):
   """Returns the move list for a given protection constraint.
 
   Note that the returned indexes corresponds to the grant.grant_index
@@ -397,6 +502,10 @@ def moveListConstraint(protection_point, low_freq, high_freq,
       [cata_dist, catb_dist, cata_oob_dist, catb_oob_dist]
     min_azimuth:       The minimum azimuth (degrees) for incumbent transmission.
     max_azimuth:       The maximum azimuth (degrees) for incumbent transmission.
+    grant_index:       An optional |grant_index.GrantSpatialIndex| built on `grants`,
+                       used for fast prefiltering of the neighborhood.
+    path_loss_fn:      An optional function used instead of `computePathLoss()`,
+                       for example a memoized version of it.
 
   Returns:
     A tuple of (move_list_grants, neighbor_list_grants) for that protection constraint:
@@ -418,6 +527,17 @@ def moveListConstraint(protection_point, low_freq, high_freq,
                                          high_frequency=high_freq,
                                          entity_type=data.ProtectedEntityType.DPA)
 
+  # Prefilter the grants in the neighborhood, using the spatial index.
+  # Note: all grants of a CBSD share the same location, so this does not
+  # interfere with the OOB purge below.
+  if grant_index is not None:
+    neighbor_dists = neighbor_distances[0:2]
+    if dpa_type is DpaType.OUT_OF_BAND:
+      neighbor_dists = neighbor_distances[2:]
+    with telemetry.Stage('neighborhood'):
+      grants = [grants[k] for k in grant_index.QueryRadius(
+          constraint.latitude, constraint.longitude, neighbor_dists)]
+
   # DPA Purge algorithm for OOB
   if dpa_type is DpaType.OUT_OF_BAND:
     cbsds_grants_map = defaultdict(list)
@@ -428,19 +548,22 @@ def moveListConstraint(protection_point, low_freq, high_freq,
     grants = [cbsd_grants[0] for cbsd_grants in cbsds_grants_map.values()]
 
   # Identify CBSD grants in the neighborhood of the protection constraint
-  neighbor_grants, neighbor_idxs = findGrantsInsideNeighborhood(
-      grants, constraint, dpa_type, neighbor_distances)
+  with telemetry.Stage('neighborhood'):
+    neighbor_grants, neighbor_idxs = findGrantsInsideNeighborhood(
+        grants, constraint, dpa_type, neighbor_distances)
 
   movelist_grants = []
   if len(neighbor_grants):  # Found CBSDs in the neighborhood
     # Form the matrix of interference contributions
     I, sorted_neighbor_idxs, bearings = formInterferenceMatrix(
-        neighbor_grants, neighbor_idxs, constraint, inc_ant_height, num_iter, dpa_type)
+        neighbor_grants, neighbor_idxs, constraint, inc_ant_height, num_iter, dpa_type,
+        path_loss_fn)
 
     # Find the index (nc) of the grant in the ordered list of grants such that
     # the protection percentile of the interference from the first nc grants is below
     # the threshold for all azimuths of the receiver antenna.
-    nc = find_nc(I, bearings, threshold, beamwidth, min_azimuth, max_azimuth)
+    with telemetry.Stage('aggregation'):
+      nc = find_nc(I, bearings, threshold, beamwidth, min_azimuth, max_azimuth)
 
     # Determine the associated move list (Mc)
     movelist_grants = [grants[k] for k in sorted_neighbor_idxs[nc:]]
@@ -471,6 +594,53 @@ def moveListConstraint(protection_point, low_freq, high_freq,
   return (movelist_grants, neighbor_grants)
 
 
+def moveListConstraintMultiChannel(protection_point, channels,
+                                   grants,
+                                   inc_ant_height,
+                                   num_iter, threshold, beamwidth,
+                                   neighbor_distances,
+                                   min_azimuth=0, max_azimuth=360,
+                                   grant_index=None,
+                                   store=None):
+  """Returns the move lists for several channels of a given protection point.
+
+  This is equivalent to calling `moveListConstraint()` for each channel, except
+  that the path loss of each CBSD to the protection point is calculated only
+  once and reused for all the channels. As a consequence the same path loss
+  random realizations are used across all channels.
+
+  The path loss cache is local to the call (rather than installed in the module
+  like |PathLossCacheManager|), so that the function can be run concurrently
+  in several threads.
+
+  Inputs:
+    protection_point:  A protection point location, having attributes
+                      'latitude' and 'longitude'.
+    channels:          A list of channels as tuple (low_freq_hz, high_freq_hz).
+    store:             An optional |cache.SharedCache| for sharing the path loss
+                       across the worker processes.
+    Other inputs:      See `moveListConstraint()`.
+
+  Returns:
+    A list of tuple (move_list_grants, neighbor_list_grants), one per channel.
+  """
+  path_loss_fn = cache.LruCache(store=store,
+                                version=CACHE_VERSION)(computePathLoss)
+  try:
+    return [moveListConstraint(protection_point, low_freq, high_freq,
+                               grants, inc_ant_height,
+                               num_iter, threshold, beamwidth,
+                               neighbor_distances,
+                               min_azimuth, max_azimuth,
+                               grant_index, path_loss_fn)
+            for low_freq, high_freq in channels]
+  finally:
+    if store is not None:
+      store.Flush()
+    info = path_loss_fn.cache_info()
+    telemetry.AddCacheInfo(computePathLoss.__name__, info.hits, info.misses)
+
+
 def calcAggregatedInterference(protection_point,
                                low_freq, high_freq,
                                grants,
@@ -526,9 +696,10 @@ def calcAggregatedInterference(protection_point,
     grants = [cbsd_grants[0] for cbsd_grants in cbsds_grants_map.values()]
 
   # Identify CBSD grants in the neighborhood of the protection constraint
-  neighbor_grants, _ = findGrantsInsideNeighborhood(grants, constraint,
-                                                    dpa_type,
-                                                    neighbor_distances)
+  with telemetry.Stage('neighborhood'):
+    neighbor_grants, _ = findGrantsInsideNeighborhood(grants, constraint,
+                                                      dpa_type,
+                                                      neighbor_distances)
   if not neighbor_grants:
     return np.asarray(-1000)
   interf_matrix = np.zeros((num_iter, len(neighbor_grants)))
@@ -549,11 +720,12 @@ def calcAggregatedInterference(protection_point,
     azimuths[azimuths>=360] -= 360
 
   agg_interf = np.zeros(len(azimuths))
-  for k, azi in enumerate(azimuths):
-    dpa_gains = antenna.GetRadarNormalizedAntennaGains(bearings, azi, beamwidth)
-    dpa_interf = interf_matrix * 10**(dpa_gains / 10.0)
-    agg_interf[k] = np.percentile(np.sum(dpa_interf, axis=1),
-                                  PROTECTION_PERCENTILE, interpolation='lower')
+  with telemetry.Stage('aggregation'):
+    for k, azi in enumerate(azimuths):
+      dpa_gains = antenna.GetRadarNormalizedAntennaGains(bearings, azi, beamwidth)
+      dpa_interf = interf_matrix * 10**(dpa_gains / 10.0)
+      agg_interf[k] = np.percentile(np.sum(dpa_interf, axis=1),
+                                    PROTECTION_PERCENTILE, interpolation='lower')
   agg_interf = 10 * np.log10(agg_interf)
   return np.max(agg_interf) if do_max else agg_interf
 
@@ -571,14 +743,42 @@ class InterferenceCacheManager(cache.CacheManager):
       interfs = calcAggregatedInterference(...)
       ...
   """
-  def __init__(self, maxsize=None):
+  def __init__(self, maxsize=None, store=None):
+    """Initialize the cache context manager.
+
+    Args:
+      maxsize (int): The maximum cache size (managed in LRU fashion).
+        If None, unlimited size.
+      store: An optional persistent store (for example |cache.PersistentCache|),
+        in which case the random samples are also reused across runs.
+    """
+    super(InterferenceCacheManager, self).__init__(computeInterference, maxsize,
+                                                   store, CACHE_VERSION)
+
+
+class PathLossCacheManager(cache.CacheManager):
+  """Path loss cache context manager.
+
+  By running the DPA routines within this context manager, the frequency
+  independent path loss calculations are cached per CBSD location. Note that
+  subsequent calls for the same link will reuse the same reliability random
+  samples, even if for different channels.
+
+  Usage:
+    with PathLossCacheManager() as cm:
+      # perform calculations for all channels
+      ...
+  """
+  def __init__(self, maxsize=None, store=None):
     """Initialize the cache context manager.
 
     Args:
       maxsize (int): The maximum cache size (managed in LRU fashion).
         If None, unlimited size.
+      store: An optional persistent or shared store (see |cache|).
     """
-    super(InterferenceCacheManager, self).__init__(computeInterference, maxsize)
+    super(PathLossCacheManager, self).__init__(computePathLoss, maxsize,
+                                               store, CACHE_VERSION)
 
 
 #----------------------------------
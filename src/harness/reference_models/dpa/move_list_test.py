@@ -13,11 +13,16 @@
 #    limitations under the License.
 
 
+import functools
+import multiprocessing.pool
 import os
+import threading
+import time
 import unittest
-from collections import namedtuple
+from collections import namedtuple, Counter
 import numpy as np
 
+from reference_models.antenna import antenna
 from reference_models.tools import testutils
 from reference_models.tools import entities
 from reference_models.propagation import wf_itm
@@ -28,6 +33,41 @@ from reference_models.dpa import move_list
 ProtectionPoint = namedtuple('ProtectionPoint', ['latitude', 'longitude'])
 
 
+def find_nc_original(I, bearings, t, beamwidth, min_azimuth, max_azimuth):
+  """Original find_nc, recomputing the aggregate interference at each step."""
+  if beamwidth == 360.0:
+    azimuths = [0]
+  else:
+    if max_azimuth < min_azimuth:
+      max_azimuth += 360
+    azimuths = np.arange(min_azimuth, max_azimuth, beamwidth/2.0)
+    azimuths[azimuths>=360] -= 360
+  nc = I.shape[1]
+  t_mW = np.power(10.0, t/10.0)
+  I_mW = np.power(10.0, I/10.0)
+  for azi in azimuths:
+    dpa_gains = antenna.GetRadarNormalizedAntennaGains(bearings, azi, beamwidth)
+    IG = I_mW * 10**(dpa_gains/10.0)
+    agg_interf = np.percentile(np.sum(IG[:, 0:nc], axis=1),
+                               95, interpolation='lower')
+    if agg_interf <= t_mW:
+      continue
+    hi = nc
+    lo = 0
+    while (hi - lo) > 1:
+      mid = (hi + lo) / 2
+      agg_interf = np.percentile(np.sum(IG[:, 0:mid], axis=1),
+                                 95, interpolation='lower')
+      if agg_interf > t_mW:
+        hi = mid
+      else:
+        lo = mid
+    nc = lo
+    if nc == 0:
+      return 0
+  return nc
+
+
 class TestDpa(unittest.TestCase):
 
   def setUp(self):
@@ -204,6 +244,125 @@ class TestDpa(unittest.TestCase):
     self.assertListEqual(nbor_grants, grants)
     self.assertListEqual(move_grants, [])
 
+  def test_find_nc_vs_original_at_threshold(self):
+    # Thresholds set at the aggregate interference of some number of grants, so
+    # that the summation order differences matter.
+    np.random.seed(1249)
+    I = np.random.uniform(-175, -140, (500, 200))
+    bearings = np.random.uniform(0, 360, 200)
+    I_mW = np.power(10.0, I/10.0)
+    for n in [1, 37, 100, 150, 199]:
+      agg_interf = np.percentile(np.sum(I_mW[:, 0:n], axis=1),
+                                 95, interpolation='lower')
+      t = 10 * np.log10(agg_interf)
+      for dt in [-1e-12, 0, 1e-12]:
+        self.assertEqual(
+            move_list.find_nc(I, bearings, t + dt, 360, 0, 360),
+            find_nc_original(I, bearings, t + dt, 360, 0, 360))
+
+  def test_find_nc_vs_original(self):
+    np.random.seed(1248)
+    for num_grants in [1, 7, 300]:
+      I = np.random.uniform(-175, -140, (500, num_grants))
+      bearings = np.random.uniform(0, 360, num_grants)
+      for beamwidth, min_azi, max_azi in [(3, 0, 360), (360, 0, 360),
+                                          (10, 300, 60)]:
+        for t in [-150, -144, -135, -120]:
+          self.assertEqual(
+              move_list.find_nc(I, bearings, t, beamwidth, min_azi, max_azi),
+              find_nc_original(I, bearings, t, beamwidth, min_azi, max_azi))
+
+  def test_movelist_multichannel(self):
+    np.random.seed(1248)
+    fake_itm = testutils.FakePropagationPredictor(
+        dist_type='REAL', factor=1.0, offset=(144+30-0.1) - 30.0)
+    num_itm_calls = [0]
+    def CountingItm(*args, **kwargs):
+      num_itm_calls[0] += 1
+      return fake_itm(*args, **kwargs)
+    wf_itm.CalcItmPropagationLoss = CountingItm
+    point = ProtectionPoint(latitude=36.815, longitude=-76.292)
+    grants = entities.ConvertToCbsdGrantInfo(
+        entities.GenerateCbsdList(
+            50, template_cbsd=entities.CBSD_TEMPLATE_CAT_A_OUTDOOR,
+            ref_latitude=36.815, ref_longitude=-76.292,
+            min_distance_km=10, max_distance_km=60),
+        min_freq_mhz=3550,
+        max_freq_mhz=3650)
+    channels = [(3540e6, 3550e6), (3550e6, 3560e6), (3600e6, 3610e6)]
+
+    lists = [move_list.moveListConstraint(
+        point, low_freq, high_freq, grants,
+        50, 200, -144, 3, (150, 200, 0, 25))
+             for low_freq, high_freq in channels]
+    num_calls_single = num_itm_calls[0]
+
+    num_itm_calls[0] = 0
+    multi_lists = move_list.moveListConstraintMultiChannel(
+        point, channels, grants,
+        50, 200, -144, 3, (150, 200, 0, 25))
+    self.assertLess(num_itm_calls[0], num_calls_single)
+    # Each CBSD location path loss is computed once only.
+    self.assertEqual(num_itm_calls[0],
+                     len(set((g.latitude, g.longitude) for g in grants
+                             if g.low_frequency < 3610e6)))
+    # Deterministic propagation model gives same move lists.
+    for (move, nbor), (multi_move, multi_nbor) in zip(lists, multi_lists):
+      self.assertSetEqual(set(move), set(multi_move))
+      self.assertSetEqual(set(nbor), set(multi_nbor))
+    self.assertTrue(any(move for move, _ in multi_lists))
+
+  def test_movelist_multichannel_threads(self):
+    np.random.seed(1248)
+    fake_itm = testutils.FakePropagationPredictor(
+        dist_type='REAL', factor=1.0, offset=(144+30-0.1) - 30.0)
+    lock = threading.Lock()
+    num_itm_calls = Counter()
+    def CountingItm(*args, **kwargs):
+      with lock:
+        num_itm_calls[(args[3], args[4])] += 1
+      time.sleep(0.001)  # Let the other threads run concurrently.
+      return fake_itm(*args, **kwargs)
+    wf_itm.CalcItmPropagationLoss = CountingItm
+    points = [ProtectionPoint(latitude=36.815 + 0.05 * k, longitude=-76.292)
+              for k in range(4)]
+    grants = entities.ConvertToCbsdGrantInfo(
+        entities.GenerateCbsdList(
+            30, template_cbsd=entities.CBSD_TEMPLATE_CAT_A_OUTDOOR,
+            ref_latitude=36.815, ref_longitude=-76.292,
+            min_distance_km=10, max_distance_km=60),
+        min_freq_mhz=3550,
+        max_freq_mhz=3650)
+    channels = [(3550e6, 3560e6), (3560e6, 3570e6), (3600e6, 3610e6)]
+    move_list_fn = functools.partial(
+        move_list.moveListConstraintMultiChannel,
+        channels=channels, grants=grants, inc_ant_height=50, num_iter=200,
+        threshold=-144, beamwidth=3, neighbor_distances=(150, 200, 0, 25))
+
+    seq_lists = map(move_list_fn, points)
+    pool = multiprocessing.pool.ThreadPool(4)
+    try:
+      num_itm_calls.clear()
+      thread_lists = pool.map(move_list_fn, points, chunksize=1)
+    finally:
+      pool.close()
+      pool.join()
+    # Each CBSD location path loss is computed once only for each point.
+    num_locations = len(set((g.latitude, g.longitude) for g in grants
+                            if g.low_frequency < 3610e6))
+    self.assertEqual(sorted(num_itm_calls.keys()),
+                     sorted((p.latitude, p.longitude) for p in points))
+    self.assertTrue(all(num_calls == num_locations
+                        for num_calls in num_itm_calls.values()))
+    # Same move lists per channel as the sequential run.
+    for seq_point_lists, thread_point_lists in zip(seq_lists, thread_lists):
+      for (move, nbor), (thread_move, thread_nbor) in zip(seq_point_lists,
+                                                          thread_point_lists):
+        self.assertSetEqual(set(move), set(thread_move))
+        self.assertSetEqual(set(nbor), set(thread_nbor))
+    self.assertTrue(any(move for point_lists in thread_lists
+                        for move, _ in point_lists))
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -37,19 +37,23 @@ census_tract_driver = census_tract.CensusTractDriver()
 
 
 
-def ConfigureTerrainDriver(terrain_dir=None, cache_size=None):
+def ConfigureTerrainDriver(terrain_dir=None, cache_size=None, do_mmap=None):
   """Configure the NED terrain driver.
 
-  Note that memory usage is about cache_size * 50MB.
+  Note that memory usage is about cache_size * 50MB, unless the tiles are
+  memory-mapped in which case they are shared in the OS page cache.
 
   Inputs:
     terrain_dir: if specified, change the terrain directory.
     cache_size:  if specified, change the terrain tile cache size.
+    do_mmap:     if specified, set or unset the memory-mapped tile mode.
   """
   if terrain_dir is not None:
     terrain_driver.SetTerrainDirectory(terrain_dir)
   if cache_size is not None:
     terrain_driver.SetCacheSize(cache_size)
+  if do_mmap is not None:
+    terrain_driver.SetMemoryMappedMode(do_mmap)
 
 
 def ConfigureNlcdDriver(nlcd_dir=None, cache_size=None):
@@ -83,3 +87,46 @@ def ConfigureCensusTractDriver(census_tract_dir=None):
   """
   if census_tract_dir is not None:
     census_tract_driver.SetCensusTractDirectory(census_tract_dir)
+
+
+def Preload(terrain_tiles=None, nlcd_tiles=None, itu_data=False,
+            zone_getters=None, terrain_config=None, nlcd_config=None,
+            itu_dir=None):
+  """Configures the drivers and preloads their data.
+
+  This is typically used as the |mpool| worker initializer, so that the
+  data loading cost is paid once at pool creation, for example:
+    mpool.Configure(-1, initializer=drive.Preload,
+                    initargs=(terrain_tiles, None, True, [zones.GetUsBorder]))
+
+  Note that the terrain and NLCD cache sizes shall be large enough to hold all
+  the preloaded tiles.
+
+  Inputs:
+    terrain_tiles: if specified, a sequence of terrain tiles to preload, as
+      (ilat, ilon) integer coordinates of their NW corner.
+    nlcd_tiles: if specified, a sequence of NLCD tiles to preload, as (ilat, ilon)
+      integer coordinates of their NW corner.
+    itu_data: if True, preloads the ITU climate and refractivity data.
+    zone_getters: if specified, a sequence of zone getter functions to call,
+      for example [zones.GetCoastalDpaZones, zones.GetUsBorder].
+    terrain_config: if specified, a dict of `ConfigureTerrainDriver()`
+      arguments, applied before preloading.
+    nlcd_config: if specified, a dict of `ConfigureNlcdDriver()` arguments,
+      applied before preloading.
+    itu_dir: if specified, changes the ITU data directory.
+  """
+  if terrain_config:
+    ConfigureTerrainDriver(**terrain_config)
+  if nlcd_config:
+    ConfigureNlcdDriver(**nlcd_config)
+  ConfigureItuDrivers(itu_dir)
+  for ilat, ilon in terrain_tiles or []:
+    terrain_driver.GetTile(ilat, ilon)
+  for ilat, ilon in nlcd_tiles or []:
+    nlcd_driver.GetTile(ilat, ilon)
+  if itu_data:
+    climate_driver.Load()
+    refract_driver.Load()
+  for zone_getter in zone_getters or []:
+    zone_getter()
@@ -170,6 +170,7 @@ class NlcdDriver:
       try:
         tile = self._tile_cache[key]
         self._CacheLruUpdate(key)
+        self.stats.UpdateForTileHit()
         return tile
       except KeyError:
         if key not in _TILES_KEYS:
@@ -198,6 +199,7 @@ class NlcdDriver:
         key_to_evict = min(self._tile_lru, key=self._tile_lru.get)
         self._tile_cache.pop(key_to_evict)
         self._tile_lru.pop(key_to_evict)
+        self.stats.UpdateForTileEvict()
       self._CacheLruUpdate(key)
       self.stats.UpdateForTileLoad(ilat, ilon)
 
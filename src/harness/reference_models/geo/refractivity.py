@@ -19,11 +19,11 @@ Standalone execution:
 """
 
 import logging
-import math
 import numpy as np
 import os
 import sys
 
+from reference_models.common import cache
 from reference_models.geo import CONFIG
 
 
@@ -32,6 +32,8 @@ class RefractivityIndexer:
 
   It retrieves the nearest four refractivity points from ITU data file with
   1.5 degree grid, and interpolates bilinearly between those points.
+  The data file is parsed once, then loaded from a binary cache (see
+  `cache.LoadTextArray()`).
 
   Typical usage:
     refractor = RefractivityIndexer()
@@ -61,30 +63,39 @@ class RefractivityIndexer:
       self._datafile = os.path.join(self._datafile, 'n050.txt')
     self._data = None
     if do_load:
-      self._data = np.loadtxt(self._datafile)
+      self.Load()
+
+  def Load(self):
+    """Loads the data, if not already loaded."""
+    if self._data is None:
+      self._data = cache.LoadTextArray(self._datafile)
+      logging.info('Loaded refractivity data from %s' % self._datafile)
 
   def Refractivity(self, lat, lon):
     """Returns ITU refractivity for the specified lat/lon.
 
+    This function is vectorized for efficiency.
+
     Inputs:
-      lat, lon : the coordinates of a point.
+      lat, lon : the coordinates of a point, either scalars or iterables.
 
     Returns:
-      the sea level refractivity on that point.
+      the sea level refractivity on that point: either a scalar if lat is
+      scalar, or an ndarray otherwise.
     """
-    if self._data is None:
-      self._data = np.loadtxt(self._datafile)
-      logging.info('Loaded refractivity data from %s' % self._datafile)
+    self.Load()
 
-    if lon < 0:
-      lon = lon + 360.0
+    is_scalar = np.isscalar(lat)
+    lat = np.atleast_1d(lat)
+    lon = np.atleast_1d(lon)
+    lon = np.where(lon < 0, lon + 360.0, lon)
 
     row = (self._lat_start - lat) / self._delta_lat
     col = (lon - self._lon_start) / self._delta_lon
 
     # Bilinear interpolation on values
-    irow = int(math.floor(row))
-    icol = int(math.floor(col))
+    irow = np.floor(row).astype(int)
+    icol = np.floor(col).astype(int)
 
     r00 = self._data[irow,   icol]
     r11 = self._data[irow+1, icol+1]
@@ -97,6 +108,7 @@ class RefractivityIndexer:
                      r01 * (1-alpha_r) * alpha_c +
                      r10 * alpha_r * (1-alpha_c) )
 
+    if is_scalar: return refractivity[0]
     return refractivity
 
 if __name__ == '__main__':
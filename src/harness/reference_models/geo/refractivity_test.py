@@ -60,5 +60,13 @@ class TestRefractivity(unittest.TestCase):
     self.assertEqual(self.refDriver.Refractivity(1.5, 0.375), 150)
     self.assertEqual(self.refDriver.Refractivity(0.375, 0.375), 150*0.25 + 20*0.75)
 
+  def test_vectorized(self):
+    lats = np.random.uniform(-60, 60, 100)
+    lons = np.random.uniform(-180, 180, 100)
+    refracs = self.refDriver.Refractivity(lats, lons)
+    self.assertEqual(refracs.shape, (100,))
+    for lat, lon, refrac in zip(lats, lons, refracs):
+      self.assertEqual(self.refDriver.Refractivity(lat, lon), refrac)
+
 if __name__ == '__main__':
   unittest.main()
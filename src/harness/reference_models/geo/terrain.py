@@ -51,14 +51,25 @@ class TerrainDriver:
    - set the cache_size to the appropriate value for the region size.
   One tile being 1x1 degrees typically covers around 110km x 90km in continental US.
 
+  Tiles can be either fully read in private memory (default), or memory-mapped.
+  In memory-mapped mode, the tile files are mapped read-only, so that:
+   - only the pages actually sampled are read from disk.
+   - all processes (for example the |mpool| workers) share the OS page cache
+     instead of holding their own private copy of each tile.
+  In that mode the LRU cache only manages the mapping handles, and the
+  `cache_size` can be set much higher (for example to cover all CONUS).
+
   Attributes:
     cache_size (int): maximum number of tiles cached in memory.
-      Memory usage is about 50MB per tile.
+      Memory usage is about 50MB per tile (in non memory-mapped mode).
+    do_mmap (bool): True if tiles are memory-mapped.
     stats (|tile.TileStats|): a tile statistic counter.
 
   Typical usage:
     # Initialize driver
     driver = TerrainDriver(cache_size=8)
+    # or in memory-mapped mode
+    driver = TerrainDriver(cache_size=1000, do_mmap=True)
 
     # Get the altitude in one or several locations
     altitudes = driver.GetTerrainElevation(lat, lon, do_interp=True)
@@ -74,21 +85,32 @@ class TerrainDriver:
     driver.stats.Report()  # simple statistic reporting
     driver.stats.Reset()   # reset the statistic counter
   """
-  def __init__(self, terrain_directory=None, cache_size=8):
-    self.SetTerrainDirectory(terrain_directory)
-    self.SetCacheSize(cache_size)
+  def __init__(self, terrain_directory=None, cache_size=8, do_mmap=False):
     # Keep a small tile cache, LRU fashion
     self._tile_cache = {}
     self._tile_lru = {}
-    self.stats = tiles.TileStats('ned')
     self._lock = threading.Lock()
+    self._terrain_dir = None
+    self.SetTerrainDirectory(terrain_directory)
+    self.SetCacheSize(cache_size)
+    self.stats = tiles.TileStats('ned')
     self.do_flat = False
+    self.do_mmap = False
+    self.SetMemoryMappedMode(do_mmap)
 
   def SetTerrainDirectory(self, terrain_directory):
-    """Configures the terrain data directory."""
-    self._terrain_dir = terrain_directory
-    if self._terrain_dir is None:
-      self._terrain_dir = CONFIG.GetTerrainDir()
+    """Configures the terrain data directory.
+
+    When changing directory, the tile cache is flushed.
+    """
+    if terrain_directory is None:
+      terrain_directory = CONFIG.GetTerrainDir()
+    if terrain_directory == self._terrain_dir:
+      return
+    with self._lock:
+      self._tile_cache.clear()
+      self._tile_lru.clear()
+      self._terrain_dir = terrain_directory
 
   def SetFlatEarthMode(self, do_flat=False):
     """Sets the driver in flat-earth mode.
@@ -106,6 +128,23 @@ class TerrainDriver:
     if cache_size < 1: cache_size = 1
     self.cache_size = cache_size
 
+  def SetMemoryMappedMode(self, do_mmap=False):
+    """Sets the driver in memory-mapped tile mode.
+
+    When changing mode, the tile cache is flushed.
+
+    Inputs:
+      do_mmap (bool): if True, the tiles are memory-mapped (read-only) instead
+        of being fully read in private memory.
+    """
+    do_mmap = bool(do_mmap)
+    if do_mmap == self.do_mmap:
+      return
+    with self._lock:
+      self._tile_cache.clear()
+      self._tile_lru.clear()
+      self.do_mmap = do_mmap
+
   def _CacheLruUpdate(self, key):
     """Updates the cache LRU."""
     self._tile_lru[key] = time.time()
@@ -130,6 +169,7 @@ class TerrainDriver:
       try:
         tile = self._tile_cache[key]
         self._CacheLruUpdate(key)
+        self.stats.UpdateForTileHit()
         return tile
       except KeyError:
         if key not in _TILES_KEYS:
@@ -147,17 +187,28 @@ class TerrainDriver:
                    else tile_name2)
 
       try:
-        self._tile_cache[key] = np.fromfile(
-            os.path.join(self._terrain_dir, tile_name),
-            dtype=np.float32).reshape(_TILE_DIM, _TILE_DIM)
+        if self.do_mmap:
+          # Use a plain ndarray view on the mapping, so that indexing returns
+          # regular arrays rather than memmap objects. The tile stays read-only.
+          self._tile_cache[key] = np.memmap(
+              os.path.join(self._terrain_dir, tile_name),
+              dtype=np.float32, mode='r',
+              shape=(_TILE_DIM, _TILE_DIM)).view(np.ndarray)
+        else:
+          self._tile_cache[key] = np.fromfile(
+              os.path.join(self._terrain_dir, tile_name),
+              dtype=np.float32).reshape(_TILE_DIM, _TILE_DIM)
       except IOError:
         raise IOError('NED Tile (%d,%d) not found.' % (ilat, ilon))
 
       # Check cache size and evict oldest
+      # Note: in memory-mapped mode, this only releases the mapping handle, the
+      # data stays in the OS page cache.
       if len(self._tile_cache) > self.cache_size:
         key_to_evict = min(self._tile_lru, key=self._tile_lru.get)
         self._tile_cache.pop(key_to_evict)
         self._tile_lru.pop(key_to_evict)
+        self.stats.UpdateForTileEvict()
       self._CacheLruUpdate(key)
       self.stats.UpdateForTileLoad(ilat, ilon)
 
@@ -299,6 +350,136 @@ class TerrainDriver:
     elev.extend(self.GetTerrainElevation(lats, lons, do_interp))
     return elev
 
+  def TerrainProfiles(self, lat1s, lon1s, lat2s, lon2s,
+                      target_res_meter=-1,
+                      target_res_arcsec=1,
+                      do_interp=True,
+                      max_points=-1):
+    """Returns the terrain profiles for a batch of paths.
+
+    This is the batched version of `TerrainProfile`: all the geodesics are
+    sampled first, and the terrain elevations of all the samples are then read
+    in a single pass (ie grouping all the samples of all paths by tile).
+    Each returned profile is strictly identical to the one returned by
+    `TerrainProfile` for the same path.
+
+    Inputs:
+      lat1s, lon1s: coordinates of starting points (in degrees), as sequences.
+      lat2s, lon2s: coordinates of final points (in degrees), as sequences.
+        A scalar can be used for either the starting or final point, in which
+        case it is broadcasted to all paths.
+      target_res_meter: target resolution between points (in meters).
+        If unspecified, uses 'target_res_arcsec' instead.
+      target_res_arcsec: target resolution between 2 point (in arcsec).
+        Only used if 'target_res_meter' unspecified.
+      do_interp: if True (default), use bilinear interpolation on terrain data.
+      max_points: if positive, resolution extended if number of points is beyond
+                  this number.
+
+    Returns:
+      a 2D ndarray of shape (num_paths, max_num_points+2) holding in each row
+      an elevation profile in the ITS format:
+         elev[k, 0] = number of terrain points - 1 (i.e., number of intervals)
+         elev[k, 1] = distance between sample points (meters)
+         elev[k, 2]...elev[k, npts+1] = Terrain elevation (meters)
+      Rows are zero padded beyond their last terrain point, ie the k-th ITS
+      profile is: `elev[k, :int(elev[k, 0])+3]`.
+    """
+    lat1s, lon1s, lat2s, lon2s = np.broadcast_arrays(
+        np.atleast_1d(lat1s), np.atleast_1d(lon1s),
+        np.atleast_1d(lat2s), np.atleast_1d(lon2s))
+    num_paths = len(lat1s)
+
+    if target_res_meter < 0:
+      target_res_meter = _RADIUS_EARTH_METERS * np.radians(target_res_arcsec/3600.)
+
+    # Sample all the geodesics at once
+    if not num_paths:
+      return np.zeros((0, 2))
+    dists, bearings, _ = vincenty.GeodesicDistanceBearings(lat1s, lon1s,
+                                                           lat2s, lon2s)
+    num_points = np.ceil(dists * 1000. / float(target_res_meter)) + 1
+    if max_points > 0:
+      num_points = np.minimum(num_points, max_points)
+    num_points = np.maximum(num_points, 2).astype(int)
+    resolutions = dists * 1000. / (num_points-1).astype(float)
+    # Same as vincenty.GeodesicSampling(), without recomputing the bearing
+    steps_km = dists / (num_points-1).astype(float)
+    offsets = np.concatenate(([0], np.cumsum(num_points)))
+    path_idxs = np.repeat(np.arange(num_paths), num_points)
+    point_idxs = np.arange(offsets[-1]) - offsets[path_idxs]
+    all_lats, all_lons, _ = vincenty.GeodesicPoints(
+        lat1s[path_idxs], lon1s[path_idxs],
+        steps_km[path_idxs] * point_idxs, bearings[path_idxs])
+    all_lats[offsets[:-1]], all_lons[offsets[:-1]] = lat1s, lon1s
+    all_lats[offsets[1:]-1], all_lons[offsets[1:]-1] = lat2s, lon2s
+
+    # Read all the elevations at once
+    all_elevs = self.GetTerrainElevation(all_lats, all_lons, do_interp)
+    # Pack into ITS profiles
+    profiles = np.zeros((num_paths, np.max(num_points) + 2))
+    profiles[:, 0] = num_points - 1
+    profiles[:, 1] = resolutions
+    for k in xrange(num_paths):
+      profiles[k, 2:num_points[k]+2] = all_elevs[offsets[k]:offsets[k+1]]
+    return profiles
+
+  def RadialProfiles(self, lat, lon, bearing, distances_km,
+                     target_res_meter=30.,
+                     do_interp=True,
+                     max_points=-1,
+                     oversampling=3):
+    """Returns approximate terrain profiles from a point to points of a radial.
+
+    All the profiles are derived from a single master profile along the radial,
+    sampled with a step `target_res_meter / oversampling`: the elevations of
+    each profile are linearly interpolated from the master profile.
+    This is much faster than `TerrainProfiles` for radials with many points,
+    but the profiles are only an approximation of the ones returned by
+    `TerrainProfile` for each point (the sampling of each profile is the same,
+    but the elevations are interpolated from the master profile).
+
+    Inputs:
+      lat, lon: coordinates of the starting point (in degrees).
+      bearing: the bearing of the radial (in degrees).
+      distances_km: the distances of the final points on the radial (km),
+        as a sequence.
+      target_res_meter: target resolution between points (in meters).
+      do_interp: if True (default), use bilinear interpolation on terrain data.
+      max_points: if positive, resolution extended if number of points is beyond
+                  this number.
+      oversampling: the oversampling factor of the master profile.
+
+    Returns:
+      a 2D ndarray holding in each row an elevation profile in the ITS format,
+      zero padded (see `TerrainProfiles`).
+    """
+    distances_km = np.atleast_1d(np.asarray(distances_km, dtype=float))
+    if not len(distances_km):
+      return np.zeros((0, 2))
+
+    # The master profile.
+    master_step_km = target_res_meter / 1000. / oversampling
+    num_master_points = int(np.ceil(np.max(distances_km) / master_step_km)) + 1
+    master_dists_km = master_step_km * np.arange(num_master_points)
+    lats, lons, _ = vincenty.GeodesicPoints(lat, lon, master_dists_km, bearing)
+    lats[0], lons[0] = lat, lon
+    master_elevs = self.GetTerrainElevation(lats, lons, do_interp)
+
+    # Derive each profile from the master profile.
+    num_points = np.ceil(distances_km * 1000. / float(target_res_meter)) + 1
+    if max_points > 0:
+      num_points = np.minimum(num_points, max_points)
+    num_points = np.maximum(num_points, 2).astype(int)
+    profiles = np.zeros((len(distances_km), np.max(num_points) + 2))
+    profiles[:, 0] = num_points - 1
+    profiles[:, 1] = distances_km * 1000. / (num_points-1).astype(float)
+    for k, (dist_km, npts) in enumerate(zip(distances_km, num_points)):
+      profiles[k, 2:npts+2] = np.interp(
+          dist_km / float(npts-1) * np.arange(npts),
+          master_dists_km, master_elevs)
+    return profiles
+
   def ComputeNormalizedHaat(self, lat, lon):
     """Computes normalized HAAT (Height Above Average Terrain).
 
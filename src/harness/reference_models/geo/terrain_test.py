@@ -17,6 +17,7 @@ import logging
 import numpy as np
 import unittest
 import shutil
+import tempfile
 
 from reference_models.tools import testutils
 from reference_models.geo import terrain
@@ -149,5 +150,72 @@ class TestTerrain(unittest.TestCase):
     self.assertEqual(haat, 0.0)
     self.assertEqual(h0, 0.0)
 
+
+class TestTerrainSynthetic(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # Synthetic tiles, so this does not depend on the NED test data.
+    cls.tmp_dir = tempfile.mkdtemp()
+    dim = terrain._TILE_DIM
+    for k, tile in enumerate(['n38w123', 'n37w123']):
+      elev = (np.arange(dim * dim, dtype=np.float32).reshape(dim, dim)
+              % 1013 + 100 * k)
+      elev.tofile(os.path.join(cls.tmp_dir, 'float%s_1_std.flt' % tile))
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tmp_dir)
+
+  def test_same_as_regular(self):
+    lats = 36.5 + np.arange(0.01, 0.99, 0.01)
+    lons = -122.99 + np.arange(0.01, 0.99, 0.01)
+    driver = terrain.TerrainDriver(self.tmp_dir)
+    mmap_driver = terrain.TerrainDriver(self.tmp_dir, do_mmap=True)
+    for do_interp in [False, True]:
+      elev = driver.GetTerrainElevation(lats, lons, do_interp)
+      mmap_elev = mmap_driver.GetTerrainElevation(lats, lons, do_interp)
+      self.assertEqual(np.max(np.abs(elev - mmap_elev)), 0)
+    self.assertIsInstance(mmap_driver._tile_cache.values()[0].base, np.memmap)
+    self.assertEqual(driver.TerrainProfile(36.6, -122.5, 37.4, -122.2),
+                     mmap_driver.TerrainProfile(36.6, -122.5, 37.4, -122.2))
+
+  def test_cache_eviction(self):
+    lats = 36.5 + np.arange(0.01, 0.99, 0.01)
+    lons = -122.99 + np.arange(0.01, 0.99, 0.01)
+    driver = terrain.TerrainDriver(self.tmp_dir, cache_size=1, do_mmap=True)
+    elev = driver.GetTerrainElevation(lats, lons, False)
+    self.assertEqual(len(driver._tile_cache), 1)
+    self.assertEqual(len(driver._tile_lru), 1)
+    # Switching mode flushes the cache
+    driver.SetMemoryMappedMode(False)
+    self.assertEqual(len(driver._tile_cache), 0)
+    elev2 = driver.GetTerrainElevation(lats, lons, False)
+    self.assertEqual(np.max(np.abs(elev - elev2)), 0)
+
+  def test_batched_profiles(self):
+    driver = terrain.TerrainDriver(self.tmp_dir)
+    lat1s = [36.6, 37.2, 37.5, 36.9]
+    lon1s = [-122.5, -122.8, -122.3, -122.1]
+    lat2s = [37.4, 37.25, 37.5, 36.9]
+    lon2s = [-122.2, -122.7, -122.3, -122.05]
+    for max_points in [-1, 1501]:
+      profiles = driver.TerrainProfiles(lat1s, lon1s, lat2s, lon2s,
+                                        target_res_meter=30.,
+                                        max_points=max_points)
+      self.assertEqual(profiles.shape[0], 4)
+      for k in range(4):
+        profile = driver.TerrainProfile(lat1s[k], lon1s[k], lat2s[k], lon2s[k],
+                                        target_res_meter=30.,
+                                        max_points=max_points)
+        npts = int(profiles[k, 0]) + 1
+        self.assertEqual(list(profiles[k, :npts+2]), profile)
+        self.assertTrue(np.all(profiles[k, npts+2:] == 0))
+
+  def test_missing_tile(self):
+    driver = terrain.TerrainDriver(self.tmp_dir, do_mmap=True)
+    with self.assertRaises(IOError):
+      driver.GetTerrainElevation(lat=37.75, lon=-121.9999, do_interp=False)
+
 if __name__ == '__main__':
   unittest.main()
@@ -22,20 +22,40 @@ Also provides a simple statistic counter for tile hit analysis.
 
 import numpy as np
 
+from reference_models.common import telemetry
+
 
 class TileStats(object):
   """Tile access statistics & analysis.
+
+  Attributes:
+    type: The tile type, 'ned' or 'nlcd'.
+    tiles_stats: The number of loads per tile, as a dict {(ilat, ilon): count}.
+    num_hits: The number of tile accesses served from the tile cache.
+    num_evictions: The number of tiles evicted from the tile cache.
   """
   def __init__(self, type='ned'):
     """Initializes the tile accessor for type 'ned' or 'nlcd'."""
+    self.type = type
     self._tiles_set = NED_TILES if type == 'ned' else NLCD_TILES
     self.Reset()
+    telemetry.RegisterTileStats(self)
 
   def UpdateForTileLoad(self, ilat, ilon):
     if (ilat, ilon) not in self._tiles_set:
       return
     self.tiles_stats[(ilat, ilon)] += 1
 
+  def UpdateForTileHit(self):
+    self.num_hits += 1
+
+  def UpdateForTileEvict(self):
+    self.num_evictions += 1
+
+  def NumLoads(self):
+    """Returns the total number of tile loads."""
+    return sum(self.tiles_stats.itervalues())
+
   def ActiveTilesCount(self):
     counts = [cnt for cnt in self.tiles_stats.values() if cnt > 0]
     num_active_tiles = len(counts)
@@ -43,6 +63,8 @@ class TileStats(object):
 
   def Reset(self):
     self.tiles_stats = {tile: 0 for tile in self._tiles_set}
+    self.num_hits = 0
+    self.num_evictions = 0
 
   def Report(self):
     num_active_tiles, counts = self.ActiveTilesCount()
@@ -50,6 +72,8 @@ class TileStats(object):
         total=num_active_tiles, max=len(self._tiles_set))
     print "Total load ops: {total}".format(
         total=sum(counts))
+    print "Evictions: {evictions} - Cache hits: {hits}".format(
+        evictions=self.num_evictions, hits=self.num_hits)
     print "Active tiles statistics (#loads per used tiles):"
     print "  Avg:{avg} (std={std})".format(
         avg=np.mean(counts), std=np.std(counts))
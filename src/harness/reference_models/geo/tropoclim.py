@@ -23,6 +23,7 @@ import os
 import sys
 import numpy as np
 
+from reference_models.common import cache
 from reference_models.geo import CONFIG
 
 
@@ -31,6 +32,8 @@ class ClimateIndexer:
 
   The given lat/lon is rounded to the nearest half-degree point and that
   coordinate is used for obtaining the climate value.
+  The data file is parsed once, then loaded from a binary cache (see
+  `cache.LoadTextArray()`).
 
   Usage:
     climater = ClimateIndexer()
@@ -63,7 +66,13 @@ class ClimateIndexer:
       self.datafile = os.path.join(self.datafile, 'TropoClim.txt')
     self._data = None
     if do_load:
-      self._data = np.loadtxt(self.datafile, dtype=np.int)
+      self.Load()
+
+  def Load(self):
+    """Loads the data, if not already loaded."""
+    if self._data is None:
+      self._data = cache.LoadTextArray(self.datafile, dtype=np.int)
+      logging.info('Loaded climate data from %s' % self.datafile)
 
   def TropoClim(self, lat, lon):
     """Returns ITU climate zone for the specified lat/lon.
@@ -79,18 +88,28 @@ class ClimateIndexer:
 
     Note that 'Sea' climate is returned as value 7, which differs
     from original TropoClim file encoding at 0.
+
+    This function is vectorized for efficiency.
+
+    Inputs:
+      lat, lon : the coordinates of a point, either scalars or iterables.
+
+    Returns:
+      the climate code: either a scalar if lat is scalar, or an ndarray
+      otherwise.
     """
-    if self._data is None:
-      self._data = np.loadtxt(self.datafile, dtype=np.int)
-      logging.info('Loaded climate data from %s' % self.datafile)
+    self.Load()
 
-    irow = int((self._lat_start - lat)/self._delta_lat + 0.5)
-    icol = int((lon - self._lon_start)/self._delta_lon + 0.5)
+    is_scalar = np.isscalar(lat)
+    lat = np.atleast_1d(lat)
+    lon = np.atleast_1d(lon)
+    irow = ((self._lat_start - lat)/self._delta_lat + 0.5).astype(int)
+    icol = ((lon - self._lon_start)/self._delta_lon + 0.5).astype(int)
 
     climate = self._data[irow, icol]
-    if climate == 0:
-      climate = 7
+    climate = np.where(climate == 0, 7, climate)
 
+    if is_scalar: return climate[0]
     return climate
 
 _ZONE_NAMES = [
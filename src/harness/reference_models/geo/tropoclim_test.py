@@ -50,5 +50,11 @@ class TestTropoclim(unittest.TestCase):
     r0 = self.climDriver.TropoClim(-30, -20)
     self.assertEqual(r0, 7)
 
+  def test_vectorized(self):
+    lats = [90, 50, 40, 0, -30]
+    lons = [0, -90, -120, 20, -20]
+    self.assertEqual(list(self.climDriver.TropoClim(lats, lons)),
+                     [7, 5, 4, 1, 7])
+
 if __name__ == '__main__':
   unittest.main()
@@ -19,6 +19,7 @@ import json
 import numpy as np
 import shapely.geometry as sgeo
 import shapely.ops as ops
+from shapely.prepared import prep
 
 from reference_models.geo import vincenty
 from reference_models.geo import zones
@@ -27,6 +28,9 @@ from reference_models.geo import zones
 WGS_EQUATORIAL_RADIUS_KM2 = 6378.137
 WGS_POLAR_RADIUS_KM2 = 6356.753
 
+# Tolerance for including the points lying on a polygon boundary when gridding.
+_BORDER_TOLERANCE_DEG = 1e-8
+
 
 def HasCorrectGeoJsonWinding(geometry):
   """Returns True if a GeoJSON geometry has correct windings.
@@ -209,6 +213,147 @@ def InsureFeatureCollection(geometry, as_dict=False):
   return geometry if as_dict else json.dumps(geometry)
 
 
+def _PolygonEdges(poly):
+  """Returns the edges of all rings of a polygonal geometry.
+
+  Returns:
+    A tuple (x1, y1, x2, y2) of ndarray holding the edges end points.
+  """
+  if isinstance(poly, sgeo.Polygon):
+    polygons = [poly]
+  elif isinstance(poly, sgeo.MultiPolygon):
+    polygons = list(poly)
+  else:
+    # Generic collections are dissolved, so that polygons do not overlap.
+    polygons = [p for p in getattr(poly, 'geoms', [])
+                if isinstance(p, (sgeo.Polygon, sgeo.MultiPolygon))]
+    return _PolygonEdges(ops.unary_union(polygons)) if polygons else (
+        (np.zeros(0),) * 4)
+  rings = [np.asarray(ring.coords)[:, :2]
+           for p in polygons if not p.is_empty
+           for ring in [p.exterior] + list(p.interiors)]
+  if not rings:
+    return (np.zeros(0),) * 4
+  starts = np.concatenate([ring[:-1] for ring in rings])
+  ends = np.concatenate([ring[1:] for ring in rings])
+  return starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+
+def _ExpandRanges(starts, counts):
+  """Returns the flattened ranges [start, start+count[ and their owner index."""
+  owner = np.repeat(np.arange(len(counts)), counts)
+  values = (np.arange(len(owner))
+            - np.repeat(np.cumsum(counts) - counts, counts)
+            + starts[owner])
+  return values, owner
+
+
+def _InteriorIndices(edges, lngs, lats):
+  """Returns the lattice points strictly inside a polygon, using a scanline.
+
+  Uses the even-odd rule on the edge crossings of each lattice row, with half
+  open edges [ymin, ymax[ so that vertices are counted once. Points lying on
+  the boundary may or may not be selected.
+
+  Returns:
+    The sorted linear indices `ilng * len(lats) + ilat` of the points.
+  """
+  x1, y1, x2, y2 = edges
+  non_horizontal = y1 != y2
+  x1, y1 = x1[non_horizontal], y1[non_horizontal]
+  x2, y2 = x2[non_horizontal], y2[non_horizontal]
+  first_row = np.searchsorted(lats, np.minimum(y1, y2), 'left')
+  num_rows = np.searchsorted(lats, np.maximum(y1, y2), 'left') - first_row
+  row_idx, edge_idx = _ExpandRanges(first_row, num_rows)
+  x1, y1, x2, y2 = x1[edge_idx], y1[edge_idx], x2[edge_idx], y2[edge_idx]
+  x = x1 + (lats[row_idx] - y1) * (x2 - x1) / (y2 - y1)
+  # Sorted crossings of each row are (entering, exiting) pairs.
+  order = np.lexsort((x, row_idx))
+  x, row_idx = x[order], row_idx[order]
+  first_col = np.searchsorted(lngs, x[0::2], 'right')
+  num_cols = np.maximum(np.searchsorted(lngs, x[1::2], 'left') - first_col, 0)
+  col_idx, span_idx = _ExpandRanges(first_col, num_cols)
+  return np.unique(col_idx * len(lats) + row_idx[0::2][span_idx])
+
+
+def _BorderIndices(edges, lngs, lats, tolerance):
+  """Returns the lattice points within some distance of a polygon boundary.
+
+  Returns:
+    The sorted linear indices `ilng * len(lats) + ilat` of the points.
+  """
+  x1, y1, x2, y2 = edges
+  first_row = np.searchsorted(lats, np.minimum(y1, y2) - tolerance, 'left')
+  num_rows = np.searchsorted(lats, np.maximum(y1, y2) + tolerance,
+                             'right') - first_row
+  row_idx, edge_idx = _ExpandRanges(first_row, num_rows)
+  x1, y1, x2, y2 = x1[edge_idx], y1[edge_idx], x2[edge_idx], y2[edge_idx]
+  dx, dy = x2 - x1, y2 - y1
+  # The edge part within the band [lat-tolerance, lat+tolerance] of the row.
+  y = lats[row_idx]
+  with np.errstate(divide='ignore', invalid='ignore'):
+    s1 = np.where(dy != 0, (y - tolerance - y1) / dy, 0.)
+    s2 = np.where(dy != 0, (y + tolerance - y1) / dy, 1.)
+  s1, s2 = np.clip(s1, 0, 1), np.clip(s2, 0, 1)
+  xa, xb = x1 + s1 * dx, x1 + s2 * dx
+  first_col = np.searchsorted(lngs, np.minimum(xa, xb) - tolerance, 'left')
+  num_cols = np.searchsorted(lngs, np.maximum(xa, xb) + tolerance,
+                             'right') - first_col
+  col_idx, cand_idx = _ExpandRanges(first_col, num_cols)
+  # Exact check of the distance of candidate points to their edge.
+  px = lngs[col_idx] - x1[cand_idx]
+  py = y[cand_idx] - y1[cand_idx]
+  dx, dy = dx[cand_idx], dy[cand_idx]
+  length2 = dx**2 + dy**2
+  u = np.clip((px * dx + py * dy) / np.where(length2 > 0, length2, 1.), 0, 1)
+  is_near = (px - u * dx)**2 + (py - u * dy)**2 <= tolerance**2
+  return np.unique(col_idx[is_near] * len(lats) + row_idx[cand_idx[is_near]])
+
+
+def RasterizePolygon(poly, lngs, lats, include_border=True):
+  """Finds the points of a lattice falling inside a polygon.
+
+  This is a vectorized scanline algorithm: the crossings of the polygon edges
+  with each lattice row are computed, and all lattice points between pairs of
+  crossings are selected. Its cost is proportional to the number of crossings
+  and of selected points, rather than to the number of lattice points.
+
+  Args:
+    poly: A Polygon or MultiPolygon, defined either as a shapely, GeoJSON
+      (dict or str) or generic geometry.
+    lngs: The lattice longitudes, as a sorted 1D ndarray.
+    lats: The lattice latitudes, as a sorted 1D ndarray.
+    include_border: If True, the points falling on the polygon boundary are
+      included, with a slight tolerance of 1e-8 degrees (ie the polygon is
+      buffered by 1mm). If False, only the points strictly within the polygon
+      are included, as decided by the shapely `within` predicate.
+
+  Returns:
+    A tuple (ilngs, ilats) of ndarray holding the lattice indices of the points,
+    ordered by increasing longitude then latitude.
+  """
+  lngs = np.asarray(lngs, dtype=float)
+  lats = np.asarray(lats, dtype=float)
+  poly = ToShapely(poly)
+  edges = _PolygonEdges(poly)
+  inside_idxs = _InteriorIndices(edges, lngs, lats)
+  border_idxs = _BorderIndices(edges, lngs, lats, _BORDER_TOLERANCE_DEG)
+  if include_border:
+    idxs = np.union1d(inside_idxs, border_idxs)
+  else:
+    # Points very close to the boundary are resolved by the exact predicate.
+    prepared_poly = prep(poly)
+    within_border_idxs = np.array(
+        [idx for idx in border_idxs
+         if prepared_poly.contains(sgeo.Point(lngs[idx // len(lats)],
+                                              lats[idx % len(lats)]))],
+        dtype=int)
+    idxs = np.union1d(
+        np.setdiff1d(inside_idxs, border_idxs, assume_unique=True),
+        within_border_idxs)
+  return idxs // len(lats), idxs % len(lats)
+
+
 def GridPolygon(poly, res_arcsec):
   """Grids a polygon or multi-polygon.
 
@@ -223,17 +368,21 @@ def GridPolygon(poly, res_arcsec):
     res_arcsec: The resolution (in arcsec) used for regular gridding.
 
   Returns:
-    A list of (lon, lat) defining the grid points.
+    A ndarray of shape (N, 2) holding the (lon, lat) of the grid points,
+    ordered by increasing longitude then latitude.
   """
   poly = ToShapely(poly)
+  if poly.is_empty:
+    return np.zeros((0, 2))
   bound_area = (poly.bounds[2] - poly.bounds[0]) * (poly.bounds[3] - poly.bounds[1])
   if isinstance(poly, sgeo.MultiPolygon) and poly.area < bound_area * 0.01:
-    # For largely disjoint polygons, we process per polygon
-    # to avoid inefficiencies if polygons largely disjoint.
-    pts = ops.unary_union(
-        [sgeo.asMultiPoint(GridPolygon(p, res_arcsec))
-         for p in poly])
-    return [(p.x, p.y) for p in pts]
+    # For largely disjoint polygons, we process per polygon to avoid
+    # inefficiencies. Each polygon uses its own lattice origin, which can
+    # differ in the last digits from the one of the global bounds.
+    points = np.concatenate([GridPolygon(p, res_arcsec) for p in poly])
+    if not len(points):
+      return points
+    return np.unique(points, axis=0)
 
   res = res_arcsec / 3600.
   bounds = poly.bounds
@@ -241,23 +390,13 @@ def GridPolygon(poly, res_arcsec):
   lat_min = np.floor(bounds[1] / res) * res
   lng_max = np.ceil(bounds[2] / res) * res + res/2
   lat_max = np.ceil(bounds[3] / res) * res + res/2
-  # The mesh creation is conceptually equivalent to
-  #mesh_lng, mesh_lat = np.mgrid[lng_min:lng_max:res,
-  #                              lat_min:lat_max:res]
+  # The lattice creation is conceptually equivalent to
+  #lngs, lats = np.mgrid[lng_min:lng_max:res], np.mgrid[lat_min:lat_max:res]
   # but without the floating point accumulation errors
-  mesh_lng, mesh_lat = np.meshgrid(
-      np.arange(np.floor((lng_max - lng_min) / res) + 1),
-      np.arange(np.floor((lat_max - lat_min) / res) + 1),
-      indexing='ij')
-  mesh_lng = lng_min + mesh_lng * res
-  mesh_lat = lat_min + mesh_lat * res
-  points = np.vstack((mesh_lng.ravel(), mesh_lat.ravel())).T
-  # Performs slight buffering by 1mm to include border points in case they fall
-  # exactly on a multiple of 1 arcsec.
-  pts = poly.buffer(1e-8).intersection(sgeo.asMultiPoint(points))
-  if isinstance(pts, sgeo.Point):
-    return [(pts.x, pts.y)]
-  return [(p.x, p.y) for p in pts]
+  lngs = lng_min + np.arange(np.floor((lng_max - lng_min) / res) + 1) * res
+  lats = lat_min + np.arange(np.floor((lat_max - lat_min) / res) + 1) * res
+  ilngs, ilats = RasterizePolygon(poly, lngs, lats)
+  return np.column_stack((lngs[ilngs], lats[ilats]))
 
 
 def _RingArea(latitudes, longitudes):
@@ -445,15 +584,15 @@ def GetClosestCanadianBorderPoint(latitude, longitude, max_dist_km):
   if not border_cap or 'LineString' not in border_cap.type:
     return None
   # Find closest point
-  points_dists = [(vincenty.GeodesicDistanceBearing(latitude, longitude, point[1], point[0]),
-                   point)
-                  for point in zip(*border_cap.xy)]
-  closest = min(points_dists)
-  closest_dist = closest[0][0]
+  border_lons, border_lats = border_cap.xy
+  dists, bearings, _ = vincenty.GeodesicDistanceBearings(
+      latitude, longitude, border_lats, border_lons)
+  k = np.argmin(dists)
+  closest_dist = dists[k]
   if closest_dist > max_dist_km:
     return None
-  closest_bearing = closest[0][1]
-  return closest[1][1], closest[1][0], closest_dist, closest_bearing
+  closest_bearing = bearings[k]
+  return border_lats[k], border_lons[k], closest_dist, closest_bearing
 
 
 def _angleBetween(angle, min_angle, max_angle):
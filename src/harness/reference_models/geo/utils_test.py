@@ -105,11 +105,11 @@ class TestUtils(unittest.TestCase):
 
   def test_grid_point_and_null(self):
     poly = sgeo.Polygon([(1.9, 0.9), (2.1, 0.9), (2.1, 1.1), (1.9, 1.1)])
-    exp_pts = [(2.0, 1.0)]
+    exp_pts = [[2.0, 1.0]]
     pts = utils.GridPolygon(poly, res_arcsec=900.)
-    self.assertListEqual(pts, exp_pts)
+    self.assertListEqual(pts.tolist(), exp_pts)
     pts = utils.GridPolygon(poly, res_arcsec=7200.)
-    self.assertListEqual(pts, [])
+    self.assertListEqual(pts.tolist(), [])
 
   def test_grid_simple(self):
     poly = sgeo.Polygon([(1.9, 3.9), (3.1, 3.9), (3.1, 4.4),
@@ -117,7 +117,7 @@ class TestUtils(unittest.TestCase):
     exp_pts = {(2.0, 4.0), (2.5, 4.0), (3.0, 4.0),
                (2.0, 4.5), (2.5, 4.5), (2.0, 5.0)}
     pts = utils.GridPolygon(poly, res_arcsec=1800.)
-    self.assertSetEqual(set(pts), exp_pts)
+    self.assertSetEqual(set(map(tuple, pts)), exp_pts)
 
   def test_grid_border_included(self):
     poly = sgeo.Polygon([(-108.05, 42.25),
@@ -139,7 +139,7 @@ class TestUtils(unittest.TestCase):
     exp_pts = {(2.5, 4.0), (3.0, 4.0),
                (2.0, 4.5), (2.5, 4.5), (2.0, 5.0)}
     pts = utils.GridPolygon(poly, res_arcsec=1800.)
-    self.assertSetEqual(set(pts), exp_pts)
+    self.assertSetEqual(set(map(tuple, pts)), exp_pts)
 
   def test_grid_complex(self):
     with open(os.path.join(TEST_DIR, 'test_geocollection.json'), 'r') as fd:
@@ -149,13 +149,49 @@ class TestUtils(unittest.TestCase):
     exp_pts = {(-95, 40), (-95.5, 40.5), (-95.5, 40),
                (-96, 40), (-96.5, 40.5), (-96.5, 40)}
     pts = utils.GridPolygon(json_geo, res_arcsec=1800)
-    self.assertSetEqual(set(pts), exp_pts)
+    self.assertSetEqual(set(map(tuple, pts)), exp_pts)
 
     pts = utils.GridPolygon(shape_geo, res_arcsec=1800)
-    self.assertSetEqual(set(pts), exp_pts)
+    self.assertSetEqual(set(map(tuple, pts)), exp_pts)
 
     pts = utils.GridPolygon(ops.unary_union(shape_geo), res_arcsec=1800)
-    self.assertSetEqual(set(pts), exp_pts)
+    self.assertSetEqual(set(map(tuple, pts)), exp_pts)
+
+  def test_grid_disjoint_multipolygon(self):
+    # Largely disjoint polygons are gridded on their own lattice.
+    poly1 = sgeo.Polygon([(-100.013, 40.007), (-99.991, 40.002),
+                          (-99.996, 40.021)])
+    poly2 = sgeo.Polygon([(-99.513, 40.307), (-99.491, 40.302),
+                          (-99.496, 40.321)])
+    pts = utils.GridPolygon(sgeo.MultiPolygon([poly2, poly1]), res_arcsec=10.)
+    exp_pts = np.concatenate((utils.GridPolygon(poly1, res_arcsec=10.),
+                              utils.GridPolygon(poly2, res_arcsec=10.)))
+    self.assertListEqual(pts.tolist(), exp_pts.tolist())
+
+  def test_grid_same_as_buffered_intersection(self):
+    poly = sgeo.Polygon([(-100.04, 40.01), (-100.02, 40.005), (-100.03, 39.97),
+                         (-99.96, 39.99), (-99.95, 40.01), (-99.985, 40.01),
+                         (-99.975, 40.03), (-100.005, 40.04), (-100.005, 40.02),
+                         (-100.025, 40.015)],
+                        [[(-100.01, 39.99), (-99.99, 39.99), (-100., 40.)]])
+    res = 9. / 3600
+    lngs = -100.05 + np.arange(45) * res
+    lats = 39.96 + np.arange(37) * res
+    ilngs, ilats = utils.RasterizePolygon(poly, lngs, lats)
+    mesh_lng, mesh_lat = np.meshgrid(lngs, lats, indexing='ij')
+    exp_pts = poly.buffer(1e-8).intersection(sgeo.asMultiPoint(
+        np.vstack((mesh_lng.ravel(), mesh_lat.ravel())).T))
+    self.assertListEqual(zip(lngs[ilngs], lats[ilats]),
+                         [(p.x, p.y) for p in exp_pts])
+    num_pts = len(ilngs)
+
+    ilngs, ilats = utils.RasterizePolygon(poly, lngs, lats,
+                                          include_border=False)
+    exp_pts = [(lng, lat) for lng, lat in zip(mesh_lng.ravel(), mesh_lat.ravel())
+               if sgeo.Point(lng, lat).within(poly)]
+    self.assertListEqual(zip(lngs[ilngs], lats[ilats]), exp_pts)
+    # Points on the border are excluded.
+    self.assertLess(len(ilngs), num_pts)
 
   def test_polygons_equal(self):
     poly_ref = sgeo.Point(0,0).buffer(1)
@@ -19,8 +19,14 @@ Typical usage:
   # Get distance and bearing between 2 points on the earth
   dist_km, bearing, rev_bearing = GeodesicDistanceBearing(lat1, lon1, lat2, lon2)
 
+  # Same for many pairs of points at once (vectorized)
+  dists_km, bearings, rev_bearings = GeodesicDistanceBearings(lats1, lons1,
+                                                              lats2, lons2)
+
   # Get location of a all points at given bearing, at one or multiple distances
   lat2, lon2 = GeodesicPoints(lat1, lon1, dist_km, bearing)
+  # or from multiple initial points and bearings (vectorized)
+  lats2, lons2 = GeodesicPoints(lats1, lons1, dists_km, bearings)
 
   # Get N equidistant points along the geodesic between 2 locations
   points = GeodesicSampling(lat, lon1, lat2, lon2, N)
@@ -120,6 +126,134 @@ def GeodesicDistanceBearing(lat1, lon1, lat2, lon2, accuracy=1.0E-12):
   return s, alpha1, alpha2
 
 
+def _Pow(x, y):
+  """Power function strictly identical to the scalar `x**y`.
+
+  Note that the `**` operator on ndarray replaces some powers by faster but
+  not bit exact functions (for example `sqrt()` for power 0.5).
+  """
+  return np.power(x, y)
+
+
+def GeodesicDistanceBearings(lats1, lons1, lats2, lons2, accuracy=1.0E-12):
+  """Calculates distance and bearings between pairs of points.
+
+  This is the vectorized version of `GeodesicDistanceBearing`, the convergence
+  of lambda being iterated only on the elements not yet converged. This
+  provides results strictly identical to the scalar version.
+
+  Inputs:
+    lats1, lons1: the initial points coodinates (in degrees), as scalars or
+      sequences (ndarray, list, ...).
+    lats2, lons2: the final points coodinates (in degrees), as scalars or
+      sequences (ndarray, list, ...).
+    accuracy: accuracy for the vincenty convergence (optional)
+
+  All the inputs are broadcasted together, so one can for example compute the
+  distances of many points to a single location.
+
+  Returns:
+    a tuple of ndarray: distances (km), initial bearings (deg), and back
+    bearings (deg).
+  """
+  lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+      np.atleast_1d(np.asarray(lats1, dtype=float)),
+      np.atleast_1d(np.asarray(lons1, dtype=float)),
+      np.atleast_1d(np.asarray(lats2, dtype=float)),
+      np.atleast_1d(np.asarray(lons2, dtype=float)))
+  num = len(lat1)
+  s = np.zeros(num)
+  alpha1 = np.zeros(num)
+  alpha2 = np.zeros(num)
+
+  # Same points have 0 distance and bearings
+  idxs = np.where((lat1 != lat2) | (lon1 != lon2))[0]
+  if not len(idxs):
+    return s, alpha1, alpha2
+  lat1, lon1, lat2, lon2 = lat1[idxs], lon1[idxs], lat2[idxs], lon2[idxs]
+  valid_idxs = idxs
+
+  a = 6378.1370        # semi-major axis (km), WGS84
+  f = 1./298.257223563 # flattening of the ellipsoid, WGS84
+  b = (1-f)*a          # semi-minor axis
+
+  phi1 = np.radians(lat1)
+  L1   = np.radians(lon1)
+  phi2 = np.radians(lat2)
+  L2   = np.radians(lon2)
+
+  U1 = np.arctan((1-f)*np.tan(phi1))
+  U2 = np.arctan((1-f)*np.tan(phi2))
+  cos_U1, sin_U1 = np.cos(U1), np.sin(U1)
+  cos_U2, sin_U2 = np.cos(U2), np.sin(U2)
+  L = L2 - L1
+
+  lmbda = L.copy()
+  lastlmbda = np.zeros(len(L))
+  sin_sigma = np.zeros(len(L))
+  cos_sigma = np.zeros(len(L))
+  sigma = np.zeros(len(L))
+  cossq_alpha = np.zeros(len(L))
+  cos2sigma_m = np.zeros(len(L))
+  idxs = np.arange(len(L))
+  while True:
+    # Using iteration on partial subset for perfect equivalence
+    # with scalar version
+    lastlmbda[idxs] = lmbda[idxs]
+    cU1, sU1, cU2, sU2 = cos_U1[idxs], sin_U1[idxs], cos_U2[idxs], sin_U2[idxs]
+    sin_lmbda = np.sin(lmbda[idxs])
+    cos_lmbda = np.cos(lmbda[idxs])
+
+    sin_sigma[idxs] = _Pow(_Pow(cU2*sin_lmbda, 2.0) +
+                           _Pow(cU1*sU2 - sU1*cU2*cos_lmbda, 2.0), 0.5)
+    cos_sigma[idxs] = sU1*sU2 + cU1*cU2*cos_lmbda
+    sigma[idxs] = np.arctan2(sin_sigma[idxs], cos_sigma[idxs])
+
+    sin_alpha = (cU1*cU2*sin_lmbda)/np.sin(sigma[idxs])
+    cossq_alpha[idxs] = 1 - _Pow(sin_alpha, 2.0)
+
+    cos2sigma_m[idxs] = (np.cos(sigma[idxs])
+                         - (2.*sU1*sU2/cossq_alpha[idxs]))
+
+    C = (f/16.)*cossq_alpha[idxs]*(4. + f*(4. - 3.*cossq_alpha[idxs]))
+
+    lmbda[idxs] = (L[idxs] + (1. - C)*f*sin_alpha
+                   *(sigma[idxs] + C*sin_sigma[idxs]
+                     * (cos2sigma_m[idxs] + C*cos_sigma[idxs]
+                        * (-1. + 2.*_Pow(cos2sigma_m[idxs], 2.0)))))
+    idxs = np.where(np.abs(lmbda - lastlmbda) > accuracy)[0]
+    if not len(idxs):
+      break
+
+  usq = cossq_alpha*(a**2.0 - b**2.0)/b**2.0
+  A = 1 + (usq/16384.)*(4096. + usq*(-768. + usq*(320. - 175.*usq)))
+  B = (usq/1024.)*(256. + usq*(-128. + usq*(74. - 47.*usq)))
+  dsigma = (B*np.sin(sigma)
+            * (cos2sigma_m + 0.25*B
+               * (np.cos(sigma)*(-1. + 2.*_Pow(cos2sigma_m, 2.0))
+                  - (1./6.)*B*cos2sigma_m*(-3. + 4.*_Pow(np.sin(sigma), 2.0))
+                  * (-3. + 4.*_Pow(cos2sigma_m, 2.0)))))
+
+  s[valid_idxs] = b*A*(sigma-dsigma)
+
+  sin_lmbda = np.sin(lmbda)
+  cos_lmbda = np.cos(lmbda)
+  a1 = np.arctan2(cos_U2*sin_lmbda,
+                  (cos_U1*sin_U2 - sin_U1*cos_U2*cos_lmbda))
+  a2 = np.arctan2(cos_U1*sin_lmbda,
+                  (-sin_U1*cos_U2 + cos_U1*sin_U2*cos_lmbda))
+
+  a2 = np.where(a2 < pi, a2 + pi, a2 - pi)
+
+  a1 = (a1 + 2.*pi) % (2.*pi)
+  a2 = (a2 + 2.*pi) % (2.*pi)
+
+  alpha1[valid_idxs] = np.degrees(a1)
+  alpha2[valid_idxs] = np.degrees(a2)
+
+  return s, alpha1, alpha2
+
+
 def GeodesicPoint(lat, lon, dist_km, bearing, accuracy=1.0E-12):
   """Computes the coordinates from a point towards a bearing at given distance.
 
@@ -219,38 +353,50 @@ def GeodesicPoints(lat, lon, distances_km, bearing, accuracy=1.0E-12):
 
   This routine version is similar to `GeodesicPoint` but takes a sequence of
   distances, and perform an efficient vectorized operation internally.
+  The initial point and bearing can also be sequences, in which case all inputs
+  are broadcasted together. Results are strictly identical to the scalar version.
 
   Inputs:
-    lat,lon: the initial point coordinates (in degrees),
+    lat,lon: the initial point coordinates (in degrees), as scalars or
+      sequences.
     distances_km: a sequence of distance of the target points (in km). Can be
       for example a ndarray or a list.
-    bearing: the bearing angle (in degrees)
+    bearing: the bearing angle (in degrees), as a scalar or a sequence.
     accuracy: accuracy for the vincenty convergence (optional)
 
   Returns:
     a tuple of the points latitude, longitude and reverse bearing, all in degrees.
-    If input distances_km is a ndarray, 3 ndarray are returned,
+    If any input is a ndarray, 3 ndarray are returned,
     otherwise 3 lists are returned.
   """
-
-  if np.isscalar(distances_km):
+  if (np.isscalar(distances_km) and np.isscalar(lat) and np.isscalar(lon)
+      and np.isscalar(bearing)):
     return GeodesicPoint(lat, lon, distances_km, bearing, accuracy)
+  is_ndarray = any(isinstance(x, np.ndarray)
+                   for x in (lat, lon, distances_km, bearing))
+
+  lat, lon, s, bearing = np.broadcast_arrays(
+      np.atleast_1d(np.asarray(lat, dtype=float)),
+      np.atleast_1d(np.asarray(lon, dtype=float)),
+      np.atleast_1d(np.asarray(distances_km, dtype=float)),
+      np.atleast_1d(np.asarray(bearing, dtype=float)))
 
   a = 6378.1370        # semi-major axis (km), WGS84
   f = 1./298.257223563 # flattening of the ellipsoid, WGS84
   b = (1-f)*a          # semi-minor axis
 
-  phi1 = radians(lat)
-  L1   = radians(lon)
-  alpha1 = radians(bearing)
-  s = np.asarray(distances_km)
+  phi1 = np.radians(lat)
+  L1   = np.radians(lon)
+  alpha1 = np.radians(bearing)
 
-  U1 = atan((1-f)*tan(phi1))
+  U1 = np.arctan((1-f)*np.tan(phi1))
+  sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+  sin_alpha1, cos_alpha1 = np.sin(alpha1), np.cos(alpha1)
 
-  sigma1 = atan2(tan(U1), cos(alpha1))
+  sigma1 = np.arctan2(np.tan(U1), cos_alpha1)
 
-  sinalpha = cos(U1)*sin(alpha1)
-  cossq_alpha = (1. - sinalpha**2.0)
+  sinalpha = cos_U1*sin_alpha1
+  cossq_alpha = (1. - _Pow(sinalpha, 2.0))
   usq = cossq_alpha*(a**2.0-b**2.0)/b**2.0
 
   A = 1 + usq/16384. * (4096. + usq*(-768 + usq*(320.-175.*usq)))
@@ -266,18 +412,19 @@ def GeodesicPoints(lat, lon, distances_km, bearing, accuracy=1.0E-12):
     # with scalar version
     lastsigma[idxs] = sigma[idxs]
 
-    twosigmam[idxs] = 2.*sigma1 + sigma[idxs]
+    twosigmam[idxs] = 2.*sigma1[idxs] + sigma[idxs]
     cos_twosigmam = np.cos(twosigmam[idxs])
     sin_sigma = np.sin(sigma[idxs])
     cos_sigma = np.cos(sigma[idxs])
-    dsigma[idxs] = (B * sin_sigma
-                    *(cos_twosigmam + 0.25*B
+    B_idxs = B[idxs]
+    dsigma[idxs] = (B_idxs * sin_sigma
+                    *(cos_twosigmam + 0.25*B_idxs
                       *(cos_sigma
-                        *(-1. + 2. * cos_twosigmam**2)
-                        - (1./6.) * B * cos_twosigmam
-                        * (-3. + 4. * sin_sigma**2)
-                        * (-3. + 4. * cos_twosigmam**2))))
-    sigma[idxs] = s[idxs]/(b*A) + dsigma[idxs]
+                        *(-1. + 2. * _Pow(cos_twosigmam, 2.0))
+                        - (1./6.) * B_idxs * cos_twosigmam
+                        * (-3. + 4. * _Pow(sin_sigma, 2.0))
+                        * (-3. + 4. * _Pow(cos_twosigmam, 2.0)))))
+    sigma[idxs] = s[idxs]/(b*A[idxs]) + dsigma[idxs]
     idxs = np.where(np.abs(sigma - lastsigma) > accuracy)[0]
     if not len(idxs):
       break
@@ -285,14 +432,15 @@ def GeodesicPoints(lat, lon, distances_km, bearing, accuracy=1.0E-12):
   sin_sigma = np.sin(sigma)
   cos_twosigmam = np.cos(twosigmam)
 
-  num = sin(U1) * cos_sigma + cos(U1) * sin_sigma * cos(alpha1)
-  den = ((1.-f) * (sinalpha**2 +
-                   (sin(U1) * sin_sigma - cos(U1) * cos_sigma * cos(alpha1))**2)**0.5)
+  num = sin_U1 * cos_sigma + cos_U1 * sin_sigma * cos_alpha1
+  den = ((1.-f) * _Pow(_Pow(sinalpha, 2.0) +
+                       _Pow(sin_U1 * sin_sigma - cos_U1 * cos_sigma * cos_alpha1,
+                            2.0), 0.5))
 
   phi2 = np.arctan2(num, den)
 
-  num = sin_sigma * sin(alpha1)
-  den = cos(U1) * cos_sigma - sin(U1) * sin_sigma * cos(alpha1)
+  num = sin_sigma * sin_alpha1
+  den = cos_U1 * cos_sigma - sin_U1 * sin_sigma * cos_alpha1
   lmbda = np.arctan2(num, den)
 
   C = (f/16.) * cossq_alpha * (4. + f * (4. - 3.*cossq_alpha))
@@ -300,15 +448,15 @@ def GeodesicPoints(lat, lon, distances_km, bearing, accuracy=1.0E-12):
   L = (lmbda - (1. - C) * f * sinalpha
        * (sigma + C * sin_sigma
           * (cos_twosigmam + C * cos_sigma
-             * (-1. + 2. * cos_twosigmam**2))))
+             * (-1. + 2. * _Pow(cos_twosigmam, 2.0)))))
   L2 = L + L1
 
   num = sinalpha
-  den = -sin(U1) * sin_sigma + cos(U1) * cos_sigma * cos(alpha1)
+  den = -sin_U1 * sin_sigma + cos_U1 * cos_sigma * cos_alpha1
   alpha2 = np.arctan2(num, den)
   alpha2 = (alpha2 + 3.*pi) % (2.*pi)
 
-  if isinstance(distances_km, np.ndarray):
+  if is_ndarray:
     return np.degrees(phi2), np.degrees(L2), np.degrees(alpha2)
   else:
     return list(np.degrees(phi2)), list(np.degrees(L2)), list(np.degrees(alpha2))
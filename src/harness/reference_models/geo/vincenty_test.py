@@ -59,6 +59,44 @@ class TestVincenty(unittest.TestCase):
       self.assertAlmostEqual(az, p['azimuth'], 9)
       self.assertAlmostEqual(rev_az, p['reverse_azimuth'], 9)
 
+  def test_distbears_vs_scalar(self):
+    np.random.seed(69)
+    lats1 = np.random.uniform(-70, 70, 1000)
+    lngs1 = np.random.uniform(-170, 170, 1000)
+    lats2 = lats1 + np.random.uniform(-10, 10, 1000)
+    lngs2 = lngs1 + np.random.uniform(-10, 10, 1000)
+    lats2[:10], lngs2[:10] = lats1[:10], lngs1[:10]  # some same points
+
+    dists, azs, rev_azs = vincenty.GeodesicDistanceBearings(
+        lats1, lngs1, lats2, lngs2)
+    for k in range(1000):
+      d, az, rev_az = vincenty.GeodesicDistanceBearing(
+          lats1[k], lngs1[k], lats2[k], lngs2[k])
+      self.assertEqual(dists[k], d)
+      self.assertEqual(azs[k], az)
+      self.assertEqual(rev_azs[k], rev_az)
+
+    # With broadcasting of the final point
+    dists, azs, _ = vincenty.GeodesicDistanceBearings(lats1, lngs1, 38, -80)
+    d, az, _ = vincenty.GeodesicDistanceBearing(lats1[5], lngs1[5], 38, -80)
+    self.assertEqual(dists[5], d)
+    self.assertEqual(azs[5], az)
+
+  def test_points_multi_origins_vs_scalar(self):
+    np.random.seed(69)
+    lats = np.random.uniform(-80, 80, 1000)
+    lngs = np.random.uniform(-180, 180, 1000)
+    dists = np.random.uniform(0.01, 1000, 1000)
+    bearings = np.random.uniform(-180, 180, 1000)
+
+    lats2, lngs2, rev_azs = vincenty.GeodesicPoints(lats, lngs, dists, bearings)
+    for k in range(1000):
+      lat, lng, rev_az = vincenty.GeodesicPoint(lats[k], lngs[k], dists[k],
+                                                bearings[k])
+      self.assertEqual(lats2[k], lat)
+      self.assertEqual(lngs2[k], lng)
+      self.assertEqual(rev_azs[k], rev_az)
+
   def test_point(self):
     random.seed(69)
     for _ in range(1000):
@@ -46,13 +46,22 @@ Interface:
   # For simulation purpose: global US border and urban areas
   GetUsBorder()
   GetUrbanAreas()
+
+All the zones are memoized in the process. Furthermore the geometries read from
+the KML/KMZ files are saved in a binary cache alongside those files (see
+`_ReadCachedKml()`), so that the XML parsing cost is paid only once across
+processes and runs.
 """
+import cPickle as pickle
+import hashlib
 import logging
 import os
 import re
+import tempfile
 import numpy as np
 import shapely.geometry as sgeo
 import shapely.ops as ops
+from shapely import wkb
 from pykml import parser
 import zipfile
 
@@ -74,6 +83,10 @@ USCANADA_BORDER_FILE = 'uscabdry_sampled.kmz'
 # The constants
 DPA_CATA_DEFAULT_NEIGHBOR_DIST = 150
 
+# The binary zone cache: file suffix and format version.
+ZONE_CACHE_SUFFIX = '.zones'
+_ZONE_CACHE_VERSION = 1
+
 # A frequency splitter - used as DPA properties converter.
 def _SplitFreqRange(freq_range):
   """Splits a `freq_range` str in a list of numerical (fmin, fmax) tuples."""
@@ -144,6 +157,8 @@ _portal_dpa_zones = None
 _portal_dpa_path = None
 _border_zone = None
 _uscanada_border = None
+_urban_areas = {}
+_fcc_offices = None
 
 def _SplitCoordinates(coord):
   """Returns lon,lat from 'coord', a KML coordinate string field."""
@@ -330,13 +345,104 @@ def _ReadKmlBorder(kml_path, root_id='Placemark'):
   return linetrings_dict
 
 
+def _FileHash(path):
+  """Returns the SHA1 hash of a file content."""
+  sha = hashlib.sha1()
+  with open(path, 'rb') as fd:
+    for chunk in iter(lambda: fd.read(1 << 20), ''):
+      sha.update(chunk)
+  return sha.hexdigest()
+
+
+def _SerializeZones(zones):
+  """Returns a picklable version of zones, with geometries encoded as WKB."""
+  items = []
+  for name, zone in zones.iteritems():
+    if isinstance(zone, _Zone):
+      attributes = {attr: value for attr, value in vars(zone).iteritems()
+                    if attr not in ('fields', 'geometry')}
+      items.append((name, wkb.dumps(zone.geometry), zone.fields, attributes))
+    else:
+      items.append((name, wkb.dumps(zone), None, None))
+  return items
+
+
+def _DeserializeZones(items):
+  """Returns the zones from their serialized version (see `_SerializeZones`)."""
+  zones = {}
+  for name, geometry_wkb, fields, attributes in items:
+    geometry = wkb.loads(geometry_wkb)
+    if fields is None:
+      zones[name] = geometry
+    else:
+      zone = _Zone(fields)
+      zone.geometry = geometry
+      for attr, value in attributes.iteritems():
+        setattr(zone, attr, value)
+      zones[name] = zone
+  return zones
+
+
+def _ReadCachedKml(read_fn, kml_path, **kwargs):
+  """Reads the zones of a KML or KMZ, using a binary cache.
+
+  On first read, the zones parsed by `read_fn` are saved alongside the KML file
+  as a binary file, holding the geometries in WKB format and their attributes.
+  Subsequent reads (in any process) load this binary file instead of parsing
+  the KML file.
+  The binary file is keyed by the hash of the KML file content and the read
+  parameters, and is regenerated if they change. If it cannot be written (for
+  example read-only directory), the parsed zones are returned.
+
+  Args:
+    read_fn: The KML reader, either `_ReadKmlZones` or `_ReadKmlBorder`.
+    kml_path: The path name to the KML or KMZ.
+    **kwargs: The optional parameters of `read_fn`.
+
+  Returns:
+    The zones, as returned by `read_fn`.
+  """
+  cache_file = kml_path + ZONE_CACHE_SUFFIX
+  key = (_ZONE_CACHE_VERSION, read_fn.__name__, _FileHash(kml_path),
+         sorted(kwargs.items()))
+  try:
+    with open(cache_file, 'rb') as fd:
+      if pickle.load(fd) == key:
+        return _DeserializeZones(pickle.load(fd))
+  except Exception:
+    # Missing, truncated or corrupted cache file: the KML is parsed again.
+    pass
+
+  zones = read_fn(kml_path, **kwargs)
+  # Write atomically, as several processes can do it concurrently.
+  try:
+    fd, tmp_file = tempfile.mkstemp(suffix=ZONE_CACHE_SUFFIX,
+                                    dir=os.path.dirname(cache_file))
+  except (IOError, OSError):
+    logging.warning('Cannot write zone cache %s', cache_file)
+    return zones
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+      pickle.dump(_SerializeZones(zones), f, pickle.HIGHEST_PROTOCOL)
+    os.rename(tmp_file, cache_file)
+  except (IOError, OSError):
+    logging.warning('Cannot write zone cache %s', cache_file)
+    try:
+      os.remove(tmp_file)
+    except OSError:
+      pass
+  return zones
+
+
 def _GetAllExclusionZones():
   """Read all exclusion zones."""
   global _exclusion_zones_gbs
   global _exclusion_zones_p90
   if _exclusion_zones_gbs is None:
     kml_file = os.path.join(CONFIG.GetNtiaDir(), EXCLUSION_ZONE_FILE)
-    zones = _ReadKmlZones(kml_file, data_fields=['freqRangeMhz'])
+    zones = _ReadCachedKml(_ReadKmlZones, kml_file,
+                           data_fields=['freqRangeMhz'])
     gbs_zones = []
     p90_zones = []
     for name, zone in zones.items():
@@ -375,8 +481,9 @@ def _LoadDpaZones(kml_path, properties, fix_invalid=True):
     fix_invalid: If True, try to fix invalid DPA zone (using buffer(0) trick).
   """
   # Manage the case where some items are in a Folder structure instead of Placemark
-  dpa_zones = _ReadKmlZones(kml_path, root_id_zone='Placemark',
-                            data_fields=[attr for attr,_,_ in properties])
+  dpa_zones = _ReadCachedKml(_ReadKmlZones, kml_path,
+                             root_id_zone='Placemark',
+                             data_fields=[attr for attr,_,_ in properties])
 
   # Validity check that all required parameters are set properly
   _CheckDpaValidity(dpa_zones, [attr for attr, _, default in properties
@@ -426,7 +533,7 @@ def GetCoastalProtectionZone():
   global _coastal_protection_zone
   if _coastal_protection_zone is None:
     kml_file = os.path.join(CONFIG.GetNtiaDir(), PROTECTION_ZONE_FILE)
-    zones = _ReadKmlZones(kml_file)
+    zones = _ReadCachedKml(_ReadKmlZones, kml_file)
     _coastal_protection_zone = ops.unary_union([zones[name]
                                                 for name in _COASTAL_PROTECTION_ZONES])
   return _coastal_protection_zone
@@ -521,7 +628,7 @@ def GetUsCanadaBorder():
   global _uscanada_border
   if _uscanada_border is None:
     kml_file = os.path.join(CONFIG.GetFccDir(), USCANADA_BORDER_FILE)
-    lines = _ReadKmlBorder(kml_file)
+    lines = _ReadCachedKml(_ReadKmlBorder, kml_file)
     _uscanada_border = ops.unary_union(lines.values())
   return _uscanada_border
 
@@ -534,7 +641,7 @@ def GetUsBorder():
   global _border_zone
   if _border_zone is None:
     kml_file = os.path.join(CONFIG.GetFccDir(), USBORDER_FILE)
-    zones = _ReadKmlZones(kml_file)
+    zones = _ReadCachedKml(_ReadKmlZones, kml_file)
     _border_zone = ops.unary_union(zones.values())
   return _border_zone
 
@@ -542,16 +649,16 @@ def GetUsBorder():
 def GetUrbanAreas(simplify_deg=1e-3):
   """Gets the US urban area as a |shapely.GeometryCollection|.
 
-  Note: Client code should cache it as expensive to load (and not cached here).
-
   Args:
     simplify_deg: if defined, simplify the zone with given tolerance (degrees).
       Default is 1e-3 which corresponds roughly to 100m in continental US.
   """
-  kml_file = os.path.join(CONFIG.GetNtiaDir(), URBAN_AREAS_FILE)
-  zones = _ReadKmlZones(kml_file, root_id_zone='Document', simplify=simplify_deg)
-  urban_areas = sgeo.GeometryCollection(zones.values())  # ops.unary_union(zones.values())
-  return urban_areas
+  if simplify_deg not in _urban_areas:
+    kml_file = os.path.join(CONFIG.GetNtiaDir(), URBAN_AREAS_FILE)
+    zones = _ReadCachedKml(_ReadKmlZones, kml_file, root_id_zone='Document',
+                           simplify=simplify_deg)
+    _urban_areas[simplify_deg] = sgeo.GeometryCollection(zones.values())  # ops.unary_union(zones.values())
+  return _urban_areas[simplify_deg]
 
 
 def GetFccOfficeLocations():
@@ -562,8 +669,10 @@ def GetFccOfficeLocations():
   Returns:
     A list of locations defined as dict with keys 'latitude' and 'longitude'.
   """
-  fcc_file = os.path.join(CONFIG.GetFccDir(), FCC_FIELD_OFFICES_FILE)
-  fcc_offices = [{'latitude': lat,
-                  'longitude': lng}
-                 for lat, lng in np.loadtxt(fcc_file, delimiter=',', usecols=(1, 2))]
-  return fcc_offices
+  global _fcc_offices
+  if _fcc_offices is None:
+    fcc_file = os.path.join(CONFIG.GetFccDir(), FCC_FIELD_OFFICES_FILE)
+    _fcc_offices = [{'latitude': lat,
+                     'longitude': lng}
+                    for lat, lng in np.loadtxt(fcc_file, delimiter=',', usecols=(1, 2))]
+  return [dict(office) for office in _fcc_offices]
@@ -13,8 +13,11 @@
 #    limitations under the License.
 
 
+import cPickle as pickle
 import numpy as np
 import os
+import shutil
+import tempfile
 import unittest
 import shapely.geometry as sgeo
 from shapely import ops
@@ -98,6 +101,59 @@ class TestZones(unittest.TestCase):
         approx_len += d
       self.assertTrue(np.abs(approx_len - exp_borders_length[j]) < 25)
 
+  def test_zone_cache(self):
+    tmp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, tmp_dir)
+    kml_file = os.path.join(tmp_dir, zones.PORTAL_DPA_ZONE_FILE)
+    shutil.copy(os.path.join(zones.CONFIG.GetNtiaDir(),
+                             zones.PORTAL_DPA_ZONE_FILE), kml_file)
+    data_fields = [attr for attr, _, _ in zones.PORTAL_DPA_PROPERTIES]
+    ref_zones = zones._ReadKmlZones(kml_file, data_fields=data_fields)
+    num_reads = [0]
+    def _ReadKmlZones(*args, **kwargs):
+      num_reads[0] += 1
+      return zones._ReadKmlZones(*args, **kwargs)
+
+    # First read creates the cache, then reused.
+    for _ in range(2):
+      z = zones._ReadCachedKml(_ReadKmlZones, kml_file,
+                               data_fields=data_fields)
+      self.assertEqual(num_reads[0], 1)
+      self.assertTrue(os.path.isfile(kml_file + zones.ZONE_CACHE_SUFFIX))
+      self.assertItemsEqual(z.keys(), ref_zones.keys())
+      for name, zone in z.items():
+        self.assertEqual(zone.geometry.wkb, ref_zones[name].geometry.wkb)
+        self.assertEqual(vars(zone).keys(), vars(ref_zones[name]).keys())
+        self.assertEqual(zone.portalOrg, ref_zones[name].portalOrg)
+        self.assertEqual(zone.freqRangeMHz, ref_zones[name].freqRangeMHz)
+    # Other read parameters, or updated KML: the cache is regenerated.
+    zones._ReadCachedKml(_ReadKmlZones, kml_file)
+    self.assertEqual(num_reads[0], 2)
+    with open(kml_file, 'a') as fd:
+      fd.write('\n')
+    z = zones._ReadCachedKml(_ReadKmlZones, kml_file)
+    self.assertEqual(num_reads[0], 3)
+    self.assertEqual(z['BATH'].wkb, ref_zones['BATH'].geometry.wkb)
+    zones._ReadCachedKml(_ReadKmlZones, kml_file)
+    self.assertEqual(num_reads[0], 3)
+    # Corrupted or truncated cache: the KML is parsed again.
+    cache_file = kml_file + zones.ZONE_CACHE_SUFFIX
+    with open(cache_file, 'rb') as fd:
+      cache_content = fd.read()
+      fd.seek(0)
+      key = pickle.load(fd)
+    key_content = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+    for corrupted_content in [
+        cache_content[:len(cache_content) // 2],  # Truncated
+        key_content + 'cno_such_module\nZone\n.',  # ImportError
+        key_content + pickle.dumps([('BATH', ref_zones['BATH'].geometry.wkb,
+                                     ['name'], None)])]:  # AttributeError
+      with open(cache_file, 'wb') as fd:
+        fd.write(corrupted_content)
+      z = zones._ReadCachedKml(_ReadKmlZones, kml_file)
+      self.assertEqual(z['BATH'].wkb, ref_zones['BATH'].geometry.wkb)
+    self.assertEqual(num_reads[0], 6)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -45,6 +45,8 @@ import numpy as np
 from reference_models.common import data
 from reference_models.common import mpool
 from reference_models.common import cache
+from reference_models.common import grant_index
+from reference_models.common import telemetry
 from reference_models.propagation import wf_hybrid
 from reference_models.geo import utils
 from reference_models.interference import interference as interf
@@ -94,7 +96,8 @@ PPA_GRID_RES_ARCSEC = 2
 
 def iapPointConstraint(protection_point, channels, low_freq, high_freq,
                        grants, fss_info, esc_antenna_info,
-                       region_type, threshold, protection_ent_type):
+                       region_type, threshold, protection_ent_type,
+                       spatial_index=None):
   """Computes aggregate interference(Ap and ASASp) from authorized grants.
 
   This routine is applicable for FSS Co-Channel and ESC Sensor protection points,
@@ -112,6 +115,7 @@ def iapPointConstraint(protection_point, channels, low_freq, high_freq,
     region_type: Region type of the protection point: 'URBAN', 'SUBURBAN' or 'RURAL'.
     threshold: The protection threshold (mW).
     protection_ent_type: The entity type (|data.ProtectedEntityType|).
+    spatial_index: An optional |grant_index.GrantSpatialIndex| built on `grants`.
 
   Returns:
     A tuple (latitude, longitude, asas_interference, agg_interference) where:
@@ -124,14 +128,15 @@ def iapPointConstraint(protection_point, channels, low_freq, high_freq,
       low_frequency=low_freq, high_frequency=high_freq, entity_type=protection_ent_type)
 
   # Get all the grants inside neighborhood of the protection entity
-  grants_inside = interf.findGrantsInsideNeighborhood(
-      grants, protection_point, protection_ent_type)
+  with telemetry.Stage('neighborhood'):
+    grants_inside = interf.findGrantsInsideNeighborhood(
+        grants, protection_point, protection_ent_type, spatial_index)
 
-  # Get all the grants inside neighborhood of the protection entity, and
-  # with frequency overlap to the protection point.
-  neighbor_grants = interf.findOverlappingGrants(
-      grants_inside,
-      protection_constraint)
+    # Get all the grants inside neighborhood of the protection entity, and
+    # with frequency overlap to the protection point.
+    neighbor_grants = interf.findOverlappingGrants(
+        grants_inside,
+        protection_constraint)
 
   if not neighbor_grants:
     return (protection_point[1], protection_point[0],
@@ -274,6 +279,7 @@ def iapPointConstraint(protection_point, channels, low_freq, high_freq,
   return protection_point[1], protection_point[0], asas_interf, aggr_interf
 
 
+@telemetry.Reported('iap_esc')
 def performIapForEsc(esc_record, sas_uut_fad_object, sas_th_fad_objects):
   """Computes post IAP interference margin for ESC.
 
@@ -319,6 +325,7 @@ def performIapForEsc(esc_record, sas_uut_fad_object, sas_th_fad_objects):
   return ap_iap_ref
 
 
+@telemetry.Reported('iap_gwpz')
 def performIapForGwpz(gwpz_record, sas_uut_fad_object, sas_th_fad_objects):
   """Computes post IAP interference margin for GWPZ incumbents.
 
@@ -369,10 +376,11 @@ def performIapForGwpz(gwpz_record, sas_uut_fad_object, sas_th_fad_objects):
                      esc_antenna_info=None,
                      region_type=gwpz_region,
                      threshold=gwpz_iap_threshold,
-                     protection_ent_type=data.ProtectedEntityType.GWPZ_AREA)
+                     protection_ent_type=data.ProtectedEntityType.GWPZ_AREA,
+                     spatial_index=grant_index.GrantSpatialIndex(grants))
 
   pool = mpool.Pool()
-  iap_interfs = pool.map(iapPoint, protection_points)
+  iap_interfs = mpool.SpatialMap(iapPoint, protection_points, pool)
 
   ap_iap_ref = calculatePostIapAggregateInterference(
       interf.dbToLinear(gwpz_thresh_q), num_sas, iap_interfs)
@@ -380,6 +388,7 @@ def performIapForGwpz(gwpz_record, sas_uut_fad_object, sas_th_fad_objects):
   return ap_iap_ref
 
 
+@telemetry.Reported('iap_ppa')
 def performIapForPpa(ppa_record, sas_uut_fad_object, sas_th_fad_objects,
                      pal_records):
   """Computes post IAP interference margin for PPA incumbents.
@@ -447,10 +456,11 @@ def performIapForPpa(ppa_record, sas_uut_fad_object, sas_th_fad_objects,
                      esc_antenna_info=None,
                      region_type=ppa_region,
                      threshold=ppa_iap_threshold,
-                     protection_ent_type=data.ProtectedEntityType.PPA_AREA)
+                     protection_ent_type=data.ProtectedEntityType.PPA_AREA,
+                     spatial_index=grant_index.GrantSpatialIndex(grants))
 
   pool = mpool.Pool()
-  iap_interfs = pool.map(iapPoint, protection_points)
+  iap_interfs = mpool.SpatialMap(iapPoint, protection_points, pool)
 
   ap_iap_ref = calculatePostIapAggregateInterference(
       interf.dbToLinear(ppa_thresh_q), num_sas, iap_interfs)
@@ -458,6 +468,7 @@ def performIapForPpa(ppa_record, sas_uut_fad_object, sas_th_fad_objects,
   return ap_iap_ref
 
 
+@telemetry.Reported('iap_fss_cochannel')
 def performIapForFssCochannel(fss_record, sas_uut_fad_object, sas_th_fad_objects):
   """Computes post IAP interference margin for FSS Co-channel incumbent.
 
@@ -512,6 +523,7 @@ def performIapForFssCochannel(fss_record, sas_uut_fad_object, sas_th_fad_objects
   return ap_iap_ref
 
 
+@telemetry.Reported('iap_fss_blocking')
 def performIapForFssBlocking(fss_record, sas_uut_fad_object, sas_th_fad_objects):
   """Computes post IAP interference margin for FSS Blocking incumbent.
 
@@ -594,10 +606,11 @@ def calculatePostIapAggregateInterference(q_p, num_sas, iap_interfs):
     iap_interfs = [iap_interfs]
 
   ap_iap_ref = {}
-  for lat, lon, asas_interfs, agg_interfs in iap_interfs:
-    if lat not in ap_iap_ref: ap_iap_ref[lat] = {}
-    ap_iap_ref[lat][lon] = [
-        (float(q_p - aggr_interf) / num_sas + asas_interf)
-        for asas_interf, aggr_interf in zip(asas_interfs, agg_interfs)]
+  with telemetry.Stage('aggregation'):
+    for lat, lon, asas_interfs, agg_interfs in iap_interfs:
+      if lat not in ap_iap_ref: ap_iap_ref[lat] = {}
+      ap_iap_ref[lat][lon] = [
+          (float(q_p - aggr_interf) / num_sas + asas_interf)
+          for asas_interf, aggr_interf in zip(asas_interfs, agg_interfs)]
 
   return ap_iap_ref
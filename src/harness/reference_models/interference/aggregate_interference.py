@@ -41,6 +41,7 @@ import logging
 from reference_models.common import mpool
 from reference_models.common import data
 from reference_models.common import cache
+from reference_models.common import grant_index
 from reference_models.propagation import wf_hybrid
 from reference_models.interference import interference as interf
 from reference_models.geo import utils
@@ -70,7 +71,8 @@ def convertAndSumInterference(cbsd_interference_list):
 
 def aggregateInterferenceForPoint(protection_point, channels, grants,
                                   fss_info, esc_antenna_info,
-                                  protection_ent_type, region_type):
+                                  protection_ent_type, region_type,
+                                  spatial_index=None):
   """Computes the aggregate interference for a protection point.
 
   This routine is invoked to calculate aggregate interference for ESC sensor,
@@ -84,6 +86,7 @@ def aggregateInterferenceForPoint(protection_point, channels, grants,
     esc_antenna_info: ESC antenna information of type |data.EscInformation| (optional).
     protection_ent_type: The entity type (|data.ProtectedEntityType|).
     region: Region type of the protection point: 'URBAN', 'SUBURBAN' or 'RURAL'.
+    spatial_index: An optional |grant_index.GrantSpatialIndex| built on `grants`.
 
   Returns:
     A tuple (latitude, longitude, interferences) where interferences is a list
@@ -92,7 +95,7 @@ def aggregateInterferenceForPoint(protection_point, channels, grants,
 
   # Get all the grants inside neighborhood of the protection entity
   grants_inside = interf.findGrantsInsideNeighborhood(
-      grants, protection_point, protection_ent_type)
+      grants, protection_point, protection_ent_type, spatial_index)
 
   if not grants_inside:
     # We need one entry per channel, even if they're all zero.
@@ -275,16 +278,18 @@ def calculateAggregateInterferenceForGwpz(gwpz_record, grants):
                gwpz_record, protection_channels, len(protection_points), grants, gwpz_region)
   logging.debug('  points: %s', protection_points)
 
+  grants = list(grants)
   interfCalculator = partial(aggregateInterferenceForPoint,
                              channels=protection_channels,
                              grants=grants,
                              fss_info=None,
                              esc_antenna_info=None,
                              protection_ent_type=data.ProtectedEntityType.GWPZ_AREA,
-                             region_type=gwpz_region)
+                             region_type=gwpz_region,
+                             spatial_index=grant_index.GrantSpatialIndex(grants))
 
   pool = mpool.Pool()
-  interferences = pool.map(interfCalculator, protection_points)
+  interferences = mpool.SpatialMap(interfCalculator, protection_points, pool)
   return InterferenceDict(interferences)
 
 
@@ -333,14 +338,16 @@ def calculateAggregateInterferenceForPpa(ppa_record, pal_records, grants):
 
   # Calculate aggregate interference from each protection constraint with a
   # pool of parallel processes.
+  grants = list(grants)
   interfCalculator = partial(aggregateInterferenceForPoint,
                              channels=protection_channels,
                              grants=grants,
                              fss_info=None,
                              esc_antenna_info=None,
                              protection_ent_type=data.ProtectedEntityType.PPA_AREA,
-                             region_type=ppa_region)
+                             region_type=ppa_region,
+                             spatial_index=grant_index.GrantSpatialIndex(grants))
 
   pool = mpool.Pool()
-  interferences = pool.map(interfCalculator, protection_points)
+  interferences = mpool.SpatialMap(interfCalculator, protection_points, pool)
   return InterferenceDict(interferences)
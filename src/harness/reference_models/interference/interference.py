@@ -139,32 +139,40 @@ def getProtectedChannels(low_freq_hz, high_freq_hz):
   return [(low, high) for low, high in zip(channels, channels+5*MHZ)]
 
 
-def findGrantsInsideNeighborhood(grants, protection_point, entity_type):
+def findGrantsInsideNeighborhood(grants, protection_point, entity_type,
+                                 grant_index=None):
   """Finds grants inside protection entity neighborhood.
 
   Args:
     grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|.
     protection_point: The location of a protected entity as (longitude, latitude) tuple.
     entity_type: The entity type (|data.ProtectedEntityType|).
+    grant_index: An optional |grant_index.GrantSpatialIndex| built on `grants`,
+      used for fast neighborhood queries.
   Returns:
     grants_inside: a list of grants, each one being a namedtuple of type
                    |data.CbsdGrantInfo|, of all CBSDs inside the neighborhood
                    of the protection constraint.
   """
-  # Initialize an empty list
-  grants_inside = []
-
-  # Loop over each CBSD grant
-  for grant in grants:
-    # Compute distance from CBSD location to protection constraint location
-    dist_km, _, _ = vincenty.GeodesicDistanceBearing(grant.latitude,
-                      grant.longitude, protection_point[1], protection_point[0])
-
-    # Check if CBSD is inside the neighborhood of protection constraint
-    if dist_km <= _DISTANCE_PER_PROTECTION_TYPE[entity_type][grant.cbsd_category == 'B']:
-      grants_inside.append(grant)
-
-  return grants_inside
+  grants = list(grants)
+  if grant_index is not None:
+    idxs = grant_index.QueryRadius(protection_point[1], protection_point[0],
+                                   _DISTANCE_PER_PROTECTION_TYPE[entity_type])
+    return [grants[k] for k in idxs]
+  if not grants:
+    return []
+
+  # Compute distance from all CBSD locations to protection constraint location
+  dists_km, _, _ = vincenty.GeodesicDistanceBearings(
+      [grant.latitude for grant in grants],
+      [grant.longitude for grant in grants],
+      protection_point[1], protection_point[0])
+  max_dists_km = np.array(
+      [_DISTANCE_PER_PROTECTION_TYPE[entity_type][grant.cbsd_category == 'B']
+       for grant in grants])
+
+  # Keep the CBSDs inside the neighborhood of protection constraint
+  return [grants[k] for k in np.where(dists_km <= max_dists_km)[0]]
 
 
 def grantFrequencyOverlapCheck(grant, ch_low_freq, ch_high_freq, protection_ent_type):
@@ -12,6 +12,8 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+from collections import namedtuple
+import functools
 import logging
 import json
 
@@ -33,28 +35,166 @@ RX_HEIGHT = 1.5
 MAX_ALLOWABLE_EIRP_PER_10_MHZ_CAT_A = 30.
 MAX_ALLOWABLE_EIRP_PER_10_MHZ_CAT_B = 47.
 
+# The contour search modes (see `Configure()`).
+SEARCH_EXHAUSTIVE = 'EXHAUSTIVE'
+SEARCH_BOUNDED = 'BOUNDED'
+SEARCH_ADAPTIVE = 'ADAPTIVE'
+
+# The contour calculation configuration.
+_ContourConfig = namedtuple('_ContourConfig',
+                            ['use_radial_profiles',
+                             'search_mode',
+                             'fsl_margin_db',
+                             'coarse_step',
+                             'refine_tolerance_db'])
+_config = _ContourConfig(use_radial_profiles=False,
+                         search_mode=SEARCH_EXHAUSTIVE,
+                         fsl_margin_db=10.,
+                         coarse_step=5,
+                         refine_tolerance_db=6.)
+
+# The search counters, accumulated over all calls to `PpaCreationModel()`.
+_search_stats = {'evaluated': 0, 'skipped': 0}
+
+
+def Configure(use_radial_profiles=None,
+              search_mode=None,
+              fsl_margin_db=None,
+              coarse_step=None,
+              refine_tolerance_db=None):
+  """Configures the PPA contour calculation.
+
+  Unspecified parameters keep their current value.
+
+  Args:
+    use_radial_profiles: The terrain profile extraction mode.
+      If False (default), the terrain profile from the CBSD to each point of a
+      radial is extracted separately, as specified in R2-SGN-04.
+      If True, all the profiles of a radial are derived from a single profile
+      along the radial (see `TerrainDriver.RadialProfiles()`). This is much
+      faster but gives slightly different path losses.
+    search_mode: The search mode of the points above threshold on each radial:
+      - SEARCH_EXHAUSTIVE (default): the path loss is computed on all points.
+      - SEARCH_BOUNDED: the points which cannot be above threshold given a
+        lower bound of the path loss (the free space loss minus `fsl_margin_db`)
+        are skipped. As this bound increases with the distance, only the
+        first points of the radial are computed. This is exact as long as the
+        bound holds.
+      - SEARCH_ADAPTIVE: as SEARCH_BOUNDED, but the path loss is first computed
+        on every `coarse_step` points. Only the intervals between 2 coarse
+        points which are not both above (resp. below) threshold by more than
+        `refine_tolerance_db` are then fully computed; the other intervals are
+        considered fully above (resp. below) threshold.
+    fsl_margin_db: The margin (dB) below the free space loss used as lower
+      bound of the path loss in SEARCH_BOUNDED and SEARCH_ADAPTIVE modes.
+    coarse_step: The step (in number of points) of the coarse search in
+      SEARCH_ADAPTIVE mode.
+    refine_tolerance_db: The tolerance (dB) of the coarse search in
+      SEARCH_ADAPTIVE mode. Using `np.inf` makes it equivalent to the
+      SEARCH_BOUNDED mode.
+  """
+  global _config
+  if search_mode not in (None, SEARCH_EXHAUSTIVE, SEARCH_BOUNDED,
+                         SEARCH_ADAPTIVE):
+    raise ValueError('Invalid search mode: %s' % search_mode)
+  if coarse_step is not None and coarse_step < 1:
+    raise ValueError('Invalid coarse step: %s' % coarse_step)
+  params = {'use_radial_profiles': use_radial_profiles,
+            'search_mode': search_mode,
+            'fsl_margin_db': fsl_margin_db,
+            'coarse_step': coarse_step,
+            'refine_tolerance_db': refine_tolerance_db}
+  _config = _config._replace(**{key: value for key, value in params.items()
+                                if value is not None})
+
+
+def GetSearchStats():
+  """Returns the contour search counters.
+
+  Returns:
+    A dict holding the number of path loss evaluations done ('evaluated') and
+    skipped ('skipped') by the contour search, since last call to
+    `ResetSearchStats()`.
+  """
+  return dict(_search_stats)
+
+
+def ResetSearchStats():
+  """Resets the contour search counters."""
+  for key in _search_stats:
+    _search_stats[key] = 0
+
 
 def _CalculateDbLossForEachPointAndGetContour(install_param, eirp_capability, antenna_gain,
-                                              cbsd_region_type, latitudes, longitudes):
+                                              cbsd_region_type, latitudes, longitudes,
+                                              distances, its_elevs=None,
+                                              config=None):
   """Returns Vertex Point Distance for each azimuth with signal strength greater
-  than or equal to Threshold"""
-  db_loss = np.zeros(len(latitudes), dtype=np.float64)
+  than or equal to Threshold, and the number of skipped path loss computations."""
+  if config is None:
+    config = _config
   lat_cbsd, lon_cbsd  = install_param['latitude'], install_param['longitude']
   height_cbsd = install_param['height']
-  for index, lat_lon in enumerate(zip(latitudes, longitudes)):
-    lat, lon = lat_lon
-    db_loss[index] = wf_hybrid.CalcHybridPropagationLoss(
+  cbsd_indoor = install_param['indoorDeployment']
+  eirp = eirp_capability - install_param['antennaGain'] + antenna_gain
+  latitudes, longitudes = np.asarray(latitudes), np.asarray(longitudes)
+  num_points = len(latitudes)
+
+  def GetSignals(idxs):
+    """Returns the received signals at some points of the radial."""
+    # All the points are processed in a single batch.
+    db_loss = wf_hybrid.CalcHybridPropagationLossBatch(
         lat_cbsd, lon_cbsd, height_cbsd,
-        lat, lon, RX_HEIGHT,
-        cbsd_indoor=install_param['indoorDeployment'],
+        latitudes[idxs], longitudes[idxs], RX_HEIGHT,
+        cbsd_indoor=cbsd_indoor,
         reliability=0.5,
         region=cbsd_region_type,
-        is_height_cbsd_amsl=(install_param['heightType'] == 'AMSL')).db_loss
+        is_height_cbsd_amsl=(install_param['heightType'] == 'AMSL'),
+        its_elevs=None if its_elevs is None else its_elevs[idxs]).db_loss
+    return eirp - db_loss
+
+  if config.search_mode == SEARCH_EXHAUSTIVE:
+    num_candidates = num_points
+  else:
+    # The points which cannot be above threshold given the lower bound of the
+    # path loss are skipped. As the bound increases with distance, the
+    # candidates are the first points of the radial.
+    bound_loss = np.array([wf_hybrid.CalcFreeSpaceLoss(dist_km, 3625., 0, 0)
+                           for dist_km in distances]) - config.fsl_margin_db
+    if cbsd_indoor:
+      bound_loss += 15
+    num_candidates = np.count_nonzero(eirp - bound_loss >= THRESHOLD_PER_10MHZ)
+
+  if not num_candidates:
+    return 0., num_points
 
-  index_cond, = np.where(
-    (eirp_capability - install_param['antennaGain'] + antenna_gain) - db_loss
-    >= THRESHOLD_PER_10MHZ)
-  return index_cond.shape[0] * 0.2
+  if config.search_mode != SEARCH_ADAPTIVE:
+    signals = GetSignals(np.arange(num_candidates))
+    num_above = np.count_nonzero(signals >= THRESHOLD_PER_10MHZ)
+    return num_above * 0.2, num_points - num_candidates
+
+  # Coarse search.
+  coarse_idxs = np.unique(np.r_[np.arange(0, num_candidates, config.coarse_step),
+                                num_candidates - 1])
+  signals = GetSignals(coarse_idxs)
+  num_above = np.count_nonzero(signals >= THRESHOLD_PER_10MHZ)
+  is_far_above = signals >= THRESHOLD_PER_10MHZ + config.refine_tolerance_db
+  is_far_below = signals < THRESHOLD_PER_10MHZ - config.refine_tolerance_db
+  # Fine search in the intervals between coarse points, if required.
+  starts, ends = coarse_idxs[:-1] + 1, coarse_idxs[1:]
+  all_above = is_far_above[:-1] & is_far_above[1:]
+  all_below = is_far_below[:-1] & is_far_below[1:]
+  num_above += np.sum(ends[all_above] - starts[all_above])
+  do_refine = ~(all_above | all_below)
+  fine_idxs = np.concatenate(
+      [np.arange(start, end)
+       for start, end in zip(starts[do_refine], ends[do_refine])]
+      + [np.zeros(0, dtype=int)])
+  if len(fine_idxs):
+    signals = GetSignals(fine_idxs)
+    num_above += np.count_nonzero(signals >= THRESHOLD_PER_10MHZ)
+  num_skipped = num_points - len(coarse_idxs) - len(fine_idxs)
+  return num_above * 0.2, num_skipped
 
 
 def _HammingFilter(x, window_len=15):
@@ -65,8 +205,19 @@ def _HammingFilter(x, window_len=15):
   return y
 
 
-def _GetPolygon(device):
-  """Returns the PPA contour for a single CBSD device, as a shapely polygon."""
+def _GetPolygon(device, config=None):
+  """Returns the PPA contour for a single CBSD device.
+
+  Args:
+    device: A CBSD record (schema |CbsdRecordData|).
+    config: The |_ContourConfig| to use. If None, uses the current one.
+
+  Returns:
+    A tuple (polygon, num_evaluated, num_skipped) holding the contour as a
+    shapely polygon, and the number of path loss computations done and skipped.
+  """
+  if config is None:
+    config = _config
   install_param = device['installationParam']
   eirp_capability = install_param.get('eirpCapability',
                                       MAX_ALLOWABLE_EIRP_PER_10_MHZ_CAT_A
@@ -91,23 +242,35 @@ def _GetPolygon(device):
   cbsd_region_code = drive.nlcd_driver.GetLandCoverCodes(install_param['latitude'],
                                                          install_param['longitude'])
   cbsd_region_type = nlcd.GetRegionType(cbsd_region_code)
+  # Get the terrain profiles along each radial, if derived from a single profile
+  if config.use_radial_profiles:
+    radials_its_elevs = [drive.terrain_driver.RadialProfiles(
+        install_param['latitude'], install_param['longitude'], azimuth,
+        distances, target_res_meter=30., do_interp=True, max_points=1501)
+                         for azimuth in azimuths]
+  else:
+    radials_its_elevs = [None] * len(azimuths)
   # Compute the Path Loss, and contour based on Gain and Path Loss Comparing with Threshold
   # Smoothing Contour using Hamming Filter
-  contour_dists_km = _HammingFilter(
-      [_CalculateDbLossForEachPointAndGetContour(install_param,
-                                                 eirp_capability, ant_gain,
-                                                 cbsd_region_type,
-                                                 radial_lats, radial_lons)
-       for radial_lats, radial_lons, ant_gain in zip(latitudes,
-                                                     longitudes,
-                                                     antenna_gains)])
+  contour_dists_km, num_skipped = zip(*[
+      _CalculateDbLossForEachPointAndGetContour(install_param,
+                                                eirp_capability, ant_gain,
+                                                cbsd_region_type,
+                                                radial_lats, radial_lons,
+                                                distances, its_elevs, config)
+      for radial_lats, radial_lons, ant_gain, its_elevs in zip(
+          latitudes, longitudes, antenna_gains, radials_its_elevs)])
+  num_skipped = sum(num_skipped)
+  num_evaluated = len(azimuths) * len(distances) - num_skipped
+  contour_dists_km = _HammingFilter(contour_dists_km)
   # Generating lat, lon for Contour
   contour_lats, contour_lons, _ = zip(*[
       vincenty.GeodesicPoint(install_param['latitude'], install_param['longitude'],
                              dists, az)
       for dists, az in zip(contour_dists_km, azimuths)])
 
-  return sgeo.Polygon(zip(contour_lons, contour_lats)).buffer(0)
+  polygon = sgeo.Polygon(zip(contour_lons, contour_lats)).buffer(0)
+  return polygon, num_evaluated, num_skipped
 
 
 def _ClipPpaByCensusTract(contour_union, pal_records):
@@ -139,8 +302,12 @@ def PpaCreationModel(devices, pal_records):
     util.assertContainsRequiredFields("PalRecord.schema.json", pal_rec)
 
   # Create Contour for each CBSD
+  # The configuration is passed explicitly to the worker processes.
   pool = mpool.Pool()
-  device_polygon = pool.map(_GetPolygon, devices)
+  results = pool.map(functools.partial(_GetPolygon, config=_config), devices)
+  device_polygon = [polygon for polygon, _, _ in results]
+  _search_stats['evaluated'] += sum(num_evals for _, num_evals, _ in results)
+  _search_stats['skipped'] += sum(num_skipped for _, _, num_skipped in results)
 
   # Create Union of all the CBSD Contours and Check for hole
   # after Census Tract Clipping
@@ -17,6 +17,7 @@ import os
 import unittest
 import json
 
+import numpy as np
 import shapely.geometry as sgeo
 
 import util
@@ -51,9 +52,17 @@ class TestPpa(unittest.TestCase):
 
   def setUp(self):
     self.original_hybrid = wf_hybrid.CalcHybridPropagationLoss
+    self.original_hybrid_batch = wf_hybrid.CalcHybridPropagationLossBatch
 
   def tearDown(self):
     wf_hybrid.CalcHybridPropagationLoss = self.original_hybrid
+    wf_hybrid.CalcHybridPropagationLossBatch = self.original_hybrid_batch
+
+  def setFakePropagation(self, **kwargs):
+    wf_hybrid.CalcHybridPropagationLoss = testutils.FakePropagationPredictor(
+        **kwargs)
+    wf_hybrid.CalcHybridPropagationLossBatch = (
+        testutils.FakeBatchPropagationPredictor(**kwargs))
 
   def assertAlmostSamePolygon(self, poly1, poly2, tol_km2=0.001):
     self.assertTrue(utils.GeometryArea(poly1.difference(poly2)) < tol_km2)
@@ -61,7 +70,7 @@ class TestPpa(unittest.TestCase):
 
   def test_SimplePpaCircle(self):
     # Configuring for -96dBm circle at 16km includes
-    wf_hybrid.CalcHybridPropagationLoss = testutils.FakePropagationPredictor(
+    self.setFakePropagation(
         dist_type='REAL', factor=1.0, offset=(96+30-0.1) - 16.0)
     expected_ppa = sgeo.Polygon(
         [vincenty.GeodesicPoint(
@@ -78,7 +87,7 @@ class TestPpa(unittest.TestCase):
 
   def test_ClippedPpaByCensus(self):
     # Configuring for -96dBm circle above 40km
-    wf_hybrid.CalcHybridPropagationLoss = testutils.FakePropagationPredictor(
+    self.setFakePropagation(
         dist_type='REAL', factor=1.0, offset=(96+30-0.1) - 45.0)
     expected_ppa = sgeo.Polygon([(-80.3, 30.3), (-80.7, 30.3),
                                  (-80.7, 30.7), (-80.3, 30.7)])
@@ -89,6 +98,46 @@ class TestPpa(unittest.TestCase):
     self.assertAlmostSamePolygon(
         utils.ToShapely(ppa_zone), expected_ppa, 0.001)
 
+  def test_SearchModes(self):
+    # Configuring for -96dBm circle at about 20km, with a path loss above the
+    # lower bound used in bounded and adaptive search modes.
+    self.setFakePropagation(dist_type='REAL', factor=1.5, offset=95.)
+    self.addCleanup(ppa.Configure, search_mode=ppa.SEARCH_EXHAUSTIVE,
+                    fsl_margin_db=10., refine_tolerance_db=6.)
+    self.addCleanup(ppa.ResetSearchStats)
+    device = TestPpa.devices[0]
+    polygon, num_evals, num_skipped = ppa._GetPolygon(device)
+    self.assertEqual(num_evals, 360 * 200)
+    self.assertEqual(num_skipped, 0)
+
+    # Exact search with free space loss lower bound.
+    ppa.Configure(search_mode=ppa.SEARCH_BOUNDED, fsl_margin_db=20.)
+    bounded_polygon, num_evals, num_skipped = ppa._GetPolygon(device)
+    self.assertTrue(bounded_polygon.equals(polygon))
+    self.assertGreater(num_skipped, 0)
+    self.assertEqual(num_evals + num_skipped, 360 * 200)
+    # Adaptive search, with no tolerance.
+    ppa.Configure(search_mode=ppa.SEARCH_ADAPTIVE, refine_tolerance_db=np.inf)
+    adaptive_polygon, num_evals, adaptive_num_skipped = ppa._GetPolygon(device)
+    self.assertTrue(adaptive_polygon.equals(polygon))
+    self.assertEqual(adaptive_num_skipped, num_skipped)
+    # Adaptive search.
+    ppa.Configure(refine_tolerance_db=6.)
+    adaptive_polygon, num_evals, adaptive_num_skipped = ppa._GetPolygon(device)
+    self.assertTrue(adaptive_polygon.equals(polygon))
+    self.assertGreater(adaptive_num_skipped, num_skipped)
+
+    # Counters.
+    ppa.ResetSearchStats()
+    ppa.PpaCreationModel(TestPpa.devices, TestPpa.pal_records)
+    self.assertEqual(ppa.GetSearchStats(),
+                     {'evaluated': num_evals, 'skipped': adaptive_num_skipped})
+
+  def test_InvalidSearchMode(self):
+    with self.assertRaises(ValueError):
+      ppa.Configure(search_mode='UNKNOWN')
+
+
 
 if __name__ == '__main__':
   unittest.main()
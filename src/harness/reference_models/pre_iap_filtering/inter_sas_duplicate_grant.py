@@ -20,7 +20,9 @@ CBSD is removed from the FAD objects of the respective SASs.
 """
 
 import logging
-from collections import defaultdict
+from collections import Counter
+
+import numpy as np
 
 
 def interSasDuplicateGrantPurgeReferenceModel(sas_uut_fad, sas_test_harness_fads):
@@ -35,26 +37,19 @@ def interSasDuplicateGrantPurgeReferenceModel(sas_uut_fad, sas_test_harness_fads
       from SAS test harnesses.
   """
   # Get all the CBSD Reference ID of all CBSDs from UUT and SAS test Harness FAD objects
-  cbsd_id_counts = defaultdict(int)
-  for cbsd in sas_uut_fad.getCbsdRecords():
-    cbsd_id_counts[cbsd['id']] += 1
-  for fad in sas_test_harness_fads:
-    for cbsd in fad.getCbsdRecords():
-      cbsd_id_counts[cbsd['id']] += 1
-
-  # Iterate through the UUT CBSD list and keep only the non duplicate CBSDs
-  cbsds_to_keep = []
-  for cbsd in sas_uut_fad.getCbsdRecords():
-    if cbsd_id_counts[cbsd['id']] == 1:
-      cbsds_to_keep.append(cbsd)
-  logging.info('CBSDs to keep in SAS UUT: %s', cbsds_to_keep)
-  sas_uut_fad.setCbsdRecords(cbsds_to_keep)
-
-  # Iterate through the test harness CBSD list and keep only the non duplicate CBSDs
-  for fad in sas_test_harness_fads:
-    cbsds_to_keep = []
-    for cbsd in fad.getCbsdRecords():
-      if cbsd_id_counts[cbsd['id']] == 1:
-        cbsds_to_keep.append(cbsd)
-    logging.info('CBSDs to keep in SAS TH: %s', cbsds_to_keep)
+  fads = ([(sas_uut_fad, 'SAS UUT')] +
+          [(fad, 'SAS TH') for fad in sas_test_harness_fads])
+  indexes = [fad.getCbsdIndex() for fad, _ in fads]
+  cbsd_id_counts = Counter()
+  for index in indexes:
+    cbsd_id_counts.update(index.ids)
+  duplicate_ids = [cbsd_id for cbsd_id, count in cbsd_id_counts.iteritems()
+                   if count > 1]
+
+  # Keep only the non duplicate CBSDs in the UUT and test harness CBSD lists
+  for (fad, sas_name), index in zip(fads, indexes):
+    is_duplicate = np.zeros(len(index.records), dtype=bool)
+    is_duplicate[index.getCbsdIdxs(duplicate_ids)] = True
+    cbsds_to_keep = [index.records[k] for k in np.flatnonzero(~is_duplicate)]
+    logging.info('CBSDs to keep in %s: %s', sas_name, cbsds_to_keep)
     fad.setCbsdRecords(cbsds_to_keep)
@@ -12,6 +12,7 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import numpy as np
 import shapely.geometry as sgeo
 from reference_models.geo import vincenty
 from sas_test_harness import generateCbsdReferenceId
@@ -136,19 +137,19 @@ def getFssNeighboringCbsdsWithGrants(cbsds, fss_point,
     fss_point: A tuple (longitude, latitude) of the FSS location.
     distance_km: The neighboring distance (km).
   """
-  neighboring_cbsds_with_grants = []
-  for cbsd in cbsds:
-    if not cbsd['grants']:
-      continue
-    distance, _, _ = vincenty.GeodesicDistanceBearing(
-        fss_point[1],
-        fss_point[0],
-        cbsd['registration']['installationParam']['latitude'],
-        cbsd['registration']['installationParam']['longitude'])
-    # Get the list of cbsds that are within 150kms from the FSS entity
-    if distance <= distance_km and cbsd['grants']:
-        neighboring_cbsds_with_grants.append(cbsd)
-  return neighboring_cbsds_with_grants
+  cbsds_with_grants = [cbsd for cbsd in cbsds if cbsd['grants']]
+  if not cbsds_with_grants:
+    return []
+  distances, _, _ = vincenty.GeodesicDistanceBearings(
+      fss_point[1],
+      fss_point[0],
+      [cbsd['registration']['installationParam']['latitude']
+       for cbsd in cbsds_with_grants],
+      [cbsd['registration']['installationParam']['longitude']
+       for cbsd in cbsds_with_grants])
+  # Get the list of cbsds that are within 150kms from the FSS entity
+  return [cbsds_with_grants[k]
+          for k in np.where(distances <= distance_km)[0]]
 
 
 def getFssNeighboringGwbl(gwbl_records, fss_records):
@@ -60,8 +60,10 @@ static PyObject* ExtendedHata(PyObject* self, PyObject* args) {
 
   double dbloss;
   InterValues dbg_vals;
+  Py_BEGIN_ALLOW_THREADS
   ExtendedHata_DBG(elev, frq_mhz, hb_m, hm_m, environment,
                    &dbloss, &dbg_vals);
+  Py_END_ALLOW_THREADS
   delete[] elev;
 
   return Py_BuildValue("d", dbloss);
@@ -106,8 +108,10 @@ static PyObject* MedianBasicPropLoss(PyObject* self, PyObject* args) {
 
   double dbloss;
   InterValues dbg_vals;
+  Py_BEGIN_ALLOW_THREADS
   MedianBasicPropLoss(frq_mhz, hb_m, hm_m, d_km, environment,
                       &dbloss, &dbg_vals);
+  Py_END_ALLOW_THREADS
 
   return Py_BuildValue("d", dbloss);
 
@@ -99,3 +99,61 @@ def point_to_point(its_elev, height_tx, height_rx,
                                        freq_mhz, climate, polarization,
                                        confidence, reliabilities,
                                        mdvar, refract_is_final)
+
+
+def point_to_point_batch(its_elevs, heights_tx, heights_rx,
+                         dielectrics, conductivities,
+                         refractivities, freq_mhz,
+                         climates, polarization,
+                         confidence, reliabilities,
+                         mdvar=12, refract_is_final=False):
+  """Computes the ITM propagation path loss on a batch of profiles.
+
+  This is equivalent to calling `point_to_point()` on each profile, but
+  all the links are computed in a single call to the extension module, which
+  releases the GIL during the computation.
+
+  Inputs:
+    its_elevs:  Terrain profiles in ITS format, as a 2D array with one
+                profile per row. Profiles shorter than the row size shall be
+                padded with arbitrary values (for example zeros).
+    heights_tx: Heights of transmitter (meters).
+    heights_rx: Heights of receiver (meters).
+    dielectrics: Dielectric constants (relative permittivity) of the ground.
+    conductivities: Conductivities of the ground (S/m).
+    refractivities: Refractivities of the atmosphere.
+    freq_mhz:   Frequency (MHz).
+    climates:   Climate codes (see `point_to_point()`).
+    polarization: Signal polarization (0: horizontal, 1: vertical).
+    confidence: Confidence factor [0.01..0.99].
+    reliabilities: Reliability factor [0.001..0.999], either scalar or a
+                   sequence of values.
+    mdvar:      Mode of variability.
+    refract_is_final: boolean - If True, do not correct the refractivity
+                      with average altitude.
+    All the per link parameters (heights, dielectrics, conductivities,
+    refractivities and climates) can be either a scalar or an array with one
+    value per profile.
+
+  Returns:
+     a tuple of ndarray:
+       path_loss: the path losses in dB, either a 1D array (if reliability is
+                  scalar), or a 2D array with one row per profile and one
+                  column per reliability.
+       ver_cbsd: the vertical departure angles at CBSD.
+       ver_rx: the vertical incidence angles at Rx.
+       err_num:  The 'error' codes (see `point_to_point()`).
+  """
+  its_elevs = np.atleast_2d(np.asarray(its_elevs, dtype=np.float64))
+  num_links = its_elevs.shape[0]
+  def PerLink(values, dtype=np.float64):
+    return np.broadcast_to(np.asarray(values, dtype=dtype), (num_links,))
+  path_losses, ver_cbsd, ver_rx, err_num = itm_its.point_to_point_batch(
+      its_elevs, PerLink(heights_tx), PerLink(heights_rx),
+      PerLink(dielectrics), PerLink(conductivities), PerLink(refractivities),
+      freq_mhz, PerLink(climates, np.intc), polarization,
+      confidence, np.atleast_1d(np.asarray(reliabilities, dtype=np.float64)),
+      mdvar, refract_is_final)
+  if np.isscalar(reliabilities):
+    path_losses = path_losses[:, 0]
+  return path_losses, ver_cbsd, ver_rx, err_num
@@ -15,6 +15,9 @@
 #include <Python.h>
 #include <iostream>
 
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
+#include <numpy/arrayobject.h>
+
 #include "its/itm.h"
 
 
@@ -65,10 +68,12 @@ static PyObject* itm_point_to_point(PyObject* self, PyObject* args) {
   char strmode[100];
   int errnum;
   double ver0, ver1;
+  Py_BEGIN_ALLOW_THREADS
   point_to_point(elev, tht_m, rht_m, eps_dielect, sgm_conductivity,
                  eno_ns_surfref, frq_mhz, radio_climate, pol, conf, rel,
                  mdvar, !!eno_final,
                  dbloss, strmode, errnum, ver0, ver1);
+  Py_END_ALLOW_THREADS
   delete[] elev;
   return Py_BuildValue("dddsi", dbloss, ver0, ver1, strmode, errnum);
 }
@@ -145,11 +150,13 @@ static PyObject* itm_point_to_point_rels(PyObject* self, PyObject* args) {
   double ver0, ver1;
   char strmode[100];
   int errnum;
+  Py_BEGIN_ALLOW_THREADS
   point_to_point_rels(elev, tht_m, rht_m, eps_dielect, sgm_conductivity,
                       eno_ns_surfref, frq_mhz, radio_climate, pol, conf,
                       rels, num_rels,
                       mdvar, !!eno_final,
                       db_losses, strmode, errnum, ver0, ver1);
+  Py_END_ALLOW_THREADS
   delete[] elev;
   delete[] rels;
 
@@ -162,12 +169,153 @@ static PyObject* itm_point_to_point_rels(PyObject* self, PyObject* args) {
   return Py_BuildValue("Oddsi", loss_obj, ver0, ver1, strmode, errnum);
 }
 
+// Gets a 1D C-contiguous array of given type and size from a python object.
+static PyArrayObject* GetVector(PyObject* obj, int typenum, npy_intp size,
+                                const char* name) {
+  PyArrayObject* arr = (PyArrayObject*) PyArray_FROMANY(
+      obj, typenum, 1, 1, NPY_ARRAY_IN_ARRAY);
+  if (arr == NULL) return NULL;
+  if (size >= 0 && PyArray_DIM(arr, 0) != size) {
+    Py_DECREF(arr);
+    PyErr_Format(PyExc_ValueError, "Invalid size of %s array.", name);
+    return NULL;
+  }
+  return arr;
+}
+
+// Computes the path loss of a batch of links in a single call.
+// The profiles are given as a 2D array, one ITS profile per row (possibly
+// padded with extra values), and the per-link parameters as 1D arrays.
+// The computation is done with the GIL released.
+static PyObject* itm_point_to_point_batch(PyObject* self, PyObject* args) {
+  PyObject *elevs_obj = NULL, *tht_obj = NULL, *rht_obj = NULL;
+  PyObject *eps_obj = NULL, *sgm_obj = NULL, *eno_obj = NULL;
+  PyObject *climate_obj = NULL, *rels_obj = NULL;
+  double frq_mhz;
+  int pol;
+  double conf;
+  int mdvar = 12;  // Default arguments
+  int eno_final = 0;
+  if (!PyArg_ParseTuple(args, "OOOOOOdOidO|ii:point_to_point_batch",
+                        &elevs_obj, &tht_obj, &rht_obj, &eps_obj, &sgm_obj,
+                        &eno_obj, &frq_mhz, &climate_obj, &pol, &conf, &rels_obj,
+                        &mdvar, &eno_final)) {
+    return NULL;
+  }
+
+  PyArrayObject *elevs = NULL, *tht = NULL, *rht = NULL, *eps = NULL;
+  PyArrayObject *sgm = NULL, *eno = NULL, *climate = NULL, *rels = NULL;
+  PyArrayObject *losses = NULL, *ver0 = NULL, *ver1 = NULL, *errnum = NULL;
+  PyObject* result = NULL;
+  npy_intp num_links, size, num_rels;
+  npy_intp dims[2];
+  double *elev_data, *rels_data, *loss_data;
+  double *tht_data, *rht_data, *eps_data, *sgm_data, *eno_data;
+  double *ver0_data, *ver1_data;
+  int *climate_data, *errnum_data;
+  bool is_final = !!eno_final;
+
+  // Get the profiles.
+  elevs = (PyArrayObject*) PyArray_FROMANY(elevs_obj, NPY_DOUBLE, 2, 2,
+                                           NPY_ARRAY_IN_ARRAY);
+  if (elevs == NULL) goto done;
+  num_links = PyArray_DIM(elevs, 0);
+  size = PyArray_DIM(elevs, 1);
+  if (size < 4) {
+    PyErr_SetString(PyExc_ValueError, "Invalid profile size. Should be >= 4.");
+    goto done;
+  }
+  elev_data = (double*) PyArray_DATA(elevs);
+  for (npy_intp i = 0; i < num_links; i++) {
+    if (!(elev_data[i*size] <= size-3)) {
+      PyErr_Format(PyExc_ValueError,
+                   "Invalid Profile #%ld. Size in slot 0 bigger than actual "
+                   "array size.", (long)i);
+      goto done;
+    }
+  }
+  // Get the per-link parameters.
+  if ((tht = GetVector(tht_obj, NPY_DOUBLE, num_links, "tht_m")) == NULL ||
+      (rht = GetVector(rht_obj, NPY_DOUBLE, num_links, "rht_m")) == NULL ||
+      (eps = GetVector(eps_obj, NPY_DOUBLE, num_links, "eps_dielect")) == NULL ||
+      (sgm = GetVector(sgm_obj, NPY_DOUBLE, num_links, "sgm_conductivity")) == NULL ||
+      (eno = GetVector(eno_obj, NPY_DOUBLE, num_links, "eno_ns_surfref")) == NULL ||
+      (climate = GetVector(climate_obj, NPY_INT, num_links, "radio_climate")) == NULL) {
+    goto done;
+  }
+  // Get the reliabilities.
+  if ((rels = GetVector(rels_obj, NPY_DOUBLE, -1, "reliabilities")) == NULL) {
+    goto done;
+  }
+  num_rels = PyArray_DIM(rels, 0);
+  if (num_rels <= 0) {
+    PyErr_SetString(PyExc_ValueError, "Reliabilities list empty.");
+    goto done;
+  }
+
+  // Allocate the outputs.
+  dims[0] = num_links;
+  dims[1] = num_rels;
+  losses = (PyArrayObject*) PyArray_SimpleNew(2, dims, NPY_DOUBLE);
+  ver0 = (PyArrayObject*) PyArray_SimpleNew(1, dims, NPY_DOUBLE);
+  ver1 = (PyArrayObject*) PyArray_SimpleNew(1, dims, NPY_DOUBLE);
+  errnum = (PyArrayObject*) PyArray_SimpleNew(1, dims, NPY_INT);
+  if (losses == NULL || ver0 == NULL || ver1 == NULL || errnum == NULL) {
+    goto done;
+  }
+
+  tht_data = (double*) PyArray_DATA(tht);
+  rht_data = (double*) PyArray_DATA(rht);
+  eps_data = (double*) PyArray_DATA(eps);
+  sgm_data = (double*) PyArray_DATA(sgm);
+  eno_data = (double*) PyArray_DATA(eno);
+  climate_data = (int*) PyArray_DATA(climate);
+  rels_data = (double*) PyArray_DATA(rels);
+  loss_data = (double*) PyArray_DATA(losses);
+  ver0_data = (double*) PyArray_DATA(ver0);
+  ver1_data = (double*) PyArray_DATA(ver1);
+  errnum_data = (int*) PyArray_DATA(errnum);
+
+  Py_BEGIN_ALLOW_THREADS
+  char strmode[100];
+  for (npy_intp i = 0; i < num_links; i++) {
+    point_to_point_rels(elev_data + i*size, tht_data[i], rht_data[i],
+                        eps_data[i], sgm_data[i], eno_data[i],
+                        frq_mhz, climate_data[i], pol, conf,
+                        rels_data, (int)num_rels,
+                        mdvar, is_final,
+                        loss_data + i*num_rels, strmode, errnum_data[i],
+                        ver0_data[i], ver1_data[i]);
+  }
+  Py_END_ALLOW_THREADS
+
+  result = Py_BuildValue("OOOO", losses, ver0, ver1, errnum);
+
+done:
+  Py_XDECREF(elevs);
+  Py_XDECREF(tht);
+  Py_XDECREF(rht);
+  Py_XDECREF(eps);
+  Py_XDECREF(sgm);
+  Py_XDECREF(eno);
+  Py_XDECREF(climate);
+  Py_XDECREF(rels);
+  Py_XDECREF(losses);
+  Py_XDECREF(ver0);
+  Py_XDECREF(ver1);
+  Py_XDECREF(errnum);
+  return result;
+}
+
 static PyMethodDef ITMMethods[] = {
   {"point_to_point", itm_point_to_point, METH_VARARGS, "Point-to-point model"},
   {"point_to_point_rels", itm_point_to_point_rels, METH_VARARGS, "Point-to-point-Rels model"},
+  {"point_to_point_batch", itm_point_to_point_batch, METH_VARARGS,
+   "Point-to-point model on a batch of profiles"},
   {NULL, NULL, 0, NULL}
 };
 
 PyMODINIT_FUNC inititm_its(void) {
   Py_InitModule3("itm_its", ITMMethods, "Longley-Rice ITM Propagation Module");
+  import_array();
 }
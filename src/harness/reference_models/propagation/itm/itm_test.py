@@ -13,6 +13,7 @@
 #    limitations under the License.
 
 import numpy as np
+import threading
 import unittest
 
 from reference_models.propagation.itm import itm
@@ -313,6 +314,72 @@ class TestItm(unittest.TestCase):
     self.assertEqual(a0, v0)
     self.assertEqual(a1, v1)
 
+  def test_batch(self):
+    # Several profiles of different sizes, with per link parameters
+    profiles = [PROFILE,
+                [5, 28.5, 10, 10, 8, 9, 11, 12],
+                [100, 77800./156.] + PROFILE[30:131],
+                [50, 77800./156.] + PROFILE[2:53]]
+    heights_tx = [143.9, 100, 30, 5]
+    heights_rx = [8.5, 50, 1.5, 10]
+    refractivities = [314., 301., 320., 280.]
+    climates = [5, 4, 5, 6]
+    its_elevs = np.zeros((len(profiles), len(PROFILE)))
+    for k, profile in enumerate(profiles):
+      its_elevs[k, :len(profile)] = profile
+    reliabilities = [0.01, 0.1, 0.5, 0.9, 0.99]
+    losses, ver0, ver1, errs = itm.point_to_point_batch(
+        its_elevs, heights_tx, heights_rx, 15, .005, refractivities,
+        573.3, climates, 0, 0.5, reliabilities, mdvar=13)
+    self.assertEqual(losses.shape, (len(profiles), len(reliabilities)))
+    for k, profile in enumerate(profiles):
+      exp_losses, exp_v0, exp_v1, _, exp_err = itm.point_to_point(
+          profile, heights_tx[k], heights_rx[k], 15, .005, refractivities[k],
+          573.3, climates[k], 0, 0.5, reliabilities, mdvar=13)
+      self.assertListEqual(list(losses[k]), exp_losses)
+      self.assertEqual(ver0[k], exp_v0)
+      self.assertEqual(ver1[k], exp_v1)
+      self.assertEqual(errs[k], exp_err)
+      # Scalar reliability
+      exp_loss, _, _, _, _ = itm.point_to_point(
+          profile, heights_tx[k], heights_rx[k], 15, .005, refractivities[k],
+          573.3, climates[k], 0, 0.5, 0.5, mdvar=13)
+      loss, _, _, _ = itm.point_to_point_batch(
+          its_elevs[k], heights_tx[k], heights_rx[k], 15, .005,
+          refractivities[k], 573.3, climates[k], 0, 0.5, 0.5, mdvar=13)
+      self.assertEqual(loss.shape, (1,))
+      self.assertEqual(loss[0], exp_loss)
+
+  def test_batch_invalid_profile(self):
+    its_elevs = np.zeros((2, 10))
+    its_elevs[:, 1] = 30.
+    its_elevs[1, 0] = 8
+    with self.assertRaises(ValueError):
+      itm.point_to_point_batch(its_elevs, 10, 10, 15, .005, 314.,
+                               3625., 5, 0, 0.5, 0.5)
+
+  def test_batch_threads(self):
+    num_links = 200
+    its_elevs = np.zeros((num_links, len(PROFILE)))
+    its_elevs[:] = PROFILE
+    heights_tx = np.linspace(5, 200, num_links)
+    exp_losses, _, _, _ = itm.point_to_point_batch(
+        its_elevs, heights_tx, 8.5, 15, .005, 314., 573.3, 5, 0, 0.5,
+        [0.1, 0.5, 0.9])
+    results = [None] * 4
+    def Run(k):
+      results[k] = itm.point_to_point_batch(
+          its_elevs, heights_tx, 8.5, 15, .005, 314., 573.3, 5, 0, 0.5,
+          [0.1, 0.5, 0.9])[0]
+    threads = [threading.Thread(target=Run, args=(k,))
+               for k in range(len(results))]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    for losses in results:
+      self.assertTrue(np.array_equal(losses, exp_losses))
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -25,6 +25,19 @@
 
 #define THIRD  (1.0/3.0)
 
+// *** WinnForum modification - Thread safety:
+// the state kept between successive calls of the routines in `static` local
+// variables is made thread local, so that several paths can be computed in
+// parallel in different threads.
+#if defined(_MSC_VER) && _MSC_VER < 1900
+#  define ITM_THREAD_LOCAL __declspec(thread)
+#elif defined(__GNUC__) && (__cplusplus < 201103L)
+// Pre C++11 GCC/Clang (default standard of older toolchains).
+#  define ITM_THREAD_LOCAL __thread
+#else
+#  define ITM_THREAD_LOCAL thread_local
+#endif
+
 using namespace std;
 
 struct tcomplex
@@ -182,7 +195,7 @@ double ahd(double td)
 
 double  adiff( double d, prop_type &prop, propa_type &propa)
 { complex<double> prop_zgnd(prop.zgndreal,prop.zgndimag);
-  static double wd1, xd1, afo, qk, aht, xht;
+  static ITM_THREAD_LOCAL double wd1, xd1, afo, qk, aht, xht;
   double a, q, pk, ds, th, wa, ar, wd, adiffv;
   if(d==0)
     { q=prop.hg[0]*prop.hg[1];
@@ -227,7 +240,7 @@ double  adiff( double d, prop_type &prop, propa_type &propa)
 
 double  ascat( double d, prop_type &prop, propa_type &propa)
 { complex<double> prop_zgnd(prop.zgndreal,prop.zgndimag);
-  static double ad, rr, etq, h0s;
+  static ITM_THREAD_LOCAL double ad, rr, etq, h0s;
   double h0, r1, r2, z0, ss, et, ett, th, q;
   double ascatv;
   if(d==0.0)
@@ -318,7 +331,7 @@ double abq_alos (complex<double> r)
 
 double  alos( double d, prop_type &prop, propa_type &propa)
 { complex<double> prop_zgnd(prop.zgndreal,prop.zgndimag);
-  static double wls;
+  static ITM_THREAD_LOCAL double wls;
   complex<double> r;
   double s, sps, q;
   double alosv;
@@ -379,8 +392,8 @@ void qlra( int kst[], int klimx, int mdvarx,
 
 void lrprop (double d,
           prop_type &prop, propa_type &propa)  // PaulM_lrprop
-{ static bool wlos, wscat;
-  static double dmin, xae;
+{ static ITM_THREAD_LOCAL bool wlos, wscat;
+  static ITM_THREAD_LOCAL double dmin, xae;
   complex<double> prop_zgnd(prop.zgndreal,prop.zgndimag);
   double a0, a1, a2, a3, a4, a5, a6;
   double d0, d1, d2, d3, d4, d5, d6;
@@ -529,8 +542,8 @@ double curve (double const &c1, double const &c2, double const &x1,
 
 double avar(double zzt, double zzl, double zzc,
          prop_type &prop, propv_type &propv)
-{ static int kdv;
-  static double dexa, de, vmd, vs0, sgl, sgtm, sgtp, sgtd, tgtd,
+{ static ITM_THREAD_LOCAL int kdv;
+  static ITM_THREAD_LOCAL double dexa, de, vmd, vs0, sgl, sgtm, sgtp, sgtd, tgtd,
                 gm, gp, cv1, cv2, yv1, yv2, yv3, csm1, csm2, ysm1, ysm2,
 				ysm3, csp1, csp2, ysp1, ysp2, ysp3, csd1, zd, cfm1, cfm2,
 				cfm3, cfp1, cfp2, cfp3;
@@ -557,7 +570,7 @@ double avar(double zzt, double zzl, double zzc,
   double bfp1[7]={1.0,0.93,1.0,0.93,0.93,1.0,1.0};
   double bfp2[7]={0.0,0.31,0.0,0.19,0.31,0.0,0.0};
   double bfp3[7]={0.0,2.00,0.0,1.79,2.00,0.0,0.0};
-  static bool ws, w1;
+  static ITM_THREAD_LOCAL bool ws, w1;
   double rt=7.8, rl=24.0, avarv, q, vs, zt, zl, zc;
   double sgt, yr;
   int temp_klim = propv.klim-1;
@@ -19,8 +19,11 @@
 from distutils.core import Extension, setup
 from distutils.sysconfig import get_config_vars
 
+import numpy as np
+
 itm_module = Extension('itm_its', sources = ['its/itm.cpp',
                                              'itm_its_py.cpp'],
+                       include_dirs=[np.get_include()],
                        extra_compile_args=['-D_hypot=hypot'])
 
 # Remove the "-Wstrict-prototypes" compiler option (not valid for C++).
@@ -31,11 +31,20 @@ Typical usage:
               reliability=0.5,
               freq_mhz=3625.,
               region='URBAN')
+
+  # Get the path losses from a CBSD to many Rx points at once
+  db_losses, incidence_angles, internals = CalcHybridPropagationLossBatch(
+              lat_cbsd, lon_cbsd, height_cbsd,
+              lats_rx, lons_rx, height_rx,
+              reliability=0.5,
+              region='URBAN')
 """
 
 from collections import namedtuple
 import math
 
+import numpy as np
+
 from reference_models.geo import drive
 from reference_models.geo import vincenty
 from reference_models.propagation import wf_itm
@@ -315,6 +324,162 @@ def CalcHybridPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
                         HybridMode.ITM_CORRECTED, cbsd_indoor)
 
 
+# Batched version of the Hybrid model
+def CalcHybridPropagationLossBatch(lat_cbsd, lon_cbsd, height_cbsd,
+                                   lats_rx, lons_rx, height_rx,
+                                   cbsd_indoor=False,
+                                   reliability=-1,
+                                   freq_mhz=3625.,
+                                   region='RURAL',
+                                   is_height_cbsd_amsl=False,
+                                   its_elevs=None):
+  """Implements the Hybrid ITM/eHata NTIA propagation model from one CBSD to many points.
+
+  This is equivalent to calling `CalcHybridPropagationLoss()` for each Rx point,
+  with strictly identical results, but the terrain profiles are all extracted
+  at once, and the ITM model is run on all the paths in a single call.
+  Typical use is to compute the path losses on all points of a radial.
+
+  Inputs:
+    lat_cbsd, lon_cbsd, height_cbsd: Lat/lon (deg) and height AGL (m) of CBSD
+    lats_rx, lons_rx:   Lat/lon (deg) of the Rx points, as sequences.
+    height_rx:          Height AGL (m) of Rx points.
+    its_elevs:          Optional profiles to use, for example as returned by
+                          `TerrainDriver.RadialProfiles()`. Default=None
+                          If not specified, they are extracted from the terrain.
+    Other parameters: see `CalcHybridPropagationLoss()`.
+
+  Returns:
+    A namedtuple of:
+      db_loss:          ndarray of Path Loss in dB.
+      incidence_angles: A namedtuple of ndarray of angles (see
+                        `CalcHybridPropagationLoss()`).
+      internals:        A dictionary of internal data:
+          hybrid_opcode:  ndarray of opcodes from HybridCode.
+          dist_km:        ndarray of distances between end points (km)
+
+  Raises:
+    Exception if input parameters invalid or out of range.
+  """
+  lats_rx = np.atleast_1d(np.asarray(lats_rx, dtype=float))
+  lons_rx = np.atleast_1d(np.asarray(lons_rx, dtype=float))
+  num_rx = len(lats_rx)
+
+  # Sanity checks on input parameters
+  if freq_mhz < 40 or freq_mhz > 10000:
+    raise Exception('Frequency outside range [40MHz - 10GHz].')
+  if region not in ['RURAL', 'URBAN', 'SUBURBAN']:
+    raise Exception('Region %s not allowed' % region)
+  if reliability not in (-1, 0.5):
+    raise Exception('Hybrid model only computes the median or the mean.')
+
+  if is_height_cbsd_amsl:
+    altitude_cbsd = drive.terrain_driver.GetTerrainElevation(lat_cbsd, lon_cbsd)
+    height_cbsd = height_cbsd - altitude_cbsd
+
+  # Get the terrain profiles, using Vincenty great circle route, and WF
+  # standard (bilinear interp; 1501 pts for all distances over 45 km)
+  if its_elevs is None:
+    its_elevs = drive.terrain_driver.TerrainProfiles(lat_cbsd, lon_cbsd,
+                                                     lats_rx, lons_rx,
+                                                     target_res_meter=30.,
+                                                     do_interp=True,
+                                                     max_points=1501)
+
+  # Structural CBSD and mobile height corrections
+  height_cbsd = max(height_cbsd, 20.)
+  height_rx = 1.5
+
+  # Calculate the predicted ITM losses (same points are processed as well).
+  db_loss_itm, incidence_angles, itm_internals = wf_itm.CalcItmPropagationLossBatch(
+      lat_cbsd, lon_cbsd, height_cbsd,
+      lats_rx, lons_rx, height_rx,
+      False, reliability, freq_mhz, its_elevs)
+  dists_km = itm_internals['dist_km']
+
+  # Default to ITM everywhere, then process the different cases
+  db_loss = db_loss_itm.copy()
+  opcodes = np.full(num_rx, HybridMode.ITM_RURAL, dtype=int)
+  if region == 'URBAN':
+    region_code = 23
+  elif region == 'SUBURBAN':
+    region_code = 22
+  else:
+    region_code = None
+  offset_median_to_mean = _GetMedianToMeanOffsetDb(freq_mhz, region == 'URBAN')
+  itm_loss_med = None
+  if region_code is not None and reliability == -1:
+    itm_loss_med = wf_itm.CalcItmPropagationLossBatch(
+        lat_cbsd, lon_cbsd, height_cbsd, lats_rx, lons_rx, height_rx,
+        False, 0.5, freq_mhz, its_elevs).db_loss
+
+  is_same_point = (lats_rx == lat_cbsd) & (lons_rx == lon_cbsd)
+  for k in xrange(num_rx):
+    if is_same_point[k]:
+      db_loss[k] = 0
+      opcodes[k] = -1
+      continue
+    its_elev = its_elevs[k, :int(its_elevs[k, 0])+3].tolist()
+    dist_km = float(dists_km[k])
+
+    # Use ITM if CBSD effective height greater than 200 m
+    height_cbsd_eff = ehata.CbsdEffectiveHeights(height_cbsd, its_elev)
+    if height_cbsd_eff >= 200:
+      opcodes[k] = HybridMode.ITM_HIGH_HEIGHT
+    elif region_code is None:
+      opcodes[k] = HybridMode.ITM_RURAL
+
+    elif dist_km <= 0.1:  # Use Free Space Loss
+      db_loss[k] = CalcFreeSpaceLoss(dist_km, freq_mhz, height_cbsd, height_rx)
+      opcodes[k] = HybridMode.FSL
+
+    elif dist_km > 0.1 and dist_km < 1:  # Use E-Hata Median Basic Prop Loss
+      fsl_100m = CalcFreeSpaceLoss(0.1, freq_mhz, height_cbsd, height_rx)
+      median_basic_loss = ehata.MedianBasicPropLoss(
+          freq_mhz, height_cbsd, height_rx,
+          1, region_code)
+      alpha = 1. + math.log10(dist_km)
+      loss = fsl_100m + alpha * (median_basic_loss - fsl_100m)
+      if reliability == -1:
+        loss += alpha * offset_median_to_mean
+      db_loss[k] = loss
+      opcodes[k] = HybridMode.EHATA_FSL_INTERP
+
+    elif dist_km >= 1 and dist_km <= 80:  # Use best of E-Hata / ITM
+      ehata_loss_med = ehata.ExtendedHata(its_elev, freq_mhz, height_cbsd, height_rx,
+                                          region_code)
+      if reliability == 0.5:
+        ehata_loss = ehata_loss_med
+        itm_loss = db_loss_itm[k]
+      else:
+        ehata_loss = ehata_loss_med + offset_median_to_mean
+        itm_loss = itm_loss_med[k]
+      if itm_loss >= ehata_loss_med:
+        opcodes[k] = HybridMode.ITM_DOMINANT
+      else:
+        db_loss[k] = ehata_loss
+        opcodes[k] = HybridMode.EHATA_DOMINANT
+
+    else:  # Use the ITM with correction from E-Hata @ 80km
+      # Rare case in batch mode: delegates to the regular routine.
+      res = CalcHybridPropagationLoss(
+          lat_cbsd, lon_cbsd, height_cbsd, lats_rx[k], lons_rx[k], height_rx,
+          False, reliability, freq_mhz, region, return_internals=True)
+      db_loss[k] = res.db_loss
+      opcodes[k] = res.internals['hybrid_opcode']
+
+    if cbsd_indoor:
+      db_loss[k] += 15
+
+  return _PropagResult(
+      db_loss = db_loss,
+      incidence_angles = incidence_angles,
+      internals = {
+          'hybrid_opcode': opcodes,
+          'dist_km': dists_km
+      })
+
+
 def CalcFreeSpaceLoss(dist_km, freq_mhz, height_cbsd, height_rx):
   """Computes the free space loss.
 
@@ -15,10 +15,13 @@
 import os
 import logging
 import numpy as np
+import shutil
+import tempfile
 import unittest
 
 from reference_models.tools import testutils
 from reference_models.geo import drive
+from reference_models.geo import vincenty
 from reference_models.propagation import wf_hybrid
 from reference_models.propagation import wf_itm
 
@@ -34,8 +37,9 @@ class TestWfHybrid(unittest.TestCase):
   def setUpClass(cls):
     cls.unzip_files = testutils.UnzipTestDir(TERRAIN_TEST_DIR)
     # Mocking the ITU drivers to always return fixed values
-    drive.climate_driver.TropoClim = lambda lat, lon: 5
-    drive.refract_driver.Refractivity = lambda lat, lon: 314
+    drive.climate_driver.TropoClim = lambda lat, lon: np.full(np.shape(lat), 5)
+    drive.refract_driver.Refractivity = (
+        lambda lat, lon: np.full(np.shape(lat), 314.))
 
   @classmethod
   def tearDownClass(cls):
@@ -221,5 +225,87 @@ class TestWfHybrid(unittest.TestCase):
     self.assertTupleEqual(result.incidence_angles, (0, 0, 0, 0))
 
 
+class TestWfHybridBatch(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # Synthetic terrain, so this does not depend on the NED test data.
+    cls.tmp_dir = tempfile.mkdtemp()
+    testutils.MakeSyntheticTerrainTiles(cls.tmp_dir, ['n38w123'])
+    cls.climate_fn = drive.climate_driver.TropoClim
+    cls.refract_fn = drive.refract_driver.Refractivity
+    # Mocking the ITU drivers to return location dependent values
+    drive.climate_driver.TropoClim = (
+        lambda lat, lon: np.where(np.asarray(lat) < 37.5, 5, 6))
+    drive.refract_driver.Refractivity = (
+        lambda lat, lon: 300 + 20 * (np.asarray(lon) + 123))
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tmp_dir)
+    drive.climate_driver.TropoClim = cls.climate_fn
+    drive.refract_driver.Refractivity = cls.refract_fn
+
+  def setUp(self):
+    drive.ConfigureTerrainDriver(terrain_dir=self.tmp_dir)
+
+  def tearDown(self):
+    drive.ConfigureTerrainDriver(terrain_dir=TERRAIN_TEST_DIR)
+
+  def test_batch_vs_single(self):
+    lat_cbsd, lon_cbsd = 37.45, -122.52
+    distances = [0.05, 0.1, 0.5, 0.99, 1., 2.6, 7.1, 15.3, 39.9]
+    lats_rx, lons_rx = [lat_cbsd], [lon_cbsd]  # Same location
+    for azimuth in [0, 133, 271]:
+      lats, lons, _ = vincenty.GeodesicPoints(lat_cbsd, lon_cbsd,
+                                              distances, azimuth)
+      lats_rx.extend(lats)
+      lons_rx.extend(lons)
+
+    for height_cbsd, indoor, reliability, region in [
+        (20, False, 0.5, 'URBAN'), (5, True, -1, 'URBAN'),
+        (30, False, -1, 'SUBURBAN'), (10, False, 0.5, 'RURAL'),
+        (400, True, 0.5, 'SUBURBAN')]:
+      res = wf_hybrid.CalcHybridPropagationLossBatch(
+          lat_cbsd, lon_cbsd, height_cbsd, lats_rx, lons_rx, 1.5,
+          cbsd_indoor=indoor, reliability=reliability, region=region)
+      for k, (lat_rx, lon_rx) in enumerate(zip(lats_rx, lons_rx)):
+        exp_res = wf_hybrid.CalcHybridPropagationLoss(
+            lat_cbsd, lon_cbsd, height_cbsd, lat_rx, lon_rx, 1.5,
+            cbsd_indoor=indoor, reliability=reliability, region=region,
+            return_internals=True)
+        self.assertEqual(res.db_loss[k], exp_res.db_loss)
+        self.assertEqual(tuple(angles[k] for angles in res.incidence_angles),
+                         tuple(exp_res.incidence_angles))
+        if exp_res.internals is not None:
+          self.assertEqual(res.internals['hybrid_opcode'][k],
+                           exp_res.internals['hybrid_opcode'])
+
+  def test_batch_radial_profiles(self):
+    lat_cbsd, lon_cbsd, azimuth = 37.45, -122.52, 133
+    distances = np.arange(0.2, 40.1, 0.2)
+    lats_rx, lons_rx, _ = vincenty.GeodesicPoints(lat_cbsd, lon_cbsd,
+                                                  distances, azimuth)
+    exact_profiles = drive.terrain_driver.TerrainProfiles(
+        lat_cbsd, lon_cbsd, lats_rx, lons_rx,
+        target_res_meter=30., do_interp=True, max_points=1501)
+    radial_profiles = drive.terrain_driver.RadialProfiles(
+        lat_cbsd, lon_cbsd, azimuth, distances,
+        target_res_meter=30., do_interp=True, max_points=1501)
+    # Number of points may differ by one because of rounding on the distances.
+    self.assertLessEqual(
+        np.max(np.abs(radial_profiles[:, 0] - exact_profiles[:, 0])), 1)
+    self.assertLess(
+        np.max(np.abs(radial_profiles[:, 1] - exact_profiles[:, 1])), 1.5)
+
+    exact_res = wf_hybrid.CalcHybridPropagationLossBatch(
+        lat_cbsd, lon_cbsd, 20, lats_rx, lons_rx, 1.5,
+        reliability=0.5, region='RURAL')
+    radial_res = wf_hybrid.CalcHybridPropagationLossBatch(
+        lat_cbsd, lon_cbsd, 20, lats_rx, lons_rx, 1.5,
+        reliability=0.5, region='RURAL', its_elevs=radial_profiles)
+    self.assertLess(np.max(np.abs(radial_res.db_loss - exact_res.db_loss)), 1.)
+
+
 if __name__ == '__main__':
   unittest.main()
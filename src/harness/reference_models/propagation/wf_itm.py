@@ -26,11 +26,17 @@ Typical usage:
               cbsd_indoor=False,
               reliability=0.5,
               freq_mhz=3625.)
+
+  # Get the path losses from a CBSD to many Rx points at once
+  db_losses, incidence_angles, internals = CalcItmPropagationLossBatch(
+              lat_cbsd, lon_cbsd, height_cbsd,
+              lats_rx, lons_rx, height_rx)
 """
 
 from collections import namedtuple
 import numpy as np
 
+from reference_models.common import telemetry
 from reference_models.geo import drive
 from reference_models.geo import vincenty
 from reference_models.propagation.itm import itm
@@ -158,11 +164,12 @@ def CalcItmPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
   # Get the terrain profile, using Vincenty great circle route, and WF
   # standard (bilinear interp; 1500 pts for all distances over 45 km)
   if its_elev is None:
-    its_elev = drive.terrain_driver.TerrainProfile(
-        lat1=lat_cbsd, lon1=lon_cbsd,
-        lat2=lat_rx, lon2=lon_rx,
-        target_res_meter=30.,
-        do_interp=True, max_points=1501)
+    with telemetry.Stage('profile'):
+      its_elev = drive.terrain_driver.TerrainProfile(
+          lat1=lat_cbsd, lon1=lon_cbsd,
+          lat2=lat_rx, lon2=lon_rx,
+          target_res_meter=30.,
+          do_interp=True, max_points=1501)
 
   # Find the midpoint of the great circle path
   dist_km, bearing_cbsd, bearing_rx = vincenty.GeodesicDistanceBearing(
@@ -190,13 +197,14 @@ def CalcItmPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
     reliabilities = np.arange(0.01, 1.0, 0.01)
     do_avg = True
 
-  db_loss, ver_cbsd, ver_rx, str_mode, err_num = itm.point_to_point(
-      its_elev, height_cbsd, height_rx,
-      dielec, conductivity,
-      refractivity, freq_mhz,
-      climate, polarization,
-      confidence, reliabilities,
-      mdvar, False)
+  with telemetry.Stage('itm'):
+    db_loss, ver_cbsd, ver_rx, str_mode, err_num = itm.point_to_point(
+        its_elev, height_cbsd, height_rx,
+        dielec, conductivity,
+        refractivity, freq_mhz,
+        climate, polarization,
+        confidence, reliabilities,
+        mdvar, False)
   if do_avg:
     db_loss = -10*np.log10(np.mean(10**(-np.array(db_loss)/10.)))
 
@@ -231,6 +239,161 @@ def CalcItmPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
   )
 
 
+# Batched version of the Winnforum compliant ITM propagation model
+def CalcItmPropagationLossBatch(lat_cbsd, lon_cbsd, height_cbsd,
+                                lats_rx, lons_rx, height_rx,
+                                cbsd_indoor=False,
+                                reliability=0.5,
+                                freq_mhz=3625.,
+                                its_elevs=None,
+                                is_height_cbsd_amsl=False):
+  """Implements the WinnForum-compliant ITM model from one CBSD to many points.
+
+  This is equivalent to calling `CalcItmPropagationLoss()` for each Rx point,
+  with strictly identical results, but the terrain profiles are all extracted
+  at once, and the ITM model is run on all the paths in a single call.
+
+  Inputs:
+    lat_cbsd, lon_cbsd, height_cbsd: Lat/lon (deg) and height AGL (m) of CBSD
+    lats_rx, lons_rx:    Lat/lon (deg) of the Rx points, as sequences.
+    height_rx:           Height AGL (m) of the Rx points.
+    cbsd_indoor:         CBSD indoor status - Default=False.
+    reliability:         Reliability. Default is 0.5 (median value)
+                         Different options:
+                           value in [0,1]: returns the CDF quantile
+                           -1: returns the mean path loss
+                           iterable sequence: returns the path losses for
+                             each reliability.
+    freq_mhz:            Frequency (MHz). Default is mid-point of band.
+    its_elevs:           Optional profiles to use, as returned by
+                           `TerrainDriver.TerrainProfiles()`. Default=None
+                           If not specified, they are extracted from the terrain.
+    is_height_cbsd_amsl: If True, the CBSD height shall be considered as AMSL (Average
+                         mean sea level).
+
+  Returns:
+    A namedtuple of:
+      db_loss            Path Losses in dB, as a ndarray with one value per Rx
+                           point, or a 2D ndarray (one row per Rx point) if
+                           reliability is an iterable.
+
+      incidence_angles:  A namedtuple of ndarray of angles (see
+                         `CalcItmPropagationLoss()`).
+
+      internals:         A dictionary of internal data:
+          itm_err_num:     ndarray of ITM error codes.
+          dist_km:         ndarray of distances between end points (km).
+
+  Raises:
+    Exception if input parameters invalid or out of range.
+  """
+  lats_rx = np.atleast_1d(np.asarray(lats_rx, dtype=float))
+  lons_rx = np.atleast_1d(np.asarray(lons_rx, dtype=float))
+  num_rx = len(lats_rx)
+
+  # Sanity checks on input parameters
+  if freq_mhz < 40.0 or freq_mhz > 10000:
+    raise Exception('Frequency outside range [40MHz - 10GHz]')
+
+  if is_height_cbsd_amsl:
+    altitude_cbsd = drive.terrain_driver.GetTerrainElevation(lat_cbsd, lon_cbsd)
+    height_cbsd = height_cbsd - altitude_cbsd
+
+  # Ensure minimum height of 1 meter
+  if height_cbsd < 1:
+    height_cbsd = 1
+  if height_rx < 1:
+    height_rx = 1
+
+  # Internal ITM parameters are always set to following values in WF version:
+  confidence = 0.5     # Confidence (always 0.5)
+  dielec = 25.         # Dielectric constant (always 25.)
+  conductivity = 0.02  # Conductivity (always 0.02)
+  polarization = 1     # Polarization (always vertical = 1)
+  mdvar = 13
+
+  reliabilities = reliability
+  do_avg = False
+  if np.isscalar(reliabilities) and reliability == -1:
+    # Pathloss mean: average the value for 1% to 99% included
+    reliabilities = np.arange(0.01, 1.0, 0.01)
+    do_avg = True
+  is_scalar_rel = np.isscalar(reliabilities)
+  num_rels = 1 if is_scalar_rel else len(reliabilities)
+
+  # Case of same points: null path loss and angles.
+  dists_km = np.zeros(num_rx)
+  bearings_cbsd = np.zeros(num_rx)
+  bearings_rx = np.zeros(num_rx)
+  ver_cbsd = np.zeros(num_rx)
+  ver_rx = np.zeros(num_rx)
+  err_num = np.zeros(num_rx, dtype=int)
+  db_loss = np.zeros((num_rx, num_rels))
+  idxs = np.where((lats_rx != lat_cbsd) | (lons_rx != lon_cbsd))[0]
+
+  if len(idxs):
+    # Get the terrain profiles, using Vincenty great circle route, and WF
+    # standard (bilinear interp; 1500 pts for all distances over 45 km)
+    if its_elevs is None:
+      with telemetry.Stage('profile'):
+        its_elevs = drive.terrain_driver.TerrainProfiles(
+            lat_cbsd, lon_cbsd, lats_rx[idxs], lons_rx[idxs],
+            target_res_meter=30.,
+            do_interp=True, max_points=1501)
+    else:
+      its_elevs = np.asarray(its_elevs)[idxs]
+
+    # Find the midpoints of the great circle paths
+    dists_km[idxs], bearings_cbsd[idxs], bearings_rx[idxs] = (
+        vincenty.GeodesicDistanceBearings(lat_cbsd, lon_cbsd,
+                                          lats_rx[idxs], lons_rx[idxs]))
+    latmids, lonmids, _ = vincenty.GeodesicPoints(
+        lat_cbsd, lon_cbsd, dists_km[idxs]/2., bearings_cbsd[idxs])
+
+    # Determine climate and refractivity values (see CalcItmPropagationLoss)
+    climates = drive.climate_driver.TropoClim(latmids, lonmids)
+    sea_idxs = np.where(climates == 7)[0]
+    if len(sea_idxs):
+      climates[sea_idxs] = np.minimum(
+          drive.climate_driver.TropoClim(lat_cbsd, lon_cbsd),
+          drive.climate_driver.TropoClim(lats_rx[idxs[sea_idxs]],
+                                         lons_rx[idxs[sea_idxs]]))
+    refractivities = drive.refract_driver.Refractivity(latmids, lonmids)
+
+    # Call ITM prop loss on all paths.
+    with telemetry.Stage('itm'):
+      losses, ver_cbsd[idxs], ver_rx[idxs], err_num[idxs] = itm.point_to_point_batch(
+          its_elevs, height_cbsd, height_rx,
+          dielec, conductivity,
+          refractivities, freq_mhz,
+          climates, polarization,
+          confidence, reliabilities,
+          mdvar, False)
+    db_loss[idxs] = losses.reshape(len(idxs), num_rels)
+    if do_avg:
+      db_loss[idxs, 0] = [-10*np.log10(np.mean(10**(-losses[k]/10.)))
+                          for k in xrange(len(idxs))]
+    # Add indoor losses
+    if cbsd_indoor:
+      db_loss[idxs] += 15
+
+  if is_scalar_rel or do_avg:
+    db_loss = db_loss[:, 0]
+
+  return _PropagResult(
+      db_loss = db_loss,
+      incidence_angles = _IncidenceAngles(
+          hor_cbsd = bearings_cbsd,
+          ver_cbsd = ver_cbsd,
+          hor_rx = bearings_rx,
+          ver_rx = ver_rx),
+      internals = {
+          'itm_err_num': err_num,
+          'dist_km': dists_km
+      }
+  )
+
+
 # Utility function to compute the HAAT for a CBSD
 def ComputeHaat(lat_cbsd, lon_cbsd, height_cbsd, height_is_agl=True):
   """Computes a CBSD HAAT (Height above average terrain).
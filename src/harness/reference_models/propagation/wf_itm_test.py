@@ -14,10 +14,13 @@
 
 import os
 import numpy as np
+import shutil
+import tempfile
 import unittest
 
 from reference_models.tools import testutils
 from reference_models.geo import drive
+from reference_models.geo import vincenty
 
 from reference_models.propagation.itm.itm_test import _GetHorizonAnglesLegacy
 from reference_models.propagation import wf_itm
@@ -35,8 +38,9 @@ class TestWfItm(unittest.TestCase):
   def setUpClass(cls):
     cls.unzip_files = testutils.UnzipTestDir(TERRAIN_TEST_DIR)
     # Mocking the ITU drivers to always return fixed values
-    drive.climate_driver.TropoClim = lambda lat, lon: 5
-    drive.refract_driver.Refractivity = lambda lat, lon: 314
+    drive.climate_driver.TropoClim = lambda lat, lon: np.full(np.shape(lat), 5)
+    drive.refract_driver.Refractivity = (
+        lambda lat, lon: np.full(np.shape(lat), 314.))
 
   @classmethod
   def tearDownClass(cls):
@@ -174,5 +178,44 @@ class TestWfItm(unittest.TestCase):
     self.assertTupleEqual(result.incidence_angles, (0, 0, 0, 0))
 
 
+class TestWfItmBatch(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # Synthetic terrain, so this does not depend on the NED test data.
+    cls.tmp_dir = tempfile.mkdtemp()
+    testutils.MakeSyntheticTerrainTiles(cls.tmp_dir, ['n38w123'])
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tmp_dir)
+
+  def setUp(self):
+    drive.ConfigureTerrainDriver(terrain_dir=self.tmp_dir)
+
+  def tearDown(self):
+    drive.ConfigureTerrainDriver(terrain_dir=TERRAIN_TEST_DIR)
+
+  def test_batch_vs_single(self):
+    lat_cbsd, lon_cbsd = 37.45, -122.52
+    lats_rx, lons_rx, _ = vincenty.GeodesicPoints(
+        lat_cbsd, lon_cbsd, [0.05, 0.8, 3.1, 14.2, 47.], [10, 95, 180, 222, 300])
+    lats_rx.append(lat_cbsd)
+    lons_rx.append(lon_cbsd)
+    for indoor, reliability in [(False, 0.5), (True, -1), (False, [0.1, 0.5])]:
+      res = wf_itm.CalcItmPropagationLossBatch(
+          lat_cbsd, lon_cbsd, 12, lats_rx, lons_rx, 1.5,
+          cbsd_indoor=indoor, reliability=reliability)
+      for k, (lat_rx, lon_rx) in enumerate(zip(lats_rx, lons_rx)):
+        exp_res = wf_itm.CalcItmPropagationLoss(
+            lat_cbsd, lon_cbsd, 12, lat_rx, lon_rx, 1.5,
+            cbsd_indoor=indoor, reliability=reliability)
+        # Note: for same location, a scalar 0 loss is returned for all
+        # reliabilities.
+        self.assertTrue(np.all(res.db_loss[k] == exp_res.db_loss))
+        self.assertEqual(tuple(angles[k] for angles in res.incidence_angles),
+                         tuple(exp_res.incidence_angles))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,451 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Reproducible benchmark suite of the reference models.
+
+The suite generates deterministic synthetic terrain (NED), land cover (NLCD)
+and ITU data in a local directory, so that it does not depend on the actual
+geo databases. It then runs a set of standardized workloads at several scales
+and writes the results as JSON, for regression tracking.
+
+Usage:
+  # Run all workloads at small scale, and print the results
+  python run_benchmarks.py
+
+  # Run some workloads at several scales, and save the results
+  python run_benchmarks.py --workloads itm,hybrid,dpa_move_list \\
+      --scales small,medium --output results.json
+
+Workloads:
+  - itm: single-link ITM path loss.
+  - hybrid: single-link hybrid path loss.
+  - ppa_contour: PPA contour of a set of CBSDs.
+  - dpa_move_list: DPA move list of a set of protection points.
+  - iap_ppa, iap_gwpz, iap_fss, iap_esc: IAP for each type of incumbent.
+  - aggregate_interference: aggregate interference on FSS, ESC, GWPZ and PPA.
+
+Each workload result holds:
+  - wall_time_s: the wall time of the workload (s).
+  - num_links: the number of CBSD to protection point links (or evaluated
+    points for the PPA contour) processed by the workload.
+  - links_per_s: the throughput in links per second.
+  - peak_rss_mb, total_peak_rss_mb: the max and total over all processes
+    of their peak resident memory so far (MB).
+  - ned_tile_loads, nlcd_tile_loads: the number of tiles loaded from disk.
+  - ned_tile_hit_ratio, nlcd_tile_hit_ratio: the tile cache hit ratios.
+  - cache_hit_ratios: the hit ratios of the memoizing caches, per function.
+  - stage_times_s: the time spent per calculation stage, summed over all
+    processes (see |telemetry|).
+  - error: the error message, if the workload failed.
+
+Notes:
+  - The synthetic data covers a single 1x1 degree tile. All the workloads
+    are located within that tile.
+  - The workloads are run in the main process (no multiprocessing) by default,
+    for stable results. Use --num_processes to benchmark the |mpool| scaling.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import shapely.geometry as sgeo
+
+from full_activity_dump import FullActivityDump
+from reference_models.common import data
+from reference_models.common import mpool
+from reference_models.common import telemetry
+from reference_models.dpa import dpa_builder
+from reference_models.dpa import dpa_mgr
+from reference_models.geo import drive
+from reference_models.geo import utils
+from reference_models.iap import iap
+from reference_models.interference import aggregate_interference
+from reference_models.ppa import ppa
+from reference_models.propagation import wf_hybrid
+from reference_models.propagation import wf_itm
+from reference_models.tools import entities
+from reference_models.tools import testutils
+
+# The synthetic area: a single NED/NLCD tile, with workloads around its center.
+TILE_NAME = 'n35w101'
+CENTER_LATITUDE = 34.5
+CENTER_LONGITUDE = -100.5
+# Max distance of CBSDs and protection points to the center (km).
+MAX_DISTANCE_KM = 25
+
+# The records used as templates for the incumbents.
+_TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', '..', 'interference', 'test_data')
+
+# The workload scales.
+SCALES = {
+    'small': {'num_links': 50, 'num_cbsds': 20, 'num_contours': 1,
+              'num_dpa_points': 2, 'num_iteration': 50,
+              'zone_size_deg': 0.003},
+    'medium': {'num_links': 500, 'num_cbsds': 100, 'num_contours': 2,
+               'num_dpa_points': 5, 'num_iteration': 200,
+               'zone_size_deg': 0.006},
+    'large': {'num_links': 5000, 'num_cbsds': 500, 'num_contours': 5,
+              'num_dpa_points': 20, 'num_iteration': 2000,
+              'zone_size_deg': 0.012},
+}
+
+
+def _MakeSyntheticDataFiles(data_dir):
+  testutils.MakeSyntheticTerrainTiles(data_dir, [TILE_NAME])
+  testutils.MakeSyntheticNlcdTiles(data_dir, [TILE_NAME])
+  testutils.MakeSyntheticItuData(data_dir)
+
+
+def MakeSyntheticData(data_dir):
+  """Generates the synthetic geo data and configures the drivers to use it.
+
+  The data is generated in a child process, so that its memory usage does not
+  show in the peak RSS of the benchmarks.
+  """
+  process = multiprocessing.Process(target=_MakeSyntheticDataFiles,
+                                    args=(data_dir,))
+  process.start()
+  process.join()
+  if process.exitcode:
+    raise RuntimeError('Synthetic data generation failed.')
+  drive.ConfigureTerrainDriver(terrain_dir=data_dir, cache_size=4)
+  drive.ConfigureNlcdDriver(nlcd_dir=data_dir, cache_size=4)
+  drive.ConfigureItuDrivers(data_dir)
+
+
+class Scenario(object):
+  """A synthetic scenario of CBSDs and incumbents for a given scale.
+
+  Attributes:
+    params: The scale parameters (see |SCALES|).
+    cbsds: A list of |entities.Cbsd|.
+    grants: A list of |data.CbsdGrantInfo| of these CBSDs.
+    fad: A |FullActivityDump| holding these CBSDs.
+    fss_record, esc_record, gwpz_record, ppa_record, pal_records: The
+      incumbent records, located at the center of the area.
+  """
+
+  def __init__(self, params, seed):
+    self.params = params
+    np.random.seed(seed)
+    num_cbsds = params['num_cbsds']
+    num_cat_b = num_cbsds // 5
+    self.cbsds = (
+        entities.GenerateCbsdList(num_cbsds - num_cat_b,
+                                  entities.CBSD_TEMPLATE_CAT_A_OUTDOOR,
+                                  CENTER_LATITUDE, CENTER_LONGITUDE,
+                                  min_distance_km=0.5,
+                                  max_distance_km=MAX_DISTANCE_KM)
+        + entities.GenerateCbsdList(num_cat_b,
+                                    entities.CBSD_TEMPLATE_CAT_B_OMNI,
+                                    CENTER_LATITUDE, CENTER_LONGITUDE,
+                                    min_distance_km=0.5,
+                                    max_distance_km=MAX_DISTANCE_KM))
+    # One random 10MHz channel per CBSD in the 3550-3700MHz band.
+    self.channels = [(3550 + 10 * k, 3560 + 10 * k)
+                     for k in np.random.randint(0, 15, len(self.cbsds))]
+    self.grants = data.getGrantsFromRequests(
+        [entities.GetCbsdRegistrationRequest(cbsd) for cbsd in self.cbsds],
+        [entities.GetCbsdGrantRequest(cbsd, fmin, fmax)
+         for cbsd, (fmin, fmax) in zip(self.cbsds, self.channels)])
+    self.fad = FullActivityDump({'cbsd': self._GetCbsdRecords()})
+
+    zone = self._GetSquareZone(params['zone_size_deg'])
+    self.fss_record = self._LoadRecord('fss_ut.json')
+    install_param = self.fss_record['record']['deploymentParam'][0][
+        'installationParam']
+    install_param['latitude'] = CENTER_LATITUDE
+    install_param['longitude'] = CENTER_LONGITUDE
+    self.esc_record = self._LoadRecord('esc_ut.json')
+    self.esc_record['installationParam']['latitude'] = CENTER_LATITUDE
+    self.esc_record['installationParam']['longitude'] = CENTER_LONGITUDE
+    self.gwpz_record = self._LoadRecord('gwpz_ut.json')
+    self.gwpz_record['zone']['features'][0]['geometry'] = zone
+    self.ppa_record = self._LoadRecord('ppa_ut.json')
+    self.ppa_record['zone']['features'][0]['geometry'] = zone
+    self.ppa_record['ppaInfo']['cbsdReferenceId'] = [
+        self.fad.getCbsdRecords()[0]['id']]
+    self.pal_records = [self._LoadRecord('pal_ut.json')]
+
+  def _GetCbsdRecords(self):
+    """Returns the CBSD records, in the FAD format."""
+    records = []
+    for k, (cbsd, (fmin, fmax)) in enumerate(zip(self.cbsds, self.channels)):
+      registration = entities.GetCbsdRegistrationRequest(cbsd)
+      registration.update({
+          'fccId': 'bench_fcc_id',
+          'cbsdSerialNumber': 'bench_serial_%d' % k,
+          'callSign': 'bench_call_sign',
+          'airInterface': {'radioTechnology': 'E_UTRA'},
+          'measCapability': []})
+      grant = entities.GetCbsdGrantRequest(cbsd, fmin, fmax)
+      grant.update({'id': 'bench_grant_%d' % k,
+                    'channelType': 'GAA',
+                    'terminated': False})
+      records.append({'id': 'cbsd/bench_fcc_id/%d' % k,
+                      'registration': registration,
+                      'grants': [grant]})
+    return records
+
+  def _GetSquareZone(self, size_deg):
+    """Returns a square zone geometry at the center of the area."""
+    half = size_deg / 2.
+    return sgeo.mapping(sgeo.box(CENTER_LONGITUDE - half, CENTER_LATITUDE - half,
+                                 CENTER_LONGITUDE + half, CENTER_LATITUDE + half))
+
+  def _LoadRecord(self, filename):
+    with open(os.path.join(_TEST_DATA_DIR, filename)) as fd:
+      return json.load(fd)
+
+
+# The workloads: each one runs on a |Scenario| and returns its number of links.
+def _RunItm(scenario):
+  num_links = scenario.params['num_links']
+  for lat1, lon1, lat2, lon2 in testutils.MakeLatLngPairs(
+      num_links, dmin_meters=1000, dmax_meters=MAX_DISTANCE_KM * 1000,
+      lat_min=CENTER_LATITUDE - 0.25, lat_max=CENTER_LATITUDE + 0.25,
+      lng_min=CENTER_LONGITUDE - 0.3, lng_max=CENTER_LONGITUDE + 0.3):
+    wf_itm.CalcItmPropagationLoss(lat1, lon1, 10., lat2, lon2, 1.5,
+                                  reliability=0.5, freq_mhz=3625.)
+  return num_links
+
+
+def _RunHybrid(scenario):
+  num_links = scenario.params['num_links']
+  for lat1, lon1, lat2, lon2 in testutils.MakeLatLngPairs(
+      num_links, dmin_meters=1000, dmax_meters=MAX_DISTANCE_KM * 1000,
+      lat_min=CENTER_LATITUDE - 0.25, lat_max=CENTER_LATITUDE + 0.25,
+      lng_min=CENTER_LONGITUDE - 0.3, lng_max=CENTER_LONGITUDE + 0.3):
+    wf_hybrid.CalcHybridPropagationLoss(lat1, lon1, 10., lat2, lon2, 1.5,
+                                        reliability=0.5, freq_mhz=3625.,
+                                        region='SUBURBAN')
+  return num_links
+
+
+def _RunPpaContour(scenario):
+  # Use the CBSDs closest to the center, so that contours stay within the tile.
+  records = sorted(
+      scenario.fad.getCbsdRecords(),
+      key=lambda r: (abs(r['registration']['installationParam']['latitude']
+                         - CENTER_LATITUDE) +
+                     abs(r['registration']['installationParam']['longitude']
+                         - CENTER_LONGITUDE)))
+  num_links = 0
+  for record in records[:scenario.params['num_contours']]:
+    _, num_evaluated, _ = ppa._GetPolygon(record['registration'])
+    num_links += num_evaluated
+  return num_links
+
+
+def _RunDpaMoveList(scenario):
+  np.random.seed(1)
+  num_points = scenario.params['num_dpa_points']
+  points = [dpa_builder.ProtectionPoint(
+      latitude=CENTER_LATITUDE + np.random.uniform(-0.05, 0.05),
+      longitude=CENTER_LONGITUDE + np.random.uniform(-0.05, 0.05))
+            for _ in xrange(num_points)]
+  dpa_mgr.Dpa.Configure(num_iteration=scenario.params['num_iteration'])
+  dpa = dpa_mgr.Dpa(points, name='bench', freq_ranges_mhz=[(3550, 3650)])
+  dpa.SetGrantsFromList(scenario.grants)
+  dpa.ComputeMoveLists()
+  return num_points * sum(len(nbor_list) for nbor_list in dpa.nbor_lists)
+
+
+def _RunIapPpa(scenario):
+  iap.performIapForPpa(scenario.ppa_record, scenario.fad, [],
+                       scenario.pal_records)
+  return _NumZoneLinks(scenario, scenario.ppa_record, iap.PPA_GRID_RES_ARCSEC)
+
+
+def _RunIapGwpz(scenario):
+  iap.performIapForGwpz(scenario.gwpz_record, scenario.fad, [])
+  return _NumZoneLinks(scenario, scenario.gwpz_record, iap.GWPZ_GRID_RES_ARCSEC)
+
+
+def _RunIapFss(scenario):
+  iap.performIapForFssCochannel(scenario.fss_record, scenario.fad, [])
+  return len(scenario.grants)
+
+
+def _RunIapEsc(scenario):
+  iap.performIapForEsc(scenario.esc_record, scenario.fad, [])
+  return len(scenario.grants)
+
+
+def _RunAggregateInterference(scenario):
+  grants = scenario.grants
+  aggregate_interference.calculateAggregateInterferenceForFssCochannel(
+      scenario.fss_record, grants)
+  aggregate_interference.calculateAggregateInterferenceForEsc(
+      scenario.esc_record, grants)
+  aggregate_interference.calculateAggregateInterferenceForGwpz(
+      scenario.gwpz_record, grants)
+  aggregate_interference.calculateAggregateInterferenceForPpa(
+      scenario.ppa_record, scenario.pal_records, grants)
+  return (2 * len(grants)
+          + _NumZoneLinks(scenario, scenario.gwpz_record,
+                          iap.GWPZ_GRID_RES_ARCSEC)
+          + _NumZoneLinks(scenario, scenario.ppa_record,
+                          iap.PPA_GRID_RES_ARCSEC))
+
+
+def _NumZoneLinks(scenario, zone_record, res_arcsec):
+  """Returns the number of links between the grants and the zone grid points."""
+  num_points = len(utils.GridPolygon(
+      zone_record['zone']['features'][0]['geometry'], res_arcsec))
+  return num_points * len(scenario.grants)
+
+
+WORKLOADS = [
+    ('itm', _RunItm),
+    ('hybrid', _RunHybrid),
+    ('ppa_contour', _RunPpaContour),
+    ('dpa_move_list', _RunDpaMoveList),
+    ('iap_ppa', _RunIapPpa),
+    ('iap_gwpz', _RunIapGwpz),
+    ('iap_fss', _RunIapFss),
+    ('iap_esc', _RunIapEsc),
+    ('aggregate_interference', _RunAggregateInterference),
+]
+
+
+def RunWorkload(name, workload_fn, scenario):
+  """Runs a workload and returns its result as a dict.
+
+  Workload failures are reported in the result, and do not stop the suite.
+  """
+  result = {'workload': name}
+  start_time = time.time()
+  try:
+    num_links = telemetry.Reported(name)(workload_fn)(scenario)
+  except Exception as e:
+    logging.exception('Workload %s failed', name)
+    result['error'] = '%s: %s' % (type(e).__name__, e)
+    return result
+  wall_time = time.time() - start_time
+  report = telemetry.GetLastReport()
+  tiles = report['tiles']
+  result.update({
+      'wall_time_s': wall_time,
+      'num_links': num_links,
+      'links_per_s': num_links / wall_time if wall_time > 0 else None,
+      'peak_rss_mb': report['max_peak_rss_mb'],
+      'total_peak_rss_mb': report['total_peak_rss_mb'],
+      'ned_tile_loads': tiles['ned']['loads'],
+      'ned_tile_hit_ratio': tiles['ned']['hit_ratio'],
+      'nlcd_tile_loads': tiles['nlcd']['loads'],
+      'nlcd_tile_hit_ratio': tiles['nlcd']['hit_ratio'],
+      'cache_hit_ratios': {cache_name: stats['hit_ratio']
+                           for cache_name, stats in report['caches'].items()},
+      'stage_times_s': {stage: stats['time_s']
+                        for stage, stats in report['stages'].items()}})
+  return result
+
+
+def RunBenchmarks(workloads, scales, seed=12345):
+  """Runs the benchmark suite.
+
+  The synthetic data shall have been generated beforehand (see
+  `MakeSyntheticData()`).
+
+  Args:
+    workloads: A list of workload names (see |WORKLOADS|).
+    scales: A list of scale names (see |SCALES|).
+    seed: The random seed, used for generating the scenarios.
+
+  Returns:
+    A list of result dicts, one per (scale, workload).
+  """
+  workload_fns = dict(WORKLOADS)
+  results = []
+  for scale in scales:
+    scenario = Scenario(SCALES[scale], seed)
+    for name in workloads:
+      # Reseed so that each workload is independent of the ones run before.
+      np.random.seed(seed)
+      result = RunWorkload(name, workload_fns[name], scenario)
+      result['scale'] = scale
+      logging.info('%s', result)
+      results.append(result)
+  return results
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(
+      description='Reproducible benchmark suite of the reference models.')
+  parser.add_argument('--workloads', default=','.join(w for w, _ in WORKLOADS),
+                      help='Comma separated list of workloads to run.')
+  parser.add_argument('--scales', default='small',
+                      help='Comma separated list of scales: %s.'
+                      % ', '.join(sorted(SCALES)))
+  parser.add_argument('--output', default=None,
+                      help='The JSON output file. If not set, print to stdout.')
+  parser.add_argument('--seed', type=int, default=12345,
+                      help='The random seed for generating the scenarios.')
+  parser.add_argument('--data_dir', default=None,
+                      help='The directory for the synthetic data. If not set, '
+                      'a temporary directory is used.')
+  parser.add_argument('--num_processes', type=int, default=0,
+                      help='The number of worker processes (0 for none, '
+                      '-1 for automatic).')
+  args = parser.parse_args(argv)
+
+  workloads = args.workloads.split(',')
+  scales = args.scales.split(',')
+  unknown = ([w for w in workloads if w not in dict(WORKLOADS)] +
+             [s for s in scales if s not in SCALES])
+  if unknown:
+    parser.error('Unknown workloads or scales: %s' % ', '.join(unknown))
+
+  data_dir = args.data_dir or tempfile.mkdtemp(prefix='sas_bench_')
+  if not os.path.isdir(data_dir):
+    os.makedirs(data_dir)
+  try:
+    MakeSyntheticData(data_dir)
+    if args.num_processes:
+      mpool.Configure(args.num_processes)
+    telemetry.Configure(enabled=True)
+    results = RunBenchmarks(workloads, scales, args.seed)
+  finally:
+    if args.data_dir is None:
+      shutil.rmtree(data_dir)
+
+  report = {
+      'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+      'platform': platform.platform(),
+      'python': platform.python_version(),
+      'numpy': np.__version__,
+      'seed': args.seed,
+      'num_processes': mpool.GetNumWorkerProcesses(),
+      'results': results,
+  }
+  if args.output:
+    with open(args.output, 'w') as fd:
+      json.dump(report, fd, indent=2, sort_keys=True)
+  else:
+    print json.dumps(report, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+  logging.basicConfig(level=logging.INFO)
+  main(sys.argv[1:])
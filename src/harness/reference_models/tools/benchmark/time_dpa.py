@@ -23,7 +23,6 @@ Notes:
   - multiprocessing facility not tested on Windows (use 1 process if issues)
   - if warning reported on cached tiles swapping, increase the cache size.
 """
-# TODO(sbdt): add reporting for memory usage
 from collections import namedtuple
 import time
 
@@ -34,6 +33,7 @@ import numpy as np
 from reference_models.dpa import dpa_mgr
 from reference_models.common import data
 from reference_models.common import mpool
+from reference_models.common import telemetry
 from reference_models.geo import zones
 from reference_models.geo import drive
 from reference_models.geo import utils
@@ -184,6 +184,8 @@ if __name__ == '__main__':
   # Configure the global pool of processes
   mpool.Configure(num_processes)
   num_workers = mpool.GetNumWorkerProcesses()
+  # Collect memory, tile cache and stage timing statistics of all workers
+  telemetry.Configure(enabled=True)
 
   (all_cbsds, reg_requests, grant_requests, protection_zone,
    (n_a_indoor, n_a_outdoor, n_b), ax) = PrepareSimulation()
@@ -233,6 +235,7 @@ if __name__ == '__main__':
                               else 'urban areas only')
   print 'Move list size: %d' % len_move_list
   print 'Computation time: %.1fs' % (end_time - start_time)
+  print telemetry.FormatReport(telemetry.GetLastReport())
 
   # Check tiles cache well behaved
   print  ''
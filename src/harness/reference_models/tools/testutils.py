@@ -25,6 +25,8 @@ import os
 import zipfile
 
 from reference_models.common import data
+from reference_models.geo import nlcd
+from reference_models.geo import terrain
 from reference_models.geo import vincenty
 from reference_models.propagation import wf_itm
 from reference_models.antenna import antenna
@@ -92,6 +94,43 @@ class FakePropagationPredictor(object):
           hor_cbsd=bearing_cbsd, ver_cbsd=0, hor_rx=bearing_rx, ver_rx=0),
           internals={})
 
+class FakeBatchPropagationPredictor(FakePropagationPredictor):
+  """Fake batch propagation model for testing.
+
+  Same as |FakePropagationPredictor|, but computing the path loss from one
+  CBSD to a sequence of Rx points. It can be used as a fake replacement for
+  `CalcHybridPropagationLossBatch()`, as following:
+    wf_hybrid.CalcHybridPropagationLossBatch = FakeBatchPropagationPredictor()
+  """
+
+  def __call__(self,
+               lat_cbsd,
+               lon_cbsd,
+               height_cbsd,
+               lats_rx,
+               lons_rx,
+               height_rx,
+               cbsd_indoor=False,
+               reliability=-1,
+               freq_mhz=3625.,
+               region=None,
+               is_height_cbsd_amsl=False,
+               its_elevs=None):
+    """See `CalcHybridPropagationLossBatch()` for specification."""
+    results = [
+        super(FakeBatchPropagationPredictor, self).__call__(
+            lat_cbsd, lon_cbsd, height_cbsd, lat_rx, lon_rx, height_rx,
+            cbsd_indoor, reliability, freq_mhz, None, region,
+            is_height_cbsd_amsl)
+        for lat_rx, lon_rx in zip(lats_rx, lons_rx)]
+    return wf_itm._PropagResult(
+        db_loss=np.array([res.db_loss for res in results]),
+        incidence_angles=wf_itm._IncidenceAngles(
+            *[np.array(angles)
+              for angles in zip(*[res.incidence_angles for res in results])]),
+        internals={})
+
+
 class FakeInterferenceCalculator(object):
   """Fake model to calculate the interference for testing.
 
@@ -178,8 +217,8 @@ def MakeLatLngPairs(n_pairs,
     lat1 = np.random.uniform(lat_min, lat_max)
     lng1 = np.random.uniform(lng_min, lng_max)
     bearing = np.random.uniform(0., 360.)
-    dist = np.random.uniform(dmin_meters, dmax_meters)
-    lat2, lng2, _ = vincenty.GeodesicPoint(lat1, lng1, dist, bearing)
+    dist_km = np.random.uniform(dmin_meters, dmax_meters) / 1000.
+    lat2, lng2, _ = vincenty.GeodesicPoint(lat1, lng1, dist_km, bearing)
     if (lat2 < lat_min or lat2 > lat_max or
         lng2 < lng_min or lng2 > lng_max):
       continue
@@ -188,6 +227,92 @@ def MakeLatLngPairs(n_pairs,
   return pair_points
 
 
+def MakeSyntheticTerrainTiles(directory, tile_names):
+  """Writes synthetic terrain tiles in a directory.
+
+  The terrain is made of smooth hills, with altitudes between 0 and 600m.
+  This allows running tests and benchmarks without the actual NED data.
+
+  Inputs:
+    directory: target directory
+    tile_names: list of tile names to generate, for example ['n38w123']
+
+  Returns:
+    list of generated files
+  """
+  dim = terrain._TILE_DIM
+  rows, cols = np.mgrid[0:dim, 0:dim].astype(np.float32)
+  tile_files = []
+  for k, tile_name in enumerate(tile_names):
+    elev = (300. + 150. * np.sin(rows / (230. + 17 * k)) * np.cos(cols / 310.)
+            + 150. * np.sin((rows + cols) / 97.))
+    tile_file = 'float%s_1_std.flt' % tile_name
+    elev.astype(np.float32).tofile(os.path.join(directory, tile_file))
+    tile_files.append(tile_file)
+  return tile_files
+
+
+def MakeSyntheticNlcdTiles(directory, tile_names):
+  """Writes synthetic NLCD land cover tiles in a directory.
+
+  The land cover is a deterministic patchwork of 100x100 pixels blocks, mixing
+  developed (urban and suburban), rural and water classes.
+  This allows running tests and benchmarks without the actual NLCD data.
+
+  Inputs:
+    directory: target directory
+    tile_names: list of tile names to generate, for example ['n38w123']
+
+  Returns:
+    list of generated files
+  """
+  codes = np.array([nlcd.LandCoverCodes.DEVELOPED_LOW,
+                    nlcd.LandCoverCodes.CULTIVATED_CROPS,
+                    nlcd.LandCoverCodes.DEVELOPED_MEDIUM,
+                    nlcd.LandCoverCodes.GRASSLAND,
+                    nlcd.LandCoverCodes.DECIDUOUS_FOREST,
+                    nlcd.LandCoverCodes.DEVELOPED_HIGH,
+                    nlcd.LandCoverCodes.DEVELOPED_OPEN,
+                    nlcd.LandCoverCodes.OPEN_WATER], dtype=np.uint8)
+  dim = nlcd._TILE_DIM
+  rows, cols = np.mgrid[0:dim, 0:dim] // 100
+  tile_files = []
+  for k, tile_name in enumerate(tile_names):
+    land_cover = codes[(rows * 7 + cols * 3 + (rows * cols) % 5 + k) % len(codes)]
+    tile_file = 'nlcd_%s.int' % tile_name
+    land_cover.astype(np.uint8).tofile(os.path.join(directory, tile_file))
+    tile_files.append(tile_file)
+  return tile_files
+
+
+def MakeSyntheticItuData(directory):
+  """Writes synthetic ITU refractivity and radio climate data in a directory.
+
+  The refractivity ('n050.txt') varies smoothly between 280 and 360 N-units,
+  and the radio climate ('TropoClim.txt') is banded in latitude, with the
+  continental temperate climate over mid-latitudes.
+  This allows running tests and benchmarks without the actual ITU data.
+
+  Inputs:
+    directory: target directory
+
+  Returns:
+    list of generated files
+  """
+  lats = 90. - 1.5 * np.arange(121)
+  lons = 1.5 * np.arange(241)
+  refractivity = (320. + 40. * np.cos(np.radians(lats))[:, np.newaxis]
+                  * np.cos(np.radians(2 * lons))[np.newaxis, :])
+  np.savetxt(os.path.join(directory, 'n050.txt'), refractivity, fmt='%.3f')
+
+  lats = 89.75 - 0.5 * np.arange(360)
+  climate = np.where(np.abs(lats) < 20, 1,
+                     np.where(np.abs(lats) < 60, 5, 6))
+  climate = np.repeat(climate[:, np.newaxis], 720, axis=1)
+  np.savetxt(os.path.join(directory, 'TropoClim.txt'), climate, fmt='%d')
+  return ['n050.txt', 'TropoClim.txt']
+
+
 def UnzipTestDir(directory):
   """Unzip all zip file in a directory.
 
@@ -13,14 +13,27 @@
 #    limitations under the License.
 """Handles HTTP requests."""
 
+import contextlib
 import copy
+import hashlib
 import json
 import logging
 import StringIO
+import sys
+import threading
 import urlparse
 import os
 import pycurl
 
+# Maximum number of idle connections kept alive per pool key.
+MAX_IDLE_CONNECTIONS_PER_KEY = 8
+
+# The idle connections, as lists of |pycurl.Curl| keyed by (host, TLS config).
+_idle_connections = {}
+_idle_connections_lock = threading.Lock()
+# The number of active `KeepAlive()` scopes. Connections are pooled while > 0.
+_keep_alive_count = 0
+
 
 class HTTPError(Exception):
   """HTTP error, ie. any HTTP code not in range [200, 299].
@@ -83,27 +96,293 @@ def RequestGet(url, config):
   return _Request(url, None, config, False)
 
 
-def _Request(url, request, config, is_post_method):
-  """Sends HTTPS request.
+def _FileDigest(path):
+  """Returns the SHA1 digest of a file content, or None if no file."""
+  if path is None:
+    return None
+  try:
+    with open(path, 'rb') as fd:
+      return hashlib.sha1(fd.read()).hexdigest()
+  except (IOError, OSError):
+    return None
+
+
+def _ConnectionKey(url, config):
+  """Returns the key of the connections reusable for a request.
+
+  The certificate and key are identified by their content, so that a
+  certificate regenerated at the same path is not served by a connection
+  authenticated with the previous one.
+  """
+  parsed_url = urlparse.urlparse(url)
+  return (parsed_url.scheme, parsed_url.hostname, parsed_url.port,
+          config.ssl_version, tuple(config.ciphers), config.ca_cert,
+          config.client_cert, _FileDigest(config.client_cert),
+          config.client_key, _FileDigest(config.client_key))
+
+
+@contextlib.contextmanager
+def KeepAlive():
+  """Context manager keeping the connections alive between requests.
+
+  Within this scope, the connections are kept alive and reused by the next
+  requests to the same host with the same TLS configuration, avoiding a new TLS
+  handshake per request. The scopes can be nested or entered from several
+  threads: the idle connections are closed when the last scope exits.
+
+  Outside of any scope, each request uses a new connection. Keep-alive is meant
+  for bulk CBSD traffic (for example Domain Proxy batches), and shall not be
+  used around requests checking the TLS handshake.
+  """
+  global _keep_alive_count
+  with _idle_connections_lock:
+    _keep_alive_count += 1
+  try:
+    yield
+  finally:
+    with _idle_connections_lock:
+      _keep_alive_count -= 1
+      is_last_scope = not _keep_alive_count
+    if is_last_scope:
+      CloseConnections()
+
+
+def _AcquireConnection(key):
+  """Returns an idle connection for the given key, or a new one."""
+  with _idle_connections_lock:
+    connections = _idle_connections.get(key)
+    if connections:
+      return connections.pop()
+  return pycurl.Curl()
+
+
+def _ReleaseConnection(key, conn):
+  """Releases a connection, keeping it alive if within a `KeepAlive()` scope."""
+  with _idle_connections_lock:
+    if _keep_alive_count:
+      connections = _idle_connections.setdefault(key, [])
+      if len(connections) < MAX_IDLE_CONNECTIONS_PER_KEY:
+        # Drops the options (and callbacks) of the request, not the connection.
+        conn.reset()
+        connections.append(conn)
+        return
+  conn.close()
+
+
+def CloseConnections():
+  """Closes all the idle connections kept alive."""
+  with _idle_connections_lock:
+    for connections in _idle_connections.values():
+      for conn in connections:
+        conn.close()
+    _idle_connections.clear()
+
+
+def RequestGetStream(url, config, write_fn):
+  """Sends a HTTPS GET request, streaming the response body.
 
   Args:
     url: Destination of the HTTPS request.
-    request: Content of the request. (Can be None)
     config: a |TlsConfig| object defining the TLS/HTTPS configuration.
-    is_post_method (bool): If True, use POST, else GET.
+    write_fn: A function called with each received chunk of the response body
+      (only for HTTP codes in range [200, 299]). Any exception it raises aborts
+      the transfer and is propagated as is.
   Returns:
-    A dictionary represents the JSON response received from server.
+    The number of bytes of the response body.
   Raises:
-    CurlError: with args[0] is an integer code representing the libcurl
-      SSL code response (value < 100). Refer to:
-      https://curl.haxx.se/libcurl/c/libcurl-errors.html
-    HTTPError: for any HTTP code not in the range [200, 299]. Refer to:
-      https://en.wikipedia.org/wiki/List_of_HTTP_status_codes)
+    CurlError: see `_Request()`.
+    HTTPError: see `_Request()`.
   """
-  response = StringIO.StringIO()
-  conn = pycurl.Curl()
+  key = _ConnectionKey(url, config)
+  conn = _AcquireConnection(key)
+  num_bytes = [0]
+  status = [None]
+  write_error = []
+  error_body = StringIO.StringIO()
+  def _Header(line):
+    # The HTTP code cannot be read with `getinfo()` while performing, so it is
+    # taken from the status line (the last one if several, eg on redirect).
+    if line.startswith('HTTP/'):
+      status[0] = int(line.split()[1])
+  def _Write(chunk):
+    num_bytes[0] += len(chunk)
+    if status[0] is None or not (200 <= status[0] <= 299):
+      error_body.write(chunk)
+      return
+    try:
+      write_fn(chunk)
+    except Exception:
+      write_error.append(sys.exc_info())
+      return 0  # Aborts the transfer.
+  _SetupConnection(conn, url, config, _Write)
+  conn.setopt(conn.HEADERFUNCTION, _Header)
+  logging.info('GET Request to URL %s', url)
+  try:
+    http_code = _Perform(key, conn)
+  except CurlError:
+    if write_error:
+      exc_type, exc_value, exc_traceback = write_error[0]
+      raise exc_type, exc_value, exc_traceback
+    raise
+  logging.info('Response: %d bytes', num_bytes[0])
+
+  if not (200 <= http_code <= 299):
+    logging.info('Response:\n' + error_body.getvalue())
+    raise HTTPError(http_code)
+  return num_bytes[0]
+
+
+class RecordStreamParser(object):
+  """Incremental parser of the records of a JSON object.
+
+  Extracts the records of an array field of a JSON object (for example the
+  'recordData' of a Full Activity Dump file) while the object is received
+  chunk by chunk, without holding the full object in memory.
+
+  Usage:
+    parser = RecordStreamParser(records.append)
+    RequestGetStream(url, config, parser.Feed)
+    parser.Close()
+  """
+
+  def __init__(self, record_fn, array_field='recordData'):
+    """Initializes the parser.
+
+    Args:
+      record_fn: A function called on each record of the array, as soon as it
+        is received.
+      array_field: The name of the array field of the object.
+    """
+    self._record_fn = record_fn
+    self._array_field = array_field
+    self._decoder = json.JSONDecoder()
+    self._buffer = ''
+    self._pos = 0
+    self._state = 'START'
+    self._key = None
+    self.num_records = 0
+
+  def Feed(self, chunk):
+    """Parses a new chunk of the JSON object.
+
+    Raises:
+      ValueError: if the JSON object is invalid.
+    """
+    self._buffer = self._buffer[self._pos:] + chunk
+    self._pos = 0
+    self._Parse(is_last=False)
+
+  def Close(self):
+    """Terminates the parsing.
+
+    Raises:
+      ValueError: if the JSON object is invalid or incomplete.
+    """
+    self._Parse(is_last=True)
+    if self._state != 'DONE' or self._buffer[self._pos:].strip():
+      raise ValueError('Invalid or incomplete JSON object')
+
+  def _SkipWhitespace(self):
+    self._pos = json.decoder.WHITESPACE.match(self._buffer, self._pos).end()
+
+  def _Decode(self, is_last):
+    """Decodes the next JSON value, or returns None if not fully received."""
+    try:
+      value, end = self._decoder.raw_decode(self._buffer, self._pos)
+    except ValueError:
+      if is_last: raise
+      return None
+    # A number at the end of the received data could be continued in the next
+    # chunk, unless followed by a whitespace or a delimiter.
+    is_number = (isinstance(value, (int, long, float)) and
+                 not isinstance(value, bool))
+    next_pos = json.decoder.WHITESPACE.match(self._buffer, end).end()
+    if is_number and not is_last and (
+        next_pos == len(self._buffer) or
+        (next_pos == end and self._buffer[end] not in ',:}]')):
+      return None
+    self._pos = end
+    return (value,)
+
+  def _Expect(self, char, expected_chars):
+    """Checks the next char is one of the expected delimiters."""
+    if char not in expected_chars:
+      raise ValueError('Expecting one of %r at position %d, got %r' %
+                       (expected_chars, self._pos, char))
+    self._pos += 1
+
+  def _Parse(self, is_last):
+    # The states, with the expected next token:
+    #  START:        '{'
+    #  FIRST_KEY:    a key or '}'
+    #  KEY:          a key
+    #  COLON:        ':'
+    #  VALUE:        a value, or '[' for the array field
+    #  KEY_SEP:      ',' or '}'
+    #  FIRST_RECORD: a record or ']'
+    #  RECORD:       a record
+    #  RECORD_SEP:   ',' or ']'
+    #  DONE:         end of object.
+    while True:
+      self._SkipWhitespace()
+      if self._pos >= len(self._buffer) or self._state == 'DONE':
+        return
+      char = self._buffer[self._pos]
+      if self._state == 'START':
+        self._Expect(char, '{')
+        self._state = 'FIRST_KEY'
+      elif self._state == 'FIRST_KEY' and char == '}':
+        self._pos += 1
+        self._state = 'DONE'
+      elif self._state in ('FIRST_KEY', 'KEY'):
+        if char != '"':
+          raise ValueError('Expecting a key at position %d' % self._pos)
+        decoded = self._Decode(is_last)
+        if decoded is None:
+          return
+        self._key = decoded[0]
+        self._state = 'COLON'
+      elif self._state == 'COLON':
+        self._Expect(char, ':')
+        self._state = 'VALUE'
+      elif self._state == 'VALUE':
+        if self._key == self._array_field:
+          if char != '[':
+            raise ValueError('Expecting an array for %s' % self._key)
+          self._pos += 1
+          self._state = 'FIRST_RECORD'
+        else:
+          if char in ',}':
+            raise ValueError('Expecting a value for %s' % self._key)
+          if self._Decode(is_last) is None:
+            return
+          self._state = 'KEY_SEP'
+      elif self._state == 'KEY_SEP':
+        self._Expect(char, ',}')
+        self._state = 'KEY' if char == ',' else 'DONE'
+      elif self._state == 'FIRST_RECORD' and char == ']':
+        self._pos += 1
+        self._state = 'KEY_SEP'
+      elif self._state in ('FIRST_RECORD', 'RECORD'):
+        if char in ',]':
+          raise ValueError('Expecting a record at position %d' % self._pos)
+        decoded = self._Decode(is_last)
+        if decoded is None:
+          return
+        self.num_records += 1
+        self._record_fn(decoded[0])
+        self._state = 'RECORD_SEP'
+      elif self._state == 'RECORD_SEP':
+        self._Expect(char, ',]')
+        self._state = 'RECORD' if char == ',' else 'KEY_SEP'
+
+
+def _SetupConnection(conn, url, config, write_fn):
+  """Sets up the common options of a connection."""
   conn.setopt(conn.URL, url)
-  conn.setopt(conn.WRITEFUNCTION, response.write)
+  # Required for using libcurl in multi-threaded programs.
+  conn.setopt(conn.NOSIGNAL, 1)
+  conn.setopt(conn.WRITEFUNCTION, write_fn)
   header = [
       'Host: %s' % urlparse.urlparse(url).hostname,
       'content-type: application/json'
@@ -119,21 +398,63 @@ def _Request(url, request, config, is_post_method):
   conn.setopt(conn.CAINFO, config.ca_cert)
   conn.setopt(conn.HTTPHEADER, header)
   conn.setopt(conn.SSL_CIPHER_LIST, ':'.join(config.ciphers))
-  request = json.dumps(request) if request else ''
-  if is_post_method:
-    conn.setopt(conn.POST, True)
-    conn.setopt(conn.POSTFIELDS, request)
-    logging.info('POST Request to URL %s :\n%s', url, request)
-  else:
-    logging.info('GET Request to URL %s', url)
+
+
+def _Perform(key, conn):
+  """Performs the request of a connection.
+
+  The connection is released on success (see `_ReleaseConnection()`), and
+  closed on failure as it is possibly in an invalid state.
+
+  Returns:
+    The HTTP code of the response.
+  Raises:
+    CurlError: see `_Request()`.
+  """
   try:
     conn.perform()
   except pycurl.error as e:
+    conn.close()
     # e contains a tuple (libcurl_error_code, string_description).
     # See https://curl.haxx.se/libcurl/c/libcurl-errors.html
     raise CurlError(e.args[1], e.args[0])
   http_code = conn.getinfo(pycurl.HTTP_CODE)
-  conn.close()
+  _ReleaseConnection(key, conn)
+  return http_code
+
+
+def _Request(url, request, config, is_post_method):
+  """Sends HTTPS request.
+
+  Within a `KeepAlive()` scope, the connection is kept alive and reused by the
+  next requests to the same host with the same TLS configuration.
+
+  Args:
+    url: Destination of the HTTPS request.
+    request: Content of the request. (Can be None)
+    config: a |TlsConfig| object defining the TLS/HTTPS configuration.
+    is_post_method (bool): If True, use POST, else GET.
+  Returns:
+    A dictionary represents the JSON response received from server.
+  Raises:
+    CurlError: with args[0] is an integer code representing the libcurl
+      SSL code response (value < 100). Refer to:
+      https://curl.haxx.se/libcurl/c/libcurl-errors.html
+    HTTPError: for any HTTP code not in the range [200, 299]. Refer to:
+      https://en.wikipedia.org/wiki/List_of_HTTP_status_codes)
+  """
+  response = StringIO.StringIO()
+  key = _ConnectionKey(url, config)
+  conn = _AcquireConnection(key)
+  _SetupConnection(conn, url, config, response.write)
+  request = json.dumps(request) if request else ''
+  if is_post_method:
+    conn.setopt(conn.POST, True)
+    conn.setopt(conn.POSTFIELDS, request)
+    logging.info('POST Request to URL %s :\n%s', url, request)
+  else:
+    logging.info('GET Request to URL %s', url)
+  http_code = _Perform(key, conn)
   body = response.getvalue()
   logging.info('Response:\n' + body)
 
@@ -0,0 +1,273 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Tests for the request_handler.py."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import mock
+import pycurl
+
+import request_handler
+
+
+class FakeCurl(object):
+  """A fake |pycurl.Curl| replaying a HTTP response.
+
+  As the real one, `getinfo()` cannot be called while performing.
+  """
+
+  def __init__(self, http_code=200, body_chunks=()):
+    self.http_code = http_code
+    self.body_chunks = body_chunks
+    self.options = {}
+    self.performing = False
+    self.num_performs = 0
+    self.num_resets = 0
+    self.closed = False
+
+  def __getattr__(self, name):
+    # The option constants, such as `conn.URL`.
+    return getattr(pycurl, name)
+
+  def setopt(self, option, value):
+    self.options[option] = value
+
+  def perform(self):
+    self.num_performs += 1
+    self.performing = True
+    try:
+      header_fn = self.options.get(pycurl.HEADERFUNCTION)
+      if header_fn:
+        header_fn('HTTP/1.1 %d Whatever\r\n' % self.http_code)
+        header_fn('Content-Type: application/json\r\n')
+      for chunk in self.body_chunks:
+        if self.options[pycurl.WRITEFUNCTION](chunk) not in (None, len(chunk)):
+          raise pycurl.error(pycurl.E_WRITE_ERROR, 'Failed writing body')
+    finally:
+      self.performing = False
+
+  def getinfo(self, info):
+    if self.performing:
+      raise pycurl.error('cannot invoke getinfo() - perform() is currently '
+                         'running')
+    return self.http_code
+
+  def reset(self):
+    self.num_resets += 1
+    self.options = {}
+
+  def close(self):
+    self.closed = True
+
+
+def _Chunks(data, size):
+  return [data[k:k+size] for k in range(0, len(data), size)]
+
+
+class RecordStreamParserTest(unittest.TestCase):
+
+  def _Parse(self, data, chunk_size):
+    records = []
+    parser = request_handler.RecordStreamParser(records.append)
+    for chunk in _Chunks(data, chunk_size):
+      parser.Feed(chunk)
+    parser.Close()
+    self.assertEqual(parser.num_records, len(records))
+    return records
+
+  def test_records_any_chunk_size(self):
+    records = [
+        {'id': 'cbsd/1', 'value': -12.5e-3, 'flags': [True, False, None]},
+        {'id': u'r\xe9seau \u4e2d\u6587', 'text': 'brackets ]}[{ and "q"'},
+        {'nested': {'a': [1, [2, {'b': ']'}]], 'c': '}\\\\'}},
+        12345678901234567890, 1.5, 'a string', [], {}]
+    data = json.dumps({'header': {'version': [1, '}]']},
+                       'recordData': records,
+                       'other': 'x', 'count': 42},
+                      indent=1, ensure_ascii=False).encode('utf-8')
+    for chunk_size in range(1, len(data) + 1):
+      self.assertEqual(self._Parse(data, chunk_size), records)
+
+  def test_empty_and_missing_records(self):
+    self.assertEqual(self._Parse('{"recordData": []}', 1), [])
+    self.assertEqual(self._Parse('{}', 1), [])
+    self.assertEqual(self._Parse(' { "a" : 1 } ', 3), [])
+
+  def test_invalid(self):
+    for data in ['{"recordData": [1 2 3]}',
+                 '{"recordData": [1, 2,]}',
+                 '{"recordData": [, 1]}',
+                 '{"recordData": [1,, 2]}',
+                 '{"recordData": 1}',
+                 '{"a": 1 "recordData": []}',
+                 '{"a" 1}',
+                 '{1: 2}',
+                 '{"a": }',
+                 '{"recordData": [{"a": 1}}',
+                 '{"recordData": [tru]}',
+                 '[1, 2]',
+                 '{} x']:
+      for chunk_size in (1, 2, len(data)):
+        with self.assertRaises(ValueError):
+          self._Parse(data, chunk_size)
+
+  def test_truncated(self):
+    data = '{"recordData": [{"a": "b"}, 12, "c"], "d": 1.5}'
+    for length in range(len(data)):
+      for chunk_size in (1, 3, len(data)):
+        with self.assertRaises(ValueError):
+          self._Parse(data[:length], chunk_size)
+
+
+class RequestGetStreamTest(unittest.TestCase):
+
+  def setUp(self):
+    request_handler.CloseConnections()
+    self.config = request_handler.TlsConfig()
+
+  def tearDown(self):
+    request_handler.CloseConnections()
+
+  def test_stream(self):
+    conn = FakeCurl(200, ['{"recordDa', 'ta": [1, ', '2]}'])
+    records = []
+    parser = request_handler.RecordStreamParser(records.append)
+    with mock.patch.object(pycurl, 'Curl', return_value=conn):
+      num_bytes = request_handler.RequestGetStream('https://sas.com/dump',
+                                                   self.config, parser.Feed)
+    parser.Close()
+    self.assertEqual(num_bytes, 22)
+    self.assertEqual(records, [1, 2])
+
+  def test_http_error(self):
+    conn = FakeCurl(403, ['{"error": ', '"forbidden"}'])
+    write_fn = mock.Mock()
+    with mock.patch.object(pycurl, 'Curl', return_value=conn):
+      with self.assertRaises(request_handler.HTTPError) as context:
+        request_handler.RequestGetStream('https://sas.com/dump', self.config,
+                                         write_fn)
+    self.assertEqual(context.exception.error_code, 403)
+    self.assertFalse(write_fn.called)
+
+  def test_write_error_propagated(self):
+    conn = FakeCurl(200, ['{"recordData": [1 ', '2]}'])
+    parser = request_handler.RecordStreamParser(lambda record: None)
+    with mock.patch.object(pycurl, 'Curl', return_value=conn):
+      with self.assertRaises(ValueError):
+        request_handler.RequestGetStream('https://sas.com/dump', self.config,
+                                         parser.Feed)
+    self.assertTrue(conn.closed)
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+  def setUp(self):
+    request_handler.CloseConnections()
+    self.tmp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.tmp_dir)
+    self.base_config = request_handler.TlsConfig()
+    self.config = self._ConfigWithCertificate('cert1')
+    self.connections = []
+    patcher = mock.patch.object(pycurl, 'Curl', side_effect=self._NewCurl)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def tearDown(self):
+    request_handler.CloseConnections()
+
+  def _NewCurl(self):
+    conn = FakeCurl(200, ['{"a": 1}'])
+    self.connections.append(conn)
+    return conn
+
+  def _ConfigWithCertificate(self, content, name='client.cert'):
+    cert_file = os.path.join(self.tmp_dir, name)
+    with open(cert_file, 'w') as fd:
+      fd.write(content)
+    return self.base_config.WithClientCertificate(cert_file, cert_file)
+
+  def test_no_keep_alive(self):
+    for _ in range(2):
+      self.assertEqual(
+          request_handler.RequestGet('https://sas.com/a', self.config),
+          {'a': 1})
+    self.assertEqual(len(self.connections), 2)
+    self.assertTrue(all(conn.closed for conn in self.connections))
+
+  def test_keep_alive_reuse_and_reset(self):
+    with request_handler.KeepAlive():
+      request_handler.RequestGet('https://sas.com/a', self.config)
+      request_handler.RequestPost('https://sas.com/b', {'x': 1}, self.config)
+      self.assertEqual(len(self.connections), 1)
+      conn = self.connections[0]
+      self.assertEqual(conn.num_performs, 2)
+      # Released connections are reset, and not closed.
+      self.assertEqual(conn.num_resets, 2)
+      self.assertEqual(conn.options, {})
+      self.assertFalse(conn.closed)
+    # Closed when leaving the outermost scope.
+    self.assertTrue(conn.closed)
+
+  def test_keep_alive_key_separation(self):
+    with request_handler.KeepAlive():
+      request_handler.RequestGet('https://sas.com/a', self.config)
+      request_handler.RequestGet('https://sas2.com/a', self.config)
+      other_config = self._ConfigWithCertificate('cert', name='other.cert')
+      request_handler.RequestGet('https://sas.com/a', other_config)
+      self.assertEqual(len(self.connections), 3)
+      # Certificate regenerated at the same path.
+      config = self._ConfigWithCertificate('cert2')
+      request_handler.RequestGet('https://sas.com/a', config)
+      self.assertEqual(len(self.connections), 4)
+      request_handler.RequestGet('https://sas.com/a', config)
+      self.assertEqual(len(self.connections), 4)
+
+  def test_keep_alive_close_on_error(self):
+    with request_handler.KeepAlive():
+      with mock.patch.object(FakeCurl, 'perform',
+                             side_effect=pycurl.error(35, 'SSL error')):
+        with self.assertRaises(request_handler.CurlError) as context:
+          request_handler.RequestGet('https://sas.com/a', self.config)
+      self.assertEqual(context.exception.error_code, 35)
+      self.assertTrue(self.connections[0].closed)
+      request_handler.RequestGet('https://sas.com/a', self.config)
+      self.assertEqual(len(self.connections), 2)
+
+  def test_keep_alive_idle_cap(self):
+    num_connections = request_handler.MAX_IDLE_CONNECTIONS_PER_KEY + 2
+    key = request_handler._ConnectionKey('https://sas.com/a', self.config)
+    with request_handler.KeepAlive():
+      conns = [request_handler._AcquireConnection(key)
+               for _ in range(num_connections)]
+      for conn in conns:
+        request_handler._ReleaseConnection(key, conn)
+      self.assertEqual([conn.closed for conn in conns],
+                       [False] * request_handler.MAX_IDLE_CONNECTIONS_PER_KEY
+                       + [True] * 2)
+      self.assertEqual(len(request_handler._idle_connections[key]),
+                       request_handler.MAX_IDLE_CONNECTIONS_PER_KEY)
+
+  def test_keep_alive_nested(self):
+    with request_handler.KeepAlive():
+      with request_handler.KeepAlive():
+        request_handler.RequestGet('https://sas.com/a', self.config)
+      self.assertFalse(self.connections[0].closed)
+    self.assertTrue(self.connections[0].closed)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -14,7 +14,8 @@
 """Implementation of SasInterface."""
 
 import ConfigParser
-from request_handler import TlsConfig, RequestPost, RequestGet
+from request_handler import TlsConfig, RequestPost, RequestGet, RequestGetStream
+from request_handler import RecordStreamParser
 import os
 import sas_interface
 
@@ -123,6 +124,17 @@ class SasImpl(sas_interface.SasInterface):
                           GetDefaultSasSSLCertPath(), ssl_key
                           if ssl_key else GetDefaultSasSSLKeyPath()))
 
+  def DownloadFileRecords(self, url, record_fn, ssl_cert=None, ssl_key=None):
+    parser = RecordStreamParser(record_fn)
+    num_bytes = RequestGetStream(
+        url,
+        self._tls_config.WithClientCertificate(
+            ssl_cert if ssl_cert else GetDefaultSasSSLCertPath(),
+            ssl_key if ssl_key else GetDefaultSasSSLKeyPath()),
+        parser.Feed)
+    parser.Close()
+    return num_bytes
+
   def UpdateSasRequestUrl(self, cipher):
     if 'ECDSA' in cipher:
       self.sas_sas_active_base_url = self._sas_sas_ec_base_url
@@ -194,6 +194,24 @@ class SasInterface(object):
     """
     pass
 
+  def DownloadFileRecords(self, url, record_fn, ssl_cert=None, ssl_key=None):
+    """SAS-SAS Get the records of a Full Activity Dump file.
+
+    Default implementation based on |DownloadFile|. Implementations may
+    override it for streaming the records as they are received.
+
+    Args:
+      url: The URL of the dump file.
+      record_fn: A function called on each record of the file, in order.
+      ssl_cert: Path to SSL cert file, if None, will use default cert file.
+      ssl_key: Path to SSL key file, if None, will use default key file.
+    Returns:
+      The number of downloaded bytes, or None if unknown.
+    """
+    for record in self.DownloadFile(url, ssl_cert, ssl_key)['recordData']:
+      record_fn(record)
+    return None
+
 class SasAdminInterface(object):
   """Minimal test control interface for the SAS under test."""
 
@@ -27,7 +27,7 @@ import inspect
 
 from OpenSSL import SSL, crypto
 from util import getCertificateFingerprint
-from request_handler import HTTPError
+from request_handler import CloseConnections, HTTPError
 
 class CiphersOverload(object):
   """Overloads the ciphers and client certificate used by the SAS client.
@@ -67,6 +67,7 @@ class SecurityTestCase(sas_testcase.SasTestCase):
 
   def SasReset(self):
     """Resets the SAS UUT to its initial state."""
+    CloseConnections()
     self._sas_admin.Reset()
 
   def assertTlsHandshakeSucceed(self, base_url, ciphers, client_cert, client_key):
@@ -251,6 +252,8 @@ class SecurityTestCase(sas_testcase.SasTestCase):
       ssl_method: optional ssl_method
       is_sas: boolean to determine next request
     """
+    # Makes sure the next request does a new TLS handshake.
+    CloseConnections()
     try:
       self.assertTlsHandshakeFailure(client_cert, client_key, ciphers, ssl_method)
     except AssertionError as e:
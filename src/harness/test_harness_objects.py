@@ -16,10 +16,50 @@
    Mainly used in MCP and related test cases."""
 import common_strings
 import logging
+from multiprocessing.pool import ThreadPool
+import request_handler
 import sas
-import math
 from common_types import ResponseCodes
 
+
+def _sendRequestsInBatches(send_fn, request_name, requests, maximum_batch_size,
+                           max_in_flight_requests=1):
+  """Sends requests in batches up to the maximum batch size.
+
+  Up to |max_in_flight_requests| batches are sent concurrently. The responses
+  are returned in the order of the requests, whatever the order in which the
+  batches complete.
+
+  Args:
+    send_fn: The SAS method sending a batch, for example |SasInterface.Grant|,
+      called with the wrapped batch of requests.
+    request_name: The name of the request, for example 'grant'.
+    requests: All requests we wish to send.
+    maximum_batch_size: The maximum number of requests per batch.
+    max_in_flight_requests: The maximum number of batches sent concurrently.
+  Returns:
+    The responses for each request.
+  """
+  batches = [requests[k:k + maximum_batch_size]
+             for k in range(0, len(requests), maximum_batch_size)]
+  def _sendBatch(batch):
+    return send_fn({request_name + 'Request': batch})[request_name + 'Response']
+  num_threads = min(max_in_flight_requests, len(batches))
+  if num_threads <= 1:
+    batch_responses = map(_sendBatch, batches)
+  else:
+    pool = ThreadPool(num_threads)
+    try:
+      batch_responses = pool.map(_sendBatch, batches)
+    finally:
+      pool.close()
+      pool.join()
+  responses = []
+  for batch_response in batch_responses:
+    responses.extend(batch_response)
+  return responses
+
+
 class Grant(object):
   """Holds the Grant request parameters."""
 
@@ -133,17 +173,21 @@ class DomainProxy(object):
   CBSD objects belonging to this Domain Proxy. Bulk operations like registration, grant and heartbeat
   procedures are performed on all of the CBSDs belonging to this Domain Proxy.
   """
-  def __init__(self, testcase, ssl_cert=None, ssl_key=None):
+  def __init__(self, testcase, ssl_cert=None, ssl_key=None,
+               max_in_flight_requests=1):
     """
     Args:
       ssl_cert: Path to SSL cert file.
       ssl_key: Path to SSL key file.
       testcase: test case object from the caller.
+      max_in_flight_requests: Maximum number of batches of requests sent
+        concurrently to the SAS UUT. Default is 1 (sequential).
     """
     self.ssl_cert = ssl_cert if ssl_cert else sas.GetDefaultDomainProxySSLCertPath()
     self.ssl_key = ssl_key if ssl_key else sas.GetDefaultDomainProxySSLKeyPath()
     self.cbsd_objects = {}
     self.testcase = testcase
+    self.max_in_flight_requests = max_in_flight_requests
 
   def registerCbsdsAndRequestGrants(self,
                                     registration_requests,
@@ -224,12 +268,9 @@ class DomainProxy(object):
       heartbeat_requests.extend(cbsd_object_item.constructHeartbeatRequestForAllActiveGrants())
 
     if len(heartbeat_requests):
-      heartbeat_requests_wrapped = {
-        'heartbeatRequest': heartbeat_requests
-      }
       # Perform heartbeat requests.
-      heartbeat_responses = self.testcase._sas.Heartbeat(
-        heartbeat_requests_wrapped, self.ssl_cert, self.ssl_key)['heartbeatResponse']
+      heartbeat_responses = self._heartbeatRequestWithMaximumBatchSize(
+          heartbeat_requests)
 
       # Check the length of heartbeat responses is the same as heartbeat requests.
       self.testcase.assertEqual(len(heartbeat_responses), len(heartbeat_requests))
@@ -315,7 +356,7 @@ class DomainProxy(object):
 
     # Perform relinquishment since operation param present in heartbeat response.
     if len(relinquishment_requests):
-      relinquishment_responses = _relinquishmentRequestWithMaximumBatchSize(relinquishment_requests)
+      relinquishment_responses = self._relinquishmentRequestWithMaximumBatchSize(relinquishment_requests)
 
       # Check the length of relinquishment responses is the same as relinquishment request.
       self.testcase.assertEqual(len(relinquishment_responses), len(relinquishment_requests))
@@ -357,6 +398,18 @@ class DomainProxy(object):
         cbsd_objects.append(cbsd_object)
     return cbsd_objects
 
+  def _sendWithMaximumBatchSize(self, send_fn, request_name, requests):
+    """Sends requests in batches up to the maximum batch size.
+
+    The connections are kept alive between the batches.
+    """
+    with request_handler.KeepAlive():
+      return _sendRequestsInBatches(
+          lambda wrapped_requests: send_fn(wrapped_requests, self.ssl_cert,
+                                           self.ssl_key),
+          request_name, requests, self.testcase._sas.maximum_batch_size,
+          self.max_in_flight_requests)
+
   def _grantRequestWithMaximumBatchSize(self, grant_requests):
     """Sends grant requests in batches up to the maximum batch size.
 
@@ -365,16 +418,19 @@ class DomainProxy(object):
     Returns:
       The grant responses for each grant_request.
     """
-    grant_responses = []
-    maximum_batch_size = self.testcase._sas.maximum_batch_size
-    for iteration in range(0, int(math.ceil(len(grant_requests)/float(maximum_batch_size)))):
-      grant_request_block = grant_requests[iteration*maximum_batch_size:(iteration+1)*maximum_batch_size]
-      # Wrapped version of the grant requests.
-      grant_requests_wrap = {
-        'grantRequest': grant_request_block
-      }
-      grant_responses.extend(self.testcase._sas.Grant(grant_requests_wrap, self.ssl_cert, self.ssl_key)['grantResponse'])
-    return grant_responses
+    return self._sendWithMaximumBatchSize(self.testcase._sas.Grant, 'grant',
+                                          grant_requests)
+
+  def _heartbeatRequestWithMaximumBatchSize(self, heartbeat_requests):
+    """Sends heartbeat requests in batches up to the maximum batch size.
+
+    Args:
+      heartbeat_requests: All heartbeat requests we wish to send.
+    Returns:
+      The heartbeat responses for each heartbeat_request.
+    """
+    return self._sendWithMaximumBatchSize(self.testcase._sas.Heartbeat,
+                                          'heartbeat', heartbeat_requests)
 
   def _relinquishmentRequestWithMaximumBatchSize(self, relinquishment_requests):
     """Sends relinquishment requests in batches up to the maximum batch size.
@@ -384,14 +440,6 @@ class DomainProxy(object):
     Returns:
       The relinquishment responses for each relinquishment_request.
     """
-    relinquishment_responses = []
-    maximum_batch_size = self.testcase._sas.maximum_batch_size
-    for iteration in range(0, int(math.ceil(len(relinquishment_requests)/float(maximum_batch_size)))):
-      relinquishment_request_block = relinquishment_requests[iteration*maximum_batch_size:(iteration+1)*maximum_batch_size]
-      # Wrapped version of the grant requests.
-      relinquishment_requests_wrap = {
-        'relinquishmentRequest': relinquishment_request_block
-      }
-      relinquishment_responses.extend(self.testcase._sas.Relinquishment(relinquishment_requests_wrap, self.ssl_cert, self.ssl_key)['relinquishmentResponse'])
-    return relinquishment_responses
-
+    return self._sendWithMaximumBatchSize(self.testcase._sas.Relinquishment,
+                                          'relinquishment',
+                                          relinquishment_requests)
@@ -0,0 +1,111 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Tests for the test_harness_objects.py."""
+
+import random
+import threading
+import time
+import unittest
+
+import test_harness_objects
+
+
+class FakeSas(object):
+  """Fake SAS method sending a batch of grant requests, with random delays."""
+
+  def __init__(self, delays=None):
+    self.delays = delays
+    self.lock = threading.Lock()
+    self.batches = []
+    self.completed = []
+    self.threads = set()
+    self.in_flight = 0
+    self.max_in_flight = 0
+
+  def Grant(self, request):
+    batch = request['grantRequest']
+    with self.lock:
+      index = len(self.batches)
+      self.batches.append(batch)
+      self.threads.add(threading.current_thread().ident)
+      self.in_flight += 1
+      self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    if self.delays is not None:
+      time.sleep(self.delays[index])
+    else:
+      time.sleep(random.uniform(0, 0.01))
+    with self.lock:
+      self.in_flight -= 1
+      self.completed.append(index)
+    return {'grantResponse': [{'grantId': req['cbsdId']} for req in batch]}
+
+
+class SendRequestsInBatchesTest(unittest.TestCase):
+
+  def setUp(self):
+    self.requests = [{'cbsdId': k} for k in range(10)]
+    self.expected_responses = [{'grantId': k} for k in range(10)]
+
+  def test_splitByMaximumBatchSize(self):
+    for batch_size in [1, 3, 4, 10, 20]:
+      sas = FakeSas()
+      responses = test_harness_objects._sendRequestsInBatches(
+          sas.Grant, 'grant', self.requests, batch_size,
+          max_in_flight_requests=3)
+      self.assertEqual(responses, self.expected_responses)
+      self.assertTrue(all(len(batch) <= batch_size for batch in sas.batches))
+      self.assertEqual(len(sas.batches), (10 + batch_size - 1) // batch_size)
+      self.assertEqual(sorted(req['cbsdId']
+                              for batch in sas.batches for req in batch),
+                       range(10))
+
+  def test_keepsOrderWhenBatchesCompleteOutOfOrder(self):
+    # Earlier batches are the slowest to complete.
+    sas = FakeSas(delays=[0.04, 0.03, 0.02, 0.01, 0])
+    responses = test_harness_objects._sendRequestsInBatches(
+        sas.Grant, 'grant', self.requests, 2, max_in_flight_requests=5)
+    self.assertEqual(responses, self.expected_responses)
+    self.assertNotEqual(sas.completed, sorted(sas.completed))
+    self.assertGreater(sas.max_in_flight, 1)
+
+  def test_randomDelays(self):
+    random.seed(12)
+    for max_in_flight_requests in [2, 4, 8]:
+      sas = FakeSas()
+      responses = test_harness_objects._sendRequestsInBatches(
+          sas.Grant, 'grant', self.requests, 1, max_in_flight_requests)
+      self.assertEqual(responses, self.expected_responses)
+      self.assertLessEqual(sas.max_in_flight, max_in_flight_requests)
+
+  def test_singleInFlightRequestIsSequential(self):
+    sas = FakeSas()
+    responses = test_harness_objects._sendRequestsInBatches(
+        sas.Grant, 'grant', self.requests, 3)
+    self.assertEqual(responses, self.expected_responses)
+    # Batches sent one at a time, in order, from the calling thread.
+    self.assertEqual(sas.max_in_flight, 1)
+    self.assertEqual(sas.completed, [0, 1, 2, 3])
+    self.assertEqual(sas.batches, [self.requests[0:3], self.requests[3:6],
+                                   self.requests[6:9], self.requests[9:10]])
+    self.assertEqual(sas.threads, set([threading.current_thread().ident]))
+
+  def test_noRequests(self):
+    sas = FakeSas()
+    self.assertEqual(test_harness_objects._sendRequestsInBatches(
+        sas.Grant, 'grant', [], 3, max_in_flight_requests=4), [])
+    self.assertEqual(sas.batches, [])
+
+
+if __name__ == '__main__':
+  unittest.main()
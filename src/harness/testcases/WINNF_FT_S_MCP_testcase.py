@@ -69,7 +69,7 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
             'iterationData': list,
             'sasTestHarnessConfigs': list,
             'domainProxyConfigs': list
-        }, {'dpas': dict})
+        }, {'dpas': dict, 'parallelDomainProxies': bool})
 
     # Check each iteration's data.
     for iteration_data in config['iterationData']:
@@ -157,7 +157,7 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
       self.assertValidConfig(domain_proxy_config, {
           'cert': basestring,
           'key': basestring
-      })
+      }, {'maxInFlightRequests': int})
 
     # Special xPR-only checks.
     if test_type == 'MCP':
@@ -208,6 +208,7 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
     self.domain_proxy_objects = []
     self.protected_entity_records = {}
     self.num_peer_sases = len(config['sasTestHarnessConfigs'])
+    self.parallel_domain_proxies = config.get('parallelDomainProxies', False)
     self.cpas_executor = ThreadPoolExecutor(max_workers=1)
     self.agg_interf_check_executor = ThreadPoolExecutor(max_workers=1)
     logging.info('Running test type "%s" with %d SAS test harnesses.',
@@ -220,7 +221,8 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
       self.domain_proxy_objects.append(test_harness_objects.DomainProxy(
           self,
           domain_proxy['cert'],
-          domain_proxy['key']))
+          domain_proxy['key'],
+          domain_proxy.get('maxInFlightRequests', 1)))
 
     if test_type == 'MCP':
       # Step 1: Load DPAs
@@ -428,9 +430,8 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
     # Steps 13, 14, 15, and 16: send heartbeat request for the grants,
     # relinquish the grant, grant request and heartbeat for new grants.
     logging.info('Steps 13 - 16: heartbeat, relinquish, grant, heartbeat.')
-    for index, domain_proxy_object in enumerate(self.domain_proxy_objects):
-      logging.info('Working on domain proxy %d.', index)
-      domain_proxy_object.performHeartbeatAndUpdateGrants()
+    self.runOnAllDomainProxies(
+        test_harness_objects.DomainProxy.performHeartbeatAndUpdateGrants)
 
     # Steps 17, 18, and CHECK
     logging.info('Steps 17, 18, and CHECK: calculating reference DPA move list,'
@@ -446,9 +447,8 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
 
     # Step 20: Send heartbeat request for all CBSDs managed by SAS UUT.
     logging.info('Step 20: heartbeating all CBSDs.')
-    for index, domain_proxy_object in enumerate(self.domain_proxy_objects):
-      logging.info('Heartbeating for domain proxy %d.', index)
-      domain_proxy_object.heartbeatForAllActiveGrants()
+    self.runOnAllDomainProxies(
+        test_harness_objects.DomainProxy.heartbeatForAllActiveGrants)
 
     # Step 21: ESC Test harness deactivates previously-activated DPAs.
     logging.info('Step 21: activating and deactivating DPAs.')
@@ -473,9 +473,8 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
 
     # Step 23: Send heartbeat request for all CBSDs managed by SAS UUT.
     logging.info('Step 23: heartbeating all CBSDs.')
-    for index, domain_proxy_object in enumerate(self.domain_proxy_objects):
-      logging.info('Heartbeating for domain proxy %d.', index)
-      domain_proxy_object.heartbeatForAllActiveGrants()
+    self.runOnAllDomainProxies(
+        test_harness_objects.DomainProxy.heartbeatForAllActiveGrants)
 
     # Steps 24, 25, and CHECK
     logging.info('Steps 24, 25, and CHECK: calculating reference DPA move list,'
@@ -483,6 +482,44 @@ class McpXprCommonTestcase(sas_testcase.SasTestCase):
                  ' aggregate interference check.')
     self.performIapAndDpaChecks()
 
+  def runOnAllDomainProxies(self, domain_proxy_method):
+    """Runs a method on all domain proxies and logs the per-proxy latency.
+
+    The domain proxies are run concurrently, each one with its own TLS
+    certificate, if `parallelDomainProxies` is set in the config. Otherwise
+    they are run one after the other.
+
+    Args:
+      domain_proxy_method: The |DomainProxy| method to run, for example
+        |DomainProxy.heartbeatForAllActiveGrants|.
+    Returns:
+      The list of per-proxy latencies (in seconds).
+    """
+    def runOnDomainProxy(index_and_domain_proxy):
+      index, domain_proxy_object = index_and_domain_proxy
+      logging.info('Running %s on domain proxy %d.',
+                   domain_proxy_method.__name__, index)
+      start_time = time.time()
+      domain_proxy_method(domain_proxy_object)
+      latency = time.time() - start_time
+      logging.info('Domain proxy %d completed %s in %.2fs.', index,
+                   domain_proxy_method.__name__, latency)
+      return latency
+
+    if self.parallel_domain_proxies and len(self.domain_proxy_objects) > 1:
+      executor = ThreadPoolExecutor(max_workers=len(self.domain_proxy_objects))
+      try:
+        latencies = list(executor.map(runOnDomainProxy,
+                                      enumerate(self.domain_proxy_objects)))
+      finally:
+        executor.shutdown()
+    else:
+      latencies = map(runOnDomainProxy, enumerate(self.domain_proxy_objects))
+    if latencies:
+      logging.info('%s on %d domain proxies: max latency %.2fs.',
+                   domain_proxy_method.__name__, len(latencies), max(latencies))
+    return latencies
+
   def performIapAndDpaChecks(self):
     """Checks aggregate interference to all protected entities and active DPAs.
     """
@@ -21,6 +21,7 @@ import inspect
 import json
 from jsonschema import validate, Draft4Validator, RefResolver
 import logging
+import numpy as np
 import os
 import sys
 import time
@@ -477,30 +478,41 @@ class TestComponentError(Exception):
   """
   pass
 
+def _getFUGLattice(start, stop, step):
+  """Returns the decreasing FUG lattice coordinates from start down to stop.
+
+  The coordinates are accumulated by successive subtractions of the step and
+  rounded to 6 decimals, as done historically with a walk of the lattice.
+  """
+  num_steps = int(np.floor((start - stop) / step)) + 2
+  values = np.subtract.accumulate(np.r_[start, np.full(num_steps, step)])
+  return np.array([round(value, 6) for value in values[values >= stop]])
+
+
 def getFUGPoints(ppa):
   """This function returns FUG points list
     Args:
       ppa: (dictionary) A dictionary containing PPA/GWPZ Record.
     Returns:
-      An array of tuple (lat, lng).
+      A ndarray of shape (N, 2) holding the (lat, lng) of the points strictly
+      within the zone, ordered by decreasing latitude then longitude.
     """
-  fug_points = []
   ppa_polygon = shape(ppa[0]['zone']['features'][0]['geometry'])
   min_lng, min_lat, max_lng, max_lat = ppa_polygon.bounds
-  upper_boundary_lng = np.ceil(max_lng)
-  lower_boundary_lng = np.floor(min_lng)
-  upper_boundary_lat = np.ceil(max_lat)
-  lower_boundary_lat = np.floor(min_lat)
-  while(upper_boundary_lat >= lower_boundary_lat):
-    while(upper_boundary_lng >= lower_boundary_lng):
-      pointLat = round(upper_boundary_lat, 6)
-      pointLng = round(upper_boundary_lng, 6)
-      if Point([pointLng, pointLat]).within(ppa_polygon):
-        fug_points.append((pointLat, pointLng))
-      upper_boundary_lng = upper_boundary_lng - 2.0 / 3600
-    upper_boundary_lat = upper_boundary_lat - 2.0 / 3600
-    upper_boundary_lng = max_lng + 2.0 / 3600
-  return fug_points
+  step = 2.0 / 3600
+  lats = _getFUGLattice(np.ceil(max_lat), np.floor(min_lat), step)
+  # The first lattice row starts at the upper longitude boundary, while the
+  # next ones start one step beyond the maximum longitude.
+  first_row_lngs = _getFUGLattice(np.ceil(max_lng), np.floor(min_lng), step)
+  lngs = _getFUGLattice(max_lng + step, np.floor(min_lng), step)
+  fug_points = []
+  for row_lats, row_lngs in [(lats[:1], first_row_lngs), (lats[1:], lngs)]:
+    ilngs, ilats = utils.RasterizePolygon(ppa_polygon, row_lngs[::-1],
+                                          row_lats[::-1], include_border=False)
+    order = np.lexsort((-ilngs, -ilats))
+    fug_points.append(np.column_stack((row_lats[::-1][ilats[order]],
+                                       row_lngs[::-1][ilngs[order]])))
+  return np.concatenate(fug_points)
 
 
 def getChannels(lowFrequency, highFrequency):
@@ -56,3 +56,20 @@ class UtilTest(unittest.TestCase):
     self.assertEqual(util.getUnusedPort(), START_PORT + 2)
     with self.assertRaises(AssertionError):
       util.getUnusedPort()
+
+  def test_getFUGPoints(self):
+    # A square of 0.01deg side, with corners on the 2 arcsec lattice.
+    zone = {'type': 'Polygon',
+            'coordinates': [[[-100.5, 40.5], [-100.49, 40.5], [-100.49, 40.51],
+                             [-100.5, 40.51], [-100.5, 40.5]]]}
+    ppa = [{'zone': {'features': [{'geometry': zone}]}}]
+    fug_points = util.getFUGPoints(ppa)
+    # Only the 17x17 points strictly within the square.
+    self.assertEqual(fug_points.shape, (17 * 17, 2))
+    self.assertAlmostEqual(fug_points[0][0], 40.51 - 2. / 3600, 6)
+    self.assertAlmostEqual(fug_points[0][1], -100.49 - 2. / 3600, 6)
+    self.assertAlmostEqual(fug_points[-1][0], 40.5 + 2. / 3600, 6)
+    self.assertAlmostEqual(fug_points[-1][1], -100.5 + 2. / 3600, 6)
+    # Ordered by decreasing latitude then longitude.
+    self.assertListEqual(fug_points.tolist(),
+                         sorted(fug_points.tolist(), reverse=True))